@@ -423,7 +423,12 @@
 
 
 import streamlit as st
-from utils.data_handler import DataHandler
+from utils.data_handler import get_data_handler
+from utils.backends import get_backend_name, set_backend
+from utils.streaming import get_memory_limit, set_memory_limit
+from utils.profiling import Trace, activate
+from utils.anomaly import AnomalyMonitor
+from utils.categorizer import CategorizerService
 from src.dashboard import render_dashboard
 from src.transactions import render_transactions
 from src.budgets import render_budgets
@@ -655,19 +660,52 @@ def render_navbar():
 
     st.markdown('</div></div>', unsafe_allow_html=True)
 
+# How often an open page checks the change feed for writes made by other sessions
+LIVE_UPDATE_SECONDS = 3
+
+@st.fragment(run_every=LIVE_UPDATE_SECONDS)
+def watch_changes():
+    feed = st.session_state.data_handler.feed
+    seen = st.session_state.get("feed_seq")
+    if seen is None or feed.latest_seq() <= seen:
+        return
+    # Cached frames and metrics were already patched by the writer; the rerun only redraws
+    changes = feed.since(seen)
+    st.session_state.live_changes = len(changes) if changes is not None else None
+    st.rerun(scope="app")
+
 def init_state():
     if "current_page" not in st.session_state:
         st.session_state.current_page = "Dashboard"
     if "data_handler" not in st.session_state:
-        st.session_state.data_handler = DataHandler()
+        # Every session uses the same handler, its read cache and its single set of listeners
+        st.session_state.data_handler = get_data_handler()
+        settings = st.session_state.data_handler.load_settings()
+        set_backend(settings.get('compute_backend', get_backend_name()))
+        set_memory_limit(settings.get('memory_limit_mb', get_memory_limit()))
+    if "anomaly_monitor" not in st.session_state:
+        st.session_state.anomaly_monitor = st.session_state.data_handler.shared('anomaly_monitor', lambda handler: AnomalyMonitor(handler).attach())
+    if "categorizer" not in st.session_state:
+        st.session_state.categorizer = st.session_state.data_handler.shared('categorizer', lambda handler: CategorizerService(handler).attach())
     if "currency" not in st.session_state:
         st.session_state.currency = "$"
+    if "trace" not in st.session_state:
+        st.session_state.trace = Trace()
 
 def main():
     load_custom_css()
     init_state()
+    trace = st.session_state.trace
+    trace.begin_run()
+    activate(trace)
     render_navbar()
 
+    st.session_state.feed_seq = st.session_state.data_handler.feed.latest_seq()
+    if "live_changes" in st.session_state:
+        changes = st.session_state.pop("live_changes")
+        st.toast(f"{changes} change{'s' if changes != 1 else ''} from another session" if changes is not None else "Data changed in another session")
+    watch_changes()
+
     page = st.session_state.current_page
     if page == "Dashboard":
         render_dashboard()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.backends import BACKENDS, available_backends, set_backend, to_arrow
+from utils.calculations import FinancialCalculator
+from utils.data_handler import compact_transactions
+from benchmarks.synthetic import generate_transactions, generate_budgets
+from benchmarks.run_benchmarks import END_YEAR, measure
+
+DEFAULT_SIZES = [1000000, 5000000]
+
+
+def calculator_calls(budgets_df):
+    year, month = END_YEAR, 6
+    return [
+        ('get_monthly_summary', lambda df: FinancialCalculator.get_monthly_summary(df, year, month)),
+        ('get_expense_by_category', lambda df: FinancialCalculator.get_expense_by_category(df, year, month)),
+        ('get_monthly_trend', lambda df: FinancialCalculator.get_monthly_trend(df, 12)),
+        ('get_budget_comparison', lambda df: FinancialCalculator.get_budget_comparison(df, budgets_df, year, month)),
+        ('get_yearly_summary', lambda df: FinancialCalculator.get_yearly_summary(df, year)),
+        ('get_category_analysis', lambda df: FinancialCalculator.get_category_analysis(df, year)),
+    ]
+
+
+def load_frame(rows, seed):
+    df = generate_transactions(rows, seed=seed, end_year=END_YEAR)
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    return compact_transactions(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time FinancialCalculator on every installed backend against pandas.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--backends', nargs='+', default=None, help="Defaults to every installed backend.")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    backends = [name for name in (args.backends or available_backends()) if name != 'pandas']
+    if not backends:
+        print("Only pandas is installed; install polars or duckdb to compare backends.")
+        return 0
+
+    calls = calculator_calls(generate_budgets(seed=args.seed, end_year=END_YEAR))
+
+    for rows in args.sizes:
+        df = load_frame(rows, args.seed)
+        print(f"\n{rows:>10,} rows")
+        # Conversion is paid once per loaded frame and then cached for every later call
+        conversions = ''.join(
+            f"{backend} {measure(lambda: BACKENDS[backend].convert(to_arrow(df)[0]), args.repeats, track_memory=False)['p50_ms']:.1f} ms  "
+            for backend in backends
+        )
+        print(f"{'':>10} {'to_engine':<32} {conversions}")
+        for backend in backends:
+            BACKENDS[backend].frame(df)
+        for name, call in calls:
+            timings = {}
+            for backend in ['pandas'] + backends:
+                set_backend(backend)
+                timings[backend] = measure(lambda: call(df), args.repeats, track_memory=False)['p50_ms']
+            speedups = ''.join(f"  {backend} {timings[backend]:>7.1f} ms ({timings['pandas'] / timings[backend]:.1f}x)" for backend in backends)
+            print(f"{'':>10} {name:<32} pandas {timings['pandas']:>7.1f} ms{speedups}")
+
+    set_backend('pandas')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.data_handler import DataHandler, get_data_handler
+from benchmarks.synthetic import generate_transactions
+from benchmarks.run_benchmarks import END_YEAR
+
+DEFAULT_SESSIONS = [10, 50, 200]
+
+
+def run_sessions(handler_for, sessions, workers):
+    # Each simulated session opens its handler and renders the transactions page once
+    def session(_):
+        started = time.perf_counter()
+        handler_for().load_transactions()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        timings = np.array(list(pool.map(session, range(sessions))))
+    return (time.perf_counter() - started) * 1000, float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a handler per session with one shared handler.")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--sessions', type=int, nargs='+', default=DEFAULT_SESSIONS)
+    parser.add_argument('--workers', type=int, default=16, help="Sessions served at the same time.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix='finance_sessions_')
+    try:
+        DataHandler(data_dir).save_transactions(generate_transactions(args.rows, seed=args.seed, end_year=END_YEAR))
+        print(f"{args.rows:,} rows, {args.workers} sessions at a time")
+        for sessions in args.sessions:
+            for label, handler_for in (('per session', lambda: DataHandler(data_dir)), ('shared', lambda: get_data_handler(data_dir))):
+                total, p50, p95 = run_sessions(handler_for, sessions, args.workers)
+                print(f"  {sessions:>5} sessions  {label:<12} total {total:>9.1f} ms  p50 {p50:>8.1f} ms  p95 {p95:>8.1f} ms")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
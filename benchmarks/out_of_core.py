@@ -0,0 +1,80 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.data_handler import TRANSACTION_COLUMNS, DATE_FORMAT
+from utils.parallel_reports import ReportGenerator
+from utils.partitions import PartitionStore
+from utils.calculations import FinancialCalculator
+from utils.streaming import ChunkedLedger
+from benchmarks.synthetic import generate_transactions
+from benchmarks.run_benchmarks import END_YEAR, measure
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_LIMITS = [512, 64, 16]
+YEARS = 10
+
+
+def build_store(directory, rows, categories, seed):
+    store = PartitionStore(directory, TRANSACTION_COLUMNS, date_format=DATE_FORMAT, key='id')
+    # One year per batch, so generating the archive never needs it all in memory either
+    for offset, year in enumerate(range(END_YEAR - YEARS + 1, END_YEAR + 1)):
+        batch = generate_transactions(rows // YEARS, categories=categories, years=1, seed=seed + offset, end_year=year)
+        store.append(batch)
+    return store
+
+
+def same_rollup(streamed, expected):
+    keys = ['year', 'month', 'type', 'category']
+    left = streamed.sort_values(keys).reset_index(drop=True)
+    right = expected.sort_values(keys).reset_index(drop=True)
+    return len(left) == len(right) and (left[keys].astype(str) == right[keys].astype(str)).all().all() and np.allclose(left['amount'], right['amount']) and (left['count'].to_numpy() == right['count'].to_numpy()).all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize an on-disk ledger chunk by chunk under different memory caps.")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--limits', type=int, nargs='+', default=DEFAULT_LIMITS, help="Memory caps in MB.")
+    parser.add_argument('--categories', type=int, default=12, help="More categories mean more groups and earlier spilling.")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-compare', action='store_true', help="Skip the in-memory reference, for archives larger than RAM.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='finance-ooc-')
+    try:
+        store = build_store(directory, args.rows, args.categories, args.seed)
+        print(f"{store.total_rows():,} rows in {len(store.partitions())} partitions")
+
+        expected = None
+        if not args.no_compare:
+            df = store.read(parse_dates=['date'], date_format=DATE_FORMAT)
+            stats = measure(lambda: ReportGenerator().build_rollup(df), args.repeats)
+            expected = ReportGenerator().build_rollup(df)
+            print(f"  in memory rollup       p50 {stats['p50_ms']:>9.1f} ms  peak {stats['peak_mb']:>7.1f} MB (frame already loaded)")
+            del df
+
+        for limit in args.limits:
+            ledger = ChunkedLedger(store, memory_limit_mb=limit)
+            stats = measure(ledger.rollup, args.repeats)
+            rollup = ledger.rollup()
+            check = '' if expected is None else ('  matches' if same_rollup(rollup, expected) else '  MISMATCH')
+            print(f"  streamed, cap {limit:>5} MB p50 {stats['p50_ms']:>9.1f} ms  peak {stats['peak_mb']:>7.1f} MB  "
+                  f"{ledger.stats['chunks']} chunks, {ledger.stats['spills']} spills{check}")
+
+            summary = measure(lambda: FinancialCalculator.get_monthly_summary(ledger, END_YEAR, 6), args.repeats, track_memory=False)
+            print(f"  {'':<22} one month via calculator p50 {summary['p50_ms']:>7.1f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.data_handler import TRANSACTION_COLUMNS, DATE_FORMAT
+from utils.events import EventLog, SNAPSHOT_EVERY
+from benchmarks.synthetic import generate_transactions
+from benchmarks.run_benchmarks import END_YEAR, measure
+
+DEFAULT_ROWS = 100000
+DEFAULT_TAILS = [0, 100, 1000, SNAPSHOT_EVERY]
+
+
+def ledger_rows(rows, seed, first_id=1):
+    df = generate_transactions(rows, seed=seed, end_year=END_YEAR).reindex(columns=TRANSACTION_COLUMNS)
+    df['id'] = range(first_id, first_id + rows)
+    return df
+
+
+def open_log(directory, snapshot_every=SNAPSHOT_EVERY):
+    return EventLog(directory, TRANSACTION_COLUMNS, date_format=DATE_FORMAT, snapshot_every=snapshot_every)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time event-log appends, snapshot+tail replay and full replay.")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--tails', type=int, nargs='+', default=DEFAULT_TAILS, help="Events after the latest snapshot.")
+    parser.add_argument('--batch', type=int, default=1000, help="Rows per insert when replaying the whole ledger as events.")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='ledger-bench-')
+    try:
+        base = ledger_rows(args.rows, args.seed)
+        extra = ledger_rows(max(args.tails), args.seed + 1, first_id=args.rows + 1)
+        print(f"{args.rows:,} rows in the snapshot")
+
+        log = open_log(os.path.join(root, 'tails'))
+        log.append('baseline', state=base)
+        appended = 0
+        for tail in sorted(args.tails):
+            while appended < tail:
+                log.append('insert', after=extra.iloc[[appended]])
+                appended += 1
+            stats = measure(lambda: log.replay(), args.repeats, track_memory=False)
+            print(f"  replay snapshot + {tail:>6,} events    p50 {stats['p50_ms']:>8.1f} ms")
+
+        row = extra.iloc[[0]]
+        stats = measure(lambda: log.append('update', before=row, after=row), args.repeats * 20, track_memory=False)
+        print(f"  append one-row event             p50 {stats['p50_ms']:>8.2f} ms")
+        stats = measure(lambda: log.undoable(), args.repeats, track_memory=False)
+        print(f"  find undoable event              p50 {stats['p50_ms']:>8.2f} ms")
+
+        # The same ledger with no snapshot at all: every row comes from an insert event
+        full = open_log(os.path.join(root, 'full'), snapshot_every=float('inf'))
+        for start in range(0, args.rows, args.batch):
+            full.append('insert', after=base.iloc[start:start + args.batch])
+        stats = measure(lambda: full.replay(), args.repeats, track_memory=False)
+        print(f"  replay {full.last_seq():>6,} events, no snapshot  p50 {stats['p50_ms']:>8.1f} ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
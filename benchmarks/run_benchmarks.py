@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from utils.data_handler import DataHandler, memory_per_row, TARGET_BYTES_PER_ROW
+from utils.calculations import FinancialCalculator
+from utils.topk import TopIndex
+from utils.rolling import PrefixSums
+from benchmarks.synthetic import generate_transactions, generate_budgets
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+END_YEAR = 2026
+
+
+def measure(fn, repeats, setup=None, track_memory=True):
+    timings = []
+    for _ in range(repeats):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        fn(state) if setup else fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    peak_mb = None
+    if track_memory:
+        # Separate pass so tracemalloc overhead never leaks into the latency numbers
+        state = setup() if setup else None
+        tracemalloc.start()
+        try:
+            fn(state) if setup else fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'repeats': repeats,
+        'min_ms': float(timings.min()),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'peak_mb': peak_mb
+    }
+
+
+def data_handler_cases(handler, transactions, budgets):
+    def write_transactions():
+        handler.replace_transactions(transactions)
+
+    def write_budgets():
+        budgets.to_csv(handler.budgets_file, index=False)
+
+    def load_then_insert():
+        handler.load_transactions()
+        handler.save_transaction(f"{END_YEAR}-06-15", 42.5, 'Food & Dining', 'Benchmark row', 'Expense')
+
+    def backup_then_insert():
+        handler.create_backup()
+        handler.save_transaction(f"{END_YEAR}-06-15", 42.5, 'Food & Dining', 'Benchmark row', 'Expense')
+
+    def write_then_pick():
+        # Ids are never reused, so each rewrite hands out new ones
+        write_transactions()
+        return int(handler.load_transactions()['id'].iloc[-1])
+
+    return [
+        ('DataHandler.load_transactions', lambda _: handler.load_transactions(), handler.invalidate),
+        ('DataHandler.load_transactions[cached]', handler.load_transactions, None),
+        ('DataHandler.load_transactions[after insert]', lambda _: handler.load_transactions(), load_then_insert),
+        ('DataHandler.load_transactions[6 months]', lambda _: handler.load_transactions(
+            start=f"{END_YEAR}-01-01", end=f"{END_YEAR}-06-30"), handler.invalidate),
+        ('DataHandler.get_data_version', handler.get_data_version, None),
+        ('DataHandler.save_transaction', lambda _: handler.save_transaction(
+            f"{END_YEAR}-06-15", 42.5, 'Food & Dining', 'Benchmark row', 'Expense'), write_transactions),
+        ('DataHandler.update_transaction', lambda transaction_id: handler.update_transaction(
+            transaction_id, f"{END_YEAR}-06-16", 43.0, 'Shopping', 'Benchmark edit', 'Expense'), write_then_pick),
+        ('DataHandler.delete_transaction', handler.delete_transaction, write_then_pick),
+        ('DataHandler.load_budgets', handler.load_budgets, None),
+        ('DataHandler.save_budget', lambda _: handler.save_budget('Travel', 750.0, f"{END_YEAR}-06"), write_budgets),
+        ('DataHandler.load_categories', handler.load_categories, None),
+        ('DataHandler.save_category', lambda: handler.save_category('expense', 'Benchmark'), None),
+        ('DataHandler.load_settings', handler.load_settings, None),
+        ('DataHandler.save_settings', lambda: handler.save_settings({'currency': '$', 'monthly_income_target': 5000}), None),
+        ('DataHandler.create_backup[incremental]', lambda _: handler.create_backup(), backup_then_insert),
+        ('DataHandler.reset_all_data', lambda _: handler.reset_all_data(), lambda: (write_transactions(), write_budgets())),
+    ]
+
+
+def calculator_cases(df, budgets_df):
+    year, month = END_YEAR, 6
+    return [
+        ('FinancialCalculator.get_monthly_summary', lambda: FinancialCalculator.get_monthly_summary(df, year, month), None),
+        ('FinancialCalculator.get_expense_by_category', lambda: FinancialCalculator.get_expense_by_category(df, year, month), None),
+        ('FinancialCalculator.get_monthly_trend', lambda: FinancialCalculator.get_monthly_trend(df, 12), None),
+        ('FinancialCalculator.get_budget_comparison', lambda: FinancialCalculator.get_budget_comparison(df, budgets_df, year, month), None),
+        ('FinancialCalculator.get_yearly_summary', lambda: FinancialCalculator.get_yearly_summary(df, year), None),
+        ('FinancialCalculator.get_category_analysis', lambda: FinancialCalculator.get_category_analysis(df, year), None),
+    ]
+
+
+def index_cases(df):
+    year, month = END_YEAR, 6
+    index = TopIndex.from_frame(df)
+    return [
+        ('TopIndex.from_frame', lambda: TopIndex.from_frame(df), None),
+        ('TopIndex.recent', lambda: index.recent(5), None),
+        ('TopIndex.largest', lambda: index.largest(10, year, month), None),
+        ('TopIndex.top_categories', lambda: index.top_categories(5, year), None),
+    ]
+
+
+def prefix_cases(df):
+    sums = PrefixSums.from_frame(df)
+    as_of = f"{END_YEAR}-06-30"
+    return [
+        ('PrefixSums.from_frame', lambda: PrefixSums.from_frame(df), None),
+        ('PrefixSums.trailing', lambda: sums.trailing(30, as_of), None),
+        ('PrefixSums.rolling', lambda: sums.rolling(30), None),
+    ]
+
+
+def run_size(rows, args):
+    transactions = generate_transactions(
+        rows,
+        categories=args.categories,
+        years=args.years,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+        end_year=END_YEAR
+    )
+    budgets = generate_budgets(categories=args.categories, seed=args.seed, end_year=END_YEAR)
+
+    data_dir = tempfile.mkdtemp(prefix='finance_bench_')
+    try:
+        handler = DataHandler(data_dir=data_dir)
+        handler.replace_transactions(transactions)
+        budgets.to_csv(handler.budgets_file, index=False)
+
+        df = handler.load_transactions()
+        budgets_df = handler.load_budgets()
+        bytes_per_row = memory_per_row(df)
+        print(f"{rows:>10,} {'in-memory bytes per row':<45} {bytes_per_row:>10.1f} B  (target {TARGET_BYTES_PER_ROW} B)")
+
+        cases = data_handler_cases(handler, transactions, budgets) + calculator_cases(df, budgets_df) + index_cases(df) + prefix_cases(df)
+        results = {}
+        for name, fn, setup in cases:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, args.repeats, setup, track_memory=not args.no_memory)
+            print(f"{rows:>10,} {name:<45} p50 {results[name]['p50_ms']:>10.2f} ms  "
+                  f"p95 {results[name]['p95_ms']:>10.2f} ms  peak {results[name]['peak_mb'] or 0:>8.1f} MB")
+        return results, bytes_per_row
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    regressions = []
+    for size, cases in results['sizes'].items():
+        for name, current in cases.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            delta = current['p50_ms'] - previous['p50_ms']
+            if delta > min_delta_ms and current['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+                regressions.append((size, name, previous['p50_ms'], current['p50_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DataHandler and FinancialCalculator on synthetic ledgers.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Row counts to benchmark (up to 10M).")
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--categories', type=int, default=12)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--duplicate-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--filter', default=None, help="Only run cases whose name contains this text.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the peak-memory pass.")
+    parser.add_argument('--output', default=None, help="Write results JSON to this path.")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p50 slowdown before flagging a regression.")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this.")
+    args = parser.parse_args(argv)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'repeats': args.repeats,
+            'categories': args.categories,
+            'years': args.years,
+            'duplicate_rate': args.duplicate_rate,
+            'seed': args.seed
+        },
+        'sizes': {},
+        'bytes_per_row': {}
+    }
+
+    for rows in args.sizes:
+        results['sizes'][str(rows)], results['bytes_per_row'][str(rows)] = run_size(rows, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for size, name, before, after in regressions:
+            print(f"  {int(size):>10,} {name:<45} {before:.2f} ms -> {after:.2f} ms ({after / before:.2f}x)")
+        return 1
+
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+EXPENSE_CATEGORIES = [
+    'Food & Dining', 'Transportation', 'Shopping', 'Entertainment',
+    'Bills & Utilities', 'Healthcare', 'Education', 'Travel', 'Other'
+]
+INCOME_CATEGORIES = ['Salary', 'Freelance', 'Investment', 'Business', 'Gift']
+DESCRIPTIONS = [
+    'Grocery run', 'Uber ride', 'Netflix', 'Electricity bill', 'Pharmacy',
+    'Course fee', 'Flight', 'Coffee', 'Monthly salary', 'Client invoice',
+    'Dividend', 'Birthday gift', 'No description'
+]
+
+
+def _category_names(categories):
+    names = EXPENSE_CATEGORIES + INCOME_CATEGORIES
+    if categories <= len(names):
+        return names[:categories]
+    return names + [f"Category {i}" for i in range(len(names), categories)]
+
+
+def generate_transactions(rows, categories=12, years=10, duplicate_rate=0.0, income_share=0.2, seed=42, end_year=2026):
+    rng = np.random.default_rng(seed)
+
+    unique_rows = max(int(round(rows * (1 - duplicate_rate))), 1)
+    start = np.datetime64(f"{end_year - years + 1}-01-01")
+    days = int((np.datetime64(f"{end_year + 1}-01-01") - start).astype(int))
+
+    names = np.array(_category_names(categories), dtype=object)
+    income_names = np.array([name for name in names if name in INCOME_CATEGORIES] or names[-1:], dtype=object)
+    expense_names = np.array([name for name in names if name not in INCOME_CATEGORIES] or names[:1], dtype=object)
+
+    is_income = rng.random(unique_rows) < income_share
+    category = np.where(
+        is_income,
+        income_names[rng.integers(0, len(income_names), unique_rows)],
+        expense_names[rng.integers(0, len(expense_names), unique_rows)]
+    )
+    amount = np.where(
+        is_income,
+        rng.lognormal(7.5, 0.6, unique_rows),
+        rng.lognormal(3.5, 1.0, unique_rows)
+    ).round(2)
+
+    df = pd.DataFrame({
+        'date': start + rng.integers(0, days, unique_rows).astype('timedelta64[D]'),
+        'amount': amount,
+        'category': category,
+        'description': np.array(DESCRIPTIONS, dtype=object)[rng.integers(0, len(DESCRIPTIONS), unique_rows)],
+        'type': np.where(is_income, 'Income', 'Expense')
+    })
+
+    # Duplicates mimic repeated bank imports of the same row
+    duplicates = rows - unique_rows
+    if duplicates > 0:
+        df = pd.concat([df, df.iloc[rng.integers(0, unique_rows, duplicates)]], ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    return df
+
+
+def generate_budgets(categories=12, years=1, seed=42, end_year=2026):
+    rng = np.random.default_rng(seed)
+    names = [name for name in _category_names(categories) if name not in INCOME_CATEGORIES]
+    months = [f"{year}-{month:02d}" for year in range(end_year - years + 1, end_year + 1) for month in range(1, 13)]
+
+    rows = [
+        {'category': name, 'amount': float(rng.integers(10, 100) * 10), 'month': month}
+        for month in months
+        for name in names
+    ]
+    return pd.DataFrame(rows, columns=['category', 'amount', 'month'])
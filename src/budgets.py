@@ -1,7 +1,10 @@
 import streamlit as st
 from datetime import datetime
 from utils.calculations import FinancialCalculator
+from utils.currency import code_for_symbol, get_reporting_transactions
+from utils.profiling import traced
 
+@traced('page')
 def render_budgets():
     st.markdown('<div class="content-card">', unsafe_allow_html=True)
     st.markdown('<h2 class="section-title">Budget Planner</h2>', unsafe_allow_html=True)
@@ -78,10 +81,12 @@ def render_budgets():
             with col2:
                 analysis_month = st.selectbox("Month", range(1, 13), index=datetime.now().month - 1, format_func=lambda x: datetime(2000, x, 1).strftime('%B'), key="analysis_month")
         
-        transactions_df = data_handler.load_transactions()
+        # Two years of history feed the trailing averages and seasonality behind the projection
+        start, _ = FinancialCalculator.get_window(analysis_year, analysis_month, 24)
+        transactions_df = get_reporting_transactions(data_handler, code_for_symbol(currency), start=start)
         budgets_df = data_handler.load_budgets()
         
-        comparison = FinancialCalculator.get_budget_comparison(
+        comparison = FinancialCalculator.get_budget_forecast(
             transactions_df,
             budgets_df,
             analysis_year,
@@ -93,11 +98,12 @@ def render_budgets():
             total_spent = comparison['actual'].sum()
             total_remaining = total_budget - total_spent
             overall_percent = (total_spent / total_budget * 100) if total_budget > 0 else 0
+            total_projected = comparison['projected'].sum()
             
             st.markdown(f"""
                 <div style="padding: 2rem; background: #069494; border-radius: 15px; color: white; margin-bottom: 2rem;">
                     <h3 style="margin-top: 0; font-size: 1.5rem;">Overall Budget Summary</h3>
-                    <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 1rem; margin-top: 1rem;">
+                    <div style="display: grid; grid-template-columns: repeat(5, 1fr); gap: 1rem; margin-top: 1rem;">
                         <div>
                             <div style="opacity: 0.9; font-size: 0.9rem;">Total Budget</div>
                             <div style="font-size: 1.8rem; font-weight: 800;">{currency}{total_budget:,.2f}</div>
@@ -114,6 +120,10 @@ def render_budgets():
                             <div style="opacity: 0.9; font-size: 0.9rem;">Used</div>
                             <div style="font-size: 1.8rem; font-weight: 800;">{overall_percent:.1f}%</div>
                         </div>
+                        <div>
+                            <div style="opacity: 0.9; font-size: 0.9rem;">Projected</div>
+                            <div style="font-size: 1.8rem; font-weight: 800;">{currency}{total_projected:,.2f}</div>
+                        </div>
                     </div>
                 </div>
             """, unsafe_allow_html=True)
@@ -134,6 +144,15 @@ def render_budgets():
                     status_text = "✅ On Track"
                     status_class = "alert-success"
                 
+                if row['projected_overspend'] > 0:
+                    if row['percentage'] < 100:
+                        status_text = "📈 Projected Overspend"
+                    projection_note = f"{currency}{row['projected_overspend']:,.2f} over budget"
+                    projection_color = "#FF8243"
+                else:
+                    projection_note = "within budget"
+                    projection_color = "#069494"
+                
                 st.markdown(f"""
                     <div style="padding: 2rem; background: white; border-radius: 15px; margin-bottom: 1.5rem; box-shadow: 0 5px 20px rgba(0,0,0,0.08); border-left: 5px solid {status_color};">
                         <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem;">
@@ -165,6 +184,10 @@ def render_budgets():
                         <div style="text-align: center; font-weight: 700; color: {status_color}; font-size: 1.1rem;">
                             {row['percentage']:.1f}% Used
                         </div>
+                        
+                        <div style="text-align: center; color: #7f8c8d; font-size: 0.95rem; margin-top: 0.5rem;">
+                            Projected month-end: <strong>{currency}{row['projected']:,.2f}</strong> ({row['projected_percentage']:.1f}%) · <span style="color: {projection_color}; font-weight: 700;">{projection_note}</span>
+                        </div>
                     </div>
                 """, unsafe_allow_html=True)
         else:
@@ -216,17 +216,82 @@
 
 
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 import plotly.graph_objects as go
+from utils.chart_cache import get_chart_cache
+from utils.metrics import MetricsStore
+from utils.topk import TopIndex
+from utils.rolling import PrefixSums, TRAILING_WINDOWS
+from utils.currency import CurrencyConverter, code_for_symbol, get_reporting_transactions
+from utils.accounts import get_account_balances
 from utils.calculations import FinancialCalculator
+from utils.parallel_reports import ReportGenerator
+from utils.data_handler import TRANSFER_TYPE
+from utils.profiling import traced, span
 
+@traced('page')
 def render_dashboard():
     dh = st.session_state.data_handler
-    df = dh.load_transactions()
+    data_version = dh.get_data_version()
     currency = st.session_state.currency
-
+    reporting_currency = code_for_symbol(currency)
     now = datetime.now()
-    summary = FinancialCalculator.get_monthly_summary(df, now.year, now.month)
+    # Everything below shows at most the last six months, so older partitions are never read
+    start, _ = FinancialCalculator.get_window(now.year, now.month, 6)
+    window = {}
+
+    def load_window():
+        # Only a rebuild reads the rows, so a rerun with every store current reads nothing
+        if 'df' not in window:
+            window['df'] = get_reporting_transactions(dh, reporting_currency, start=start)
+        return window['df']
+
+    chart_version = f"{data_version}:{reporting_currency}"
+    chart_cache = get_chart_cache()
+
+    # Writes from any session go through the shared handler and patch the store; anything else forces a rebuild
+    metrics = st.session_state.get("dashboard_metrics")
+    if metrics is None or not metrics.is_current(data_version, reporting_currency):
+        if metrics is not None:
+            metrics.detach(dh)
+        converter = CurrencyConverter(dh)
+        metrics = MetricsStore.from_frame(
+            load_window(),
+            data_version,
+            currency=reporting_currency,
+            convert=lambda rows: converter.convert(rows, reporting_currency)
+        ).attach(dh)
+        st.session_state.dashboard_metrics = metrics
+
+    top_index = st.session_state.get("dashboard_top")
+    if top_index is None or not top_index.is_current(data_version, reporting_currency):
+        if top_index is not None:
+            top_index.detach(dh)
+        converter = CurrencyConverter(dh)
+        top_index = TopIndex.from_frame(
+            load_window(),
+            data_version,
+            currency=reporting_currency,
+            convert=lambda rows: converter.convert(rows, reporting_currency)
+        ).attach(dh)
+        st.session_state.dashboard_top = top_index
+
+    # The six-month window covers every trailing window, and each one is two prefix lookups
+    prefix = st.session_state.get("dashboard_prefix")
+    if prefix is None or not prefix.is_current(data_version, reporting_currency):
+        if prefix is not None:
+            prefix.detach(dh)
+        converter = CurrencyConverter(dh)
+        prefix = PrefixSums.from_frame(
+            load_window(),
+            data_version,
+            currency=reporting_currency,
+            convert=lambda rows: converter.convert(rows, reporting_currency)
+        ).attach(dh)
+        st.session_state.dashboard_prefix = prefix
+
+    summary = metrics.get_monthly_summary(now.year, now.month)
 
     st.markdown("## 👋 Welcome back")
     st.markdown("Here’s a clear snapshot of your finances this month.")
@@ -243,27 +308,43 @@ def render_dashboard():
             </div>
             """, unsafe_allow_html=True)
 
-    metric(col1, "Income", f"{currency}{summary['total_income']:,.2f}", "income", "Monthly earnings")
-    metric(col2, "Expenses", f"{currency}{summary['total_expenses']:,.2f}", "expense", "Money spent")
-    metric(col3, "Balance", f"{currency}{summary['balance']:,.2f}", "balance", "Net result")
+    # Last month is inside the six-month window, so the deltas come from the same store
+    totals = ReportGenerator.compare_totals(metrics.get_comparison('month', now.year, now.month))
+
+    def versus_last_month(flow, fallback):
+        change_pct = totals.loc[flow, 'change_pct']
+        return fallback if pd.isna(change_pct) else f"{change_pct:+.1f}% vs last month"
+
+    metric(col1, "Income", f"{currency}{summary['total_income']:,.2f}", "income", versus_last_month('Income', "Monthly earnings"))
+    metric(col2, "Expenses", f"{currency}{summary['total_expenses']:,.2f}", "expense", versus_last_month('Expenses', "Money spent"))
+    metric(col3, "Balance", f"{currency}{summary['balance']:,.2f}", "balance", versus_last_month('Balance', "Net result"))
     metric(col4, "Savings Rate", f"{summary['savings_rate']:.1f}%", "savings", "Income saved")
 
+    trailing = " · ".join(f"{days} days: {currency}{prefix.trailing(days, now):,.2f}" for days in TRAILING_WINDOWS)
+    st.caption(f"Trailing spend — {trailing}")
+
     left, right = st.columns(2)
 
     with left:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown('<div class="section-title">Expense Breakdown</div>', unsafe_allow_html=True)
 
-        cat = FinancialCalculator.get_expense_by_category(df, now.year, now.month)
-        if cat.empty:
-            st.info("No expenses recorded yet.")
-        else:
+        def build_expense_pie():
+            cat = metrics.get_expense_by_category(now.year, now.month)
+            if cat.empty:
+                return None
             fig = go.Figure(go.Pie(
                 labels=cat["category"],
                 values=cat["amount"],
                 hole=.5
             ))
             fig.update_layout(height=350, margin=dict(t=10,b=10))
+            return fig
+
+        fig = chart_cache.get_figure(chart_version, (now.year, now.month), "dashboard_expense_pie", build_expense_pie)
+        if fig is None:
+            st.info("No expenses recorded yet.")
+        else:
             st.plotly_chart(fig, use_container_width=True)
 
         st.markdown('</div>', unsafe_allow_html=True)
@@ -272,36 +353,55 @@ def render_dashboard():
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown('<div class="section-title">Cashflow Trend</div>', unsafe_allow_html=True)
 
-        trend = FinancialCalculator.get_monthly_trend(df, 6)
-        if trend.empty:
-            st.info("Add transactions to see trends.")
-        else:
+        def build_trend_chart():
+            trend = metrics.get_monthly_trend(6)
+            if trend.empty:
+                return None
             fig = go.Figure()
             fig.add_scatter(x=trend.index, y=trend["Income"], name="Income")
             fig.add_scatter(x=trend.index, y=trend["Expenses"], name="Expenses")
             fig.update_layout(height=350)
+            return fig
+
+        fig = chart_cache.get_figure(chart_version, 6, "dashboard_cashflow_trend", build_trend_chart)
+        if fig is None:
+            st.info("Add transactions to see trends.")
+        else:
             st.plotly_chart(fig, use_container_width=True)
 
         st.markdown('</div>', unsafe_allow_html=True)
 
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown('<div class="section-title">Account Balances</div>', unsafe_allow_html=True)
+
+    as_of = st.date_input("Balances as of", value=now.date(), key="balances_as_of")
+    balances = get_account_balances(dh, reporting_currency, as_of)
+    for col, (_, account) in zip(st.columns(max(len(balances), 1)), balances.iterrows()):
+        with col:
+            st.metric(account["account"], f"{currency}{account['balance']:,.2f}", help=account["kind"] or None)
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown('<div class="section-title">Recent Transactions</div>', unsafe_allow_html=True)
 
-    if df.empty:
+    recent = top_index.recent(5)
+    if recent.empty:
         st.info("No transactions yet.")
     else:
-        for _, r in df.sort_values("date", ascending=False).head(5).iterrows():
-            color = "#0f766e" if r["type"] == "Income" else "#ea580c"
-            st.markdown(f"""
-            <div class="transaction">
-                <div class="transaction-left">
-                    <strong>{r["category"]}</strong>
-                    <span>{r["description"]}</span>
+        with span("recent_transactions_html", "html"):
+            for _, r in recent.iterrows():
+                color = "#0f766e" if r["type"] == "Income" else "#2563eb" if r["type"] == TRANSFER_TYPE else "#ea580c"
+                st.markdown(f"""
+                <div class="transaction">
+                    <div class="transaction-left">
+                        <strong>{r["category"]}</strong>
+                        <span>{r["description"]}</span>
+                    </div>
+                    <div class="transaction-amount" style="color:{color}">
+                        {currency}{r["amount"]:,.2f}
+                    </div>
                 </div>
-                <div class="transaction-amount" style="color:{color}">
-                    {currency}{r["amount"]:,.2f}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
 
     st.markdown('</div>', unsafe_allow_html=True)
@@ -1,18 +1,55 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
 from utils.calculations import FinancialCalculator
+from utils.parallel_reports import ReportGenerator, GRANULARITIES
+from utils.chart_cache import get_chart_cache
+from utils.downsampling import get_tiers, downsample_cashflow, MAX_CHART_POINTS
+from utils.forecasting import get_forecast, MODELS
+from utils.currency import CurrencyConverter, code_for_symbol, get_reporting_transactions, get_reporting_ledger
+from utils.topk import TopIndex
+from utils.rolling import get_prefix_sums, TRAILING_WINDOWS
+from utils.streaming import OUT_OF_CORE_ROWS, get_rollup
+from utils.profiling import traced
 
+@traced('page')
 def render_reports():
     st.markdown('<div class="content-card">', unsafe_allow_html=True)
     st.markdown('<h2 class="section-title">Financial Reports</h2>', unsafe_allow_html=True)
     
     data_handler = st.session_state.data_handler
-    transactions_df = data_handler.load_transactions()
     currency = st.session_state.currency
+    reporting_currency = code_for_symbol(currency)
+    chart_cache = get_chart_cache()
+    data_version = f"{data_handler.get_data_version()}:{reporting_currency}"
     
-    tab1, tab2, tab3 = st.tabs(["Monthly Report", "Yearly Report", "Category Analysis"])
+    out_of_core = data_handler.partitions.total_rows() >= OUT_OF_CORE_ROWS
+    if out_of_core:
+        # Too large to hold in memory: totals are streamed from disk and the day-level views are skipped
+        transactions_df = get_reporting_ledger(data_handler, reporting_currency)
+        rollup = get_rollup(transactions_df, data_version)
+        st.info(f"This ledger has more than {OUT_OF_CORE_ROWS:,} transactions, so reports are computed from disk. Cash-flow history and the CSV report are not available.")
+    else:
+        transactions_df = get_reporting_transactions(data_handler, reporting_currency)
+        rollup = get_rollup(transactions_df, data_version)
+        
+        # Kept current by write deltas like the dashboard metrics, so top-K lists never sort the history
+        top_index = st.session_state.get("report_top")
+        if top_index is None or not top_index.is_current(data_handler.get_data_version(), reporting_currency):
+            if top_index is not None:
+                top_index.detach(data_handler)
+            converter = CurrencyConverter(data_handler)
+            top_index = TopIndex.from_frame(
+                transactions_df,
+                data_handler.get_data_version(),
+                currency=reporting_currency,
+                convert=lambda rows: converter.convert(rows, reporting_currency)
+            ).attach(data_handler)
+            st.session_state.report_top = top_index
+    
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Monthly Report", "Yearly Report", "Category Analysis", "Forecast", "Comparison"])
     
     with tab1:
         st.subheader("Monthly Financial Report")
@@ -48,23 +85,26 @@ def render_reports():
         if not category_data.empty:
             st.subheader("Expense Distribution")
             
-            colors = ['#FF8243', '#069494', '#FCE883', '#FFC0CB', '#FF6B6B', '#4ECDC4', '#95E1D3', '#F38181']
-            
-            fig = px.bar(
-                category_data,
-                x='category',
-                y='amount',
-                color='category',
-                color_discrete_sequence=colors,
-                labels={'amount': 'Amount', 'category': 'Category'}
-            )
-            
-            fig.update_layout(
-                showlegend=False,
-                height=400,
-                xaxis_tickangle=-45
-            )
+            def build_expense_bar():
+                colors = ['#FF8243', '#069494', '#FCE883', '#FFC0CB', '#FF6B6B', '#4ECDC4', '#95E1D3', '#F38181']
+                
+                fig = px.bar(
+                    category_data,
+                    x='category',
+                    y='amount',
+                    color='category',
+                    color_discrete_sequence=colors,
+                    labels={'amount': 'Amount', 'category': 'Category'}
+                )
+                
+                fig.update_layout(
+                    showlegend=False,
+                    height=400,
+                    xaxis_tickangle=-45
+                )
+                return fig
             
+            fig = chart_cache.get_figure(data_version, (report_year, report_month), 'report_expense_bar', build_expense_bar)
             st.plotly_chart(fig, use_container_width=True)
             
             st.subheader("Category Breakdown")
@@ -73,6 +113,20 @@ def render_reports():
                 use_container_width=True,
                 hide_index=True
             )
+            
+            if not out_of_core:
+                st.subheader("Largest Expenses")
+                largest = top_index.largest(10, report_year, report_month)
+                st.dataframe(
+                    largest.assign(date=largest['date'].dt.strftime('%d %b %Y'))[['date', 'category', 'description', 'amount']].rename(columns={
+                        'date': 'Date',
+                        'category': 'Category',
+                        'description': 'Description',
+                        'amount': f'Amount ({currency})'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
         else:
             st.info("No expense data available for this period.")
         
@@ -103,7 +157,7 @@ def render_reports():
         
         yearly_year = st.number_input("Select Year", min_value=2020, max_value=2030, value=datetime.now().year, key="yearly_year")
         
-        yearly_summary = FinancialCalculator.get_yearly_summary(transactions_df, yearly_year)
+        yearly_summary = ReportGenerator.get_yearly_summary(rollup, yearly_year)
         
         col1, col2, col3 = st.columns(3)
         
@@ -122,7 +176,7 @@ def render_reports():
         
         st.markdown("---")
         
-        trend_data = FinancialCalculator.get_monthly_trend(transactions_df, months=12)
+        trend_data = ReportGenerator.get_monthly_trend(rollup, months=12)
         
         if not trend_data.empty:
             yearly_trend = trend_data[trend_data.index.year == yearly_year]
@@ -130,38 +184,118 @@ def render_reports():
             if not yearly_trend.empty:
                 st.subheader("Monthly Trend")
                 
-                fig = go.Figure()
-                
-                fig.add_trace(go.Bar(
-                    x=yearly_trend.index.strftime('%B'),
-                    y=yearly_trend['Income'],
-                    name='Income',
-                    marker_color='#069494'
-                ))
-                
-                fig.add_trace(go.Bar(
-                    x=yearly_trend.index.strftime('%B'),
-                    y=yearly_trend['Expenses'],
-                    name='Expenses',
-                    marker_color='#FF8243'
-                ))
+                def build_monthly_bars():
+                    fig = go.Figure()
+                    
+                    fig.add_trace(go.Bar(
+                        x=yearly_trend.index.strftime('%B'),
+                        y=yearly_trend['Income'],
+                        name='Income',
+                        marker_color='#069494'
+                    ))
+                    
+                    fig.add_trace(go.Bar(
+                        x=yearly_trend.index.strftime('%B'),
+                        y=yearly_trend['Expenses'],
+                        name='Expenses',
+                        marker_color='#FF8243'
+                    ))
+                    
+                    fig.update_layout(
+                        barmode='group',
+                        height=400,
+                        xaxis_title="Month",
+                        yaxis_title="Amount",
+                        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                    )
+                    return fig
                 
+                fig = chart_cache.get_figure(data_version, yearly_year, 'report_monthly_bars', build_monthly_bars)
+                st.plotly_chart(fig, use_container_width=True)
+        
+        tiers = get_tiers(transactions_df, data_version) if not out_of_core else None
+        daily = tiers['day'] if tiers is not None else None
+        
+        if daily is not None and not daily.empty:
+            st.markdown("---")
+            st.subheader("Cashflow History")
+            
+            first_day = daily.index.min().date()
+            last_day = daily.index.max().date()
+            
+            if first_day < last_day:
+                history_start, history_end = st.slider(
+                    "Visible Range",
+                    min_value=first_day,
+                    max_value=last_day,
+                    value=(first_day, last_day),
+                    format="MMM YYYY",
+                    key="history_range"
+                )
+            else:
+                history_start, history_end = first_day, last_day
+            
+            tier, history = downsample_cashflow(tiers, str(history_start), str(history_end), MAX_CHART_POINTS)
+            
+            def build_history_chart():
+                fig = go.Figure()
+                fig.add_scatter(x=history.index, y=history['Income'], name='Income', line=dict(color='#069494'))
+                fig.add_scatter(x=history.index, y=history['Expenses'], name='Expenses', line=dict(color='#FF8243'))
+                fig.add_scatter(x=history.index, y=history['Balance'], name='Balance', line=dict(color='#2563eb', dash='dot'))
                 fig.update_layout(
-                    barmode='group',
                     height=400,
-                    xaxis_title="Month",
-                    yaxis_title="Amount",
+                    hovermode='x unified',
                     legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
                 )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                return fig
+            
+            fig = chart_cache.get_figure(data_version, (str(history_start), str(history_end)), 'report_cashflow_history', build_history_chart)
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"Showing {len(history)} {tier} points (budget {MAX_CHART_POINTS}).")
+        
+        prefix = get_prefix_sums(transactions_df, data_version) if not out_of_core else None
+        
+        if prefix is not None and prefix.days:
+            st.markdown("---")
+            st.subheader("Rolling Spend")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                rolling_days = st.selectbox("Window", TRAILING_WINDOWS, format_func=lambda days: f"{days} days", index=1, key="rolling_window")
+            
+            with col2:
+                expense_categories = sorted(category for trans_type, category in prefix.series if trans_type == 'Expense')
+                rolling_category = st.selectbox("Category", ["All"] + expense_categories, key="rolling_category")
+            
+            def build_rolling_chart():
+                # Every day's window total comes from the prefix sums in one pass
+                rolling = prefix.rolling(rolling_days, category=None if rolling_category == "All" else rolling_category)
+                fig = go.Figure()
+                fig.add_scatter(x=rolling.index, y=rolling.values, name=f"{rolling_days}-day spend", line=dict(color='#FF8243'))
+                fig.update_layout(
+                    height=400,
+                    hovermode='x unified',
+                    xaxis_title="Date",
+                    yaxis_title="Amount"
+                )
+                return fig
+            
+            fig = chart_cache.get_figure(data_version, (rolling_days, rolling_category), 'report_rolling_spend', build_rolling_chart)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            today = datetime.now()
+            col1, col2, col3 = st.columns(3)
+            for col, days in zip((col1, col2, col3), TRAILING_WINDOWS):
+                with col:
+                    st.metric(f"Last {days} Days", f"{currency}{prefix.trailing(days, today, category=None if rolling_category == 'All' else rolling_category):,.2f}")
     
     with tab3:
         st.subheader("Category Analysis")
         
         category_year = st.number_input("Select Year", min_value=2020, max_value=2030, value=datetime.now().year, key="category_year")
         
-        category_analysis = FinancialCalculator.get_category_analysis(transactions_df, category_year)
+        category_analysis = ReportGenerator.get_category_analysis(rollup, category_year)
         
         if not category_analysis.empty:
             expenses = category_analysis[category_analysis['type'] == 'Expense']
@@ -173,14 +307,18 @@ def render_reports():
                 if not expenses.empty:
                     st.subheader("Expense Categories")
                     
-                    fig = px.pie(
-                        expenses,
-                        values='amount',
-                        names='category',
-                        color_discrete_sequence=['#FF8243', '#069494', '#FCE883', '#FFC0CB', '#FF6B6B', '#4ECDC4']
-                    )
+                    def build_expense_pie():
+                        fig = px.pie(
+                            expenses,
+                            values='amount',
+                            names='category',
+                            color_discrete_sequence=['#FF8243', '#069494', '#FCE883', '#FFC0CB', '#FF6B6B', '#4ECDC4']
+                        )
+                        
+                        fig.update_layout(height=400)
+                        return fig
                     
-                    fig.update_layout(height=400)
+                    fig = chart_cache.get_figure(data_version, category_year, 'report_expense_pie', build_expense_pie)
                     st.plotly_chart(fig, use_container_width=True)
                     
                     st.dataframe(
@@ -193,14 +331,18 @@ def render_reports():
                 if not income.empty:
                     st.subheader("Income Categories")
                     
-                    fig = px.pie(
-                        income,
-                        values='amount',
-                        names='category',
-                        color_discrete_sequence=['#069494', '#FCE883', '#FFC0CB', '#FF8243']
-                    )
+                    def build_income_pie():
+                        fig = px.pie(
+                            income,
+                            values='amount',
+                            names='category',
+                            color_discrete_sequence=['#069494', '#FCE883', '#FFC0CB', '#FF8243']
+                        )
+                        
+                        fig.update_layout(height=400)
+                        return fig
                     
-                    fig.update_layout(height=400)
+                    fig = chart_cache.get_figure(data_version, category_year, 'report_income_pie', build_income_pie)
                     st.plotly_chart(fig, use_container_width=True)
                     
                     st.dataframe(
@@ -211,9 +353,146 @@ def render_reports():
         else:
             st.info("No data available for category analysis.")
     
+    with tab4:
+        st.subheader("Cash-Flow Forecast")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            forecast_model = st.selectbox("Model", options=list(MODELS.keys()), format_func=lambda x: MODELS[x], index=1, key="forecast_model")
+        
+        with col2:
+            forecast_horizon = st.slider("Months Ahead", min_value=1, max_value=36, value=12, key="forecast_horizon")
+        
+        cash_flow, category_forecast = get_forecast(rollup, data_version, forecast_horizon, forecast_model)
+        
+        if not cash_flow.empty:
+            future = cash_flow[cash_flow['Forecast']]
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                st.metric("Projected Income", f"{currency}{future['Income'].sum():,.2f}")
+            
+            with col2:
+                st.metric("Projected Expenses", f"{currency}{future['Expenses'].sum():,.2f}")
+            
+            with col3:
+                st.metric("Projected Balance", f"{currency}{future['Cumulative Balance'].iloc[-1]:,.2f}")
+            
+            def build_forecast_chart():
+                history = cash_flow[~cash_flow['Forecast']].tail(24)
+                fig = go.Figure()
+                
+                for column, color in [('Income', '#069494'), ('Expenses', '#FF8243'), ('Balance', '#2563eb')]:
+                    fig.add_trace(go.Scatter(x=history.index, y=history[column], name=column, line=dict(color=color)))
+                    fig.add_trace(go.Scatter(
+                        x=[history.index[-1]] + list(future.index),
+                        y=[history[column].iloc[-1]] + list(future[column]),
+                        name=f"{column} (forecast)",
+                        line=dict(color=color, dash='dash')
+                    ))
+                
+                fig.update_layout(
+                    height=400,
+                    hovermode='x unified',
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                )
+                return fig
+            
+            fig = chart_cache.get_figure(data_version, (forecast_model, forecast_horizon), 'report_forecast', build_forecast_chart)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("Forecast by Category")
+            
+            category_table = category_forecast.copy()
+            category_table.columns = [period.strftime('%b %Y') for period in category_table.columns]
+            category_table = category_table.reset_index().rename(columns={'type': 'Type', 'category': 'Category'})
+            st.dataframe(category_table.round(2), use_container_width=True, hide_index=True)
+        else:
+            st.info("Add income and expenses to forecast your cash flow.")
+    
+    with tab5:
+        st.subheader("Period Comparison")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            granularity = st.selectbox("Period", list(GRANULARITIES), format_func=str.title, key="compare_granularity")
+        
+        with col2:
+            compare_year = st.number_input("Year", min_value=2020, max_value=2030, value=datetime.now().year, key="compare_year")
+        
+        with col3:
+            if granularity == 'month':
+                compare_index = st.selectbox("Month", range(1, 13), index=datetime.now().month - 1, format_func=lambda x: datetime(2000, x, 1).strftime('%B'), key="compare_month")
+            elif granularity == 'quarter':
+                compare_index = st.selectbox("Quarter", range(1, 5), index=(datetime.now().month - 1) // 3, format_func=lambda x: f"Q{x}", key="compare_quarter")
+            else:
+                compare_index = 1
+        
+        with col4:
+            basis = st.selectbox(
+                "Compare With",
+                ['previous', 'year'],
+                format_func=lambda x: "Previous period" if x == 'previous' else "Same period last year",
+                disabled=granularity == 'year',
+                key="compare_basis"
+            )
+        
+        # Month, quarter and year comparisons all slice the one rollup the other tabs use
+        comparison = ReportGenerator.compare_periods(rollup, granularity, compare_year, compare_index, basis)
+        totals = ReportGenerator.compare_totals(comparison)
+        
+        col1, col2, col3 = st.columns(3)
+        for col, flow in zip((col1, col2, col3), totals.index):
+            with col:
+                change_pct = totals.loc[flow, 'change_pct']
+                st.metric(
+                    flow,
+                    f"{currency}{totals.loc[flow, 'current']:,.2f}",
+                    delta=f"{currency}{totals.loc[flow, 'change']:,.2f}" + ("" if pd.isna(change_pct) else f" ({change_pct:+.1f}%)"),
+                    delta_color="inverse" if flow == 'Expenses' else "normal"
+                )
+        
+        expenses = comparison[comparison['type'] == 'Expense']
+        
+        if not expenses.empty:
+            def build_comparison_bars():
+                fig = go.Figure()
+                fig.add_trace(go.Bar(x=expenses['category'], y=expenses['prior'], name='Prior', marker_color='#94a3b8'))
+                fig.add_trace(go.Bar(x=expenses['category'], y=expenses['current'], name='Current', marker_color='#FF8243'))
+                fig.update_layout(
+                    barmode='group',
+                    height=400,
+                    xaxis_title="Category",
+                    yaxis_title="Amount",
+                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+                )
+                return fig
+            
+            fig = chart_cache.get_figure(data_version, (granularity, compare_year, compare_index, basis), 'report_comparison_bars', build_comparison_bars)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        if not comparison.empty:
+            st.dataframe(
+                comparison.round(2).rename(columns={
+                    'type': 'Type',
+                    'category': 'Category',
+                    'current': f'Current ({currency})',
+                    'prior': f'Prior ({currency})',
+                    'change': f'Change ({currency})',
+                    'change_pct': 'Change (%)'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No transactions in either period.")
+    
     st.markdown("---")
     
-    if st.button("Download Transaction Report (CSV)"):
+    if st.button("Download Transaction Report (CSV)", disabled=out_of_core):
         if not transactions_df.empty:
             csv = transactions_df.to_csv(index=False)
             st.download_button(
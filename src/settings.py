@@ -1,5 +1,14 @@
+import json
+import pandas as pd
 import streamlit as st
+from utils.backends import MIN_BACKEND_ROWS, available_backends, get_backend_name, set_backend
+from utils.chart_cache import get_chart_cache
+from utils.data_handler import ACCOUNT_KINDS
+from utils.currency import CURRENCIES, CURRENCY_CODES, CurrencyConverter, code_for_symbol, get_reporting_transactions
+from utils.profiling import traced
+from utils.streaming import OUT_OF_CORE_ROWS, get_memory_limit, set_memory_limit
 
+@traced('page')
 def render_settings():
     st.markdown('<div class="content-card">', unsafe_allow_html=True)
     st.markdown('<h2 class="section-title">Application Settings</h2>', unsafe_allow_html=True)
@@ -8,27 +17,44 @@ def render_settings():
     
     st.subheader("General Settings")
     
-    currencies = {
-        "US Dollar": "$",
-        "Euro": "€",
-        "British Pound": "£",
-        "Japanese Yen": "¥",
-        "Indian Rupee": "₹",
-        "Nigerian Naira": "₦",
-        "Canadian Dollar": "C$",
-        "Australian Dollar": "A$"
-    }
+    currencies = {name: symbol for name, (code, symbol) in CURRENCIES.items()}
+    converter = CurrencyConverter(data_handler)
     
     current_currency_name = [name for name, symbol in currencies.items() if symbol == st.session_state.currency][0] if st.session_state.currency in currencies.values() else "US Dollar"
     
     selected_currency = st.selectbox(
-        "Currency",
+        "Reporting Currency",
         options=list(currencies.keys()),
-        index=list(currencies.keys()).index(current_currency_name)
+        index=list(currencies.keys()).index(current_currency_name),
+        help="The dashboard, budgets and reports convert every transaction into this currency."
     )
     
     st.session_state.currency = currencies[selected_currency]
     
+    base_currency = converter.get_base_currency()
+    selected_base = st.selectbox(
+        "Default Transaction Currency",
+        options=CURRENCY_CODES,
+        index=CURRENCY_CODES.index(base_currency) if base_currency in CURRENCY_CODES else 0,
+        help="Transactions recorded without a currency are assumed to be in this one."
+    )
+    
+    backends = available_backends()
+    selected_backend = st.selectbox(
+        "Compute Engine",
+        options=backends,
+        index=backends.index(get_backend_name()) if get_backend_name() in backends else 0,
+        help=f"Engine for report calculations on histories of {MIN_BACKEND_ROWS:,} rows or more; smaller ones always use pandas."
+    )
+    
+    memory_limit = st.number_input(
+        "Out-of-core Memory Cap (MB)",
+        min_value=16,
+        value=get_memory_limit(),
+        step=64,
+        help=f"Histories of {OUT_OF_CORE_ROWS:,} rows or more are summarized from disk using at most about this much memory."
+    )
+    
     st.markdown("---")
     
     st.subheader("Financial Goals")
@@ -44,18 +70,118 @@ def render_settings():
     st.session_state.monthly_income_target = monthly_target
     
     if st.button("Save Settings", type="primary"):
-        settings = {
+        settings = data_handler.load_settings()
+        settings.update({
             'currency': st.session_state.currency,
-            'monthly_income_target': st.session_state.monthly_income_target
-        }
+            'monthly_income_target': st.session_state.monthly_income_target,
+            'base_currency': selected_base,
+            'compute_backend': selected_backend,
+            'memory_limit_mb': int(memory_limit)
+        })
         data_handler.save_settings(settings)
+        set_backend(selected_backend)
+        set_memory_limit(memory_limit)
         st.success("Settings saved successfully!")
     
     st.markdown("---")
     
+    st.subheader("Accounts")
+    
+    accounts = data_handler.load_accounts()
+    st.dataframe(
+        pd.DataFrame(accounts).rename(columns={'name': 'Account', 'kind': 'Type', 'opening_balance': f'Opening Balance ({st.session_state.currency})'}),
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    with st.form("account_form", clear_on_submit=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            account_name = st.text_input("Account name", placeholder="e.g. Savings, Visa card")
+        with col2:
+            account_kind = st.selectbox("Type", ACCOUNT_KINDS)
+        with col3:
+            opening_balance = st.number_input("Opening balance", value=0.0, step=100.0, format="%.2f")
+        
+        if st.form_submit_button("Save Account"):
+            if account_name.strip():
+                data_handler.save_account(account_name.strip(), account_kind, opening_balance)
+                st.success(f"Account **{account_name.strip()}** saved.")
+                st.rerun()
+            else:
+                st.warning("Please enter an account name.")
+    
+    st.markdown("---")
+    
+    st.subheader("Categories")
+
+    categories = data_handler.load_categories()
+    with st.form("category_rename_form", clear_on_submit=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            category_kind = st.selectbox("Type", ['expense', 'income'], format_func=str.capitalize)
+        with col2:
+            rename_sources = st.multiselect("Categories", sorted(set(categories['expense'] + categories['income'])), help="Pick several to merge them into one.")
+        with col3:
+            rename_target = st.text_input("New name", placeholder="e.g. Groceries")
+
+        if st.form_submit_button("Rename / Merge"):
+            try:
+                moved = data_handler.merge_categories(rename_sources, rename_target, category_kind)
+                st.success(f"Updated {moved['transactions']} transaction{'s' if moved['transactions'] != 1 else ''} and {moved['budgets']} budget{'s' if moved['budgets'] != 1 else ''}.")
+                st.rerun()
+            except ValueError as e:
+                st.warning(str(e))
+
+    st.markdown("---")
+
+    st.subheader("Exchange Rates")
+    
+    rates = converter.load_rates()
+    
+    if not rates.empty:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Stored Rates", f"{len(rates):,}")
+        with col2:
+            st.metric("Currency Pairs", rates[['base', 'quote']].drop_duplicates().shape[0])
+        with col3:
+            st.metric("Latest Rate Date", rates['date'].max().strftime('%d %b %Y'))
+    else:
+        st.info("No exchange rates stored yet. Transactions in other currencies are shown unconverted.")
+    
+    target = code_for_symbol(st.session_state.currency)
+    base = converter.get_base_currency()
+    # The manifest lists each month's currencies, so a ledger kept in the reporting currency is never scanned
+    currencies = {
+        currency or base
+        for entry in data_handler.partitions.partitions()
+        for nets in entry.get('summary', {}).get('accounts', {}).values()
+        for currency in nets
+    }
+    if currencies - {target}:
+        if data_handler.partitions.total_rows() >= OUT_OF_CORE_ROWS:
+            st.caption(f"Checking for unconverted transactions needs the whole history in memory, so it is not available above {OUT_OF_CORE_ROWS:,} transactions.")
+        elif st.button("Check for Unconverted Transactions", key="check_unconverted_btn"):
+            unconverted = get_reporting_transactions(data_handler, target).attrs.get('unconverted', 0)
+            if unconverted:
+                st.warning(f"{unconverted} transaction{'s' if unconverted != 1 else ''} could not be converted to {target} because no rate is stored for their currency.")
+            else:
+                st.success(f"Every transaction can be converted to {target}.")
+    
+    rates_file = st.file_uploader("Import rates (CSV with date, base, quote, rate)", type=["csv"], key="fx_rates_file")
+    if rates_file is not None and st.button("Import Rates", key="import_rates_btn"):
+        try:
+            imported = converter.import_rates(pd.read_csv(rates_file))
+            st.success(f"Imported {imported} exchange rate{'s' if imported != 1 else ''}.")
+        except ValueError as e:
+            st.error(f"Could not read this file. {e}")
+    
+    st.markdown("---")
+    
     st.subheader("Data Management")
     
-    st.warning("Warning: The following actions cannot be undone.")
+    st.warning("Warning: Resetting deletes your budgets for good. Transactions can be brought back with Undo Last Change in the Transactions History.")
     
     col1, col2 = st.columns(2)
     
@@ -78,13 +204,13 @@ def render_settings():
     
     with col2:
         st.write("**Reset All Data**")
-        st.write("Permanently delete all transactions and budgets. This action cannot be undone.")
+        st.write("Delete all transactions and budgets. The reset is recorded in the History, where Undo Last Change restores the transactions; budgets are not restored.")
         
         if st.button("Reset All Data", type="secondary"):
             st.session_state.show_reset_confirm = True
     
     if st.session_state.get('show_reset_confirm', False):
-        st.error("Are you sure you want to delete all data? This action is irreversible!")
+        st.error("Are you sure you want to delete all data? Your budgets cannot be recovered.")
         
         col1, col2 = st.columns(2)
         
@@ -99,9 +225,68 @@ def render_settings():
             if st.button("Cancel"):
                 st.session_state.show_reset_confirm = False
                 st.rerun()
+
+    st.markdown("---")
+
+    st.subheader("Backups")
+    st.write("Backups are stored under data/backups. Only the parts of files that changed since the last backup are written.")
+
+    if st.button("Create Backup", key="create_backup_btn"):
+        backup = data_handler.create_backup()
+        st.success(f"Backup created: {backup['new_chunks']} new block{'s' if backup['new_chunks'] != 1 else ''}, {backup['written_bytes'] / 1024:,.1f} KB written.")
+
+    backups = data_handler.backups.list_backups()
+    if backups:
+        st.dataframe(
+            pd.DataFrame(backups)[['id', 'created', 'file_count', 'total_bytes', 'written_bytes']].rename(columns={
+                'id': 'Backup',
+                'created': 'Created',
+                'file_count': 'Files',
+                'total_bytes': 'Data Size (B)',
+                'written_bytes': 'Written (B)'
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        selected_backup = st.selectbox("Backup to restore", [backup['id'] for backup in backups], key="restore_backup_id")
+        if st.button("Restore Backup", key="restore_backup_btn"):
+            try:
+                data_handler.restore_backup(selected_backup)
+                st.success("Backup restored. Use Undo on the Transactions page to go back.")
+                st.rerun()
+            except ValueError as e:
+                st.error(f"Could not restore this backup. {e}")
+    else:
+        st.info("No backups yet.")
+
+    st.markdown("---")
+    
+    st.subheader("Chart Cache")
+    
+    cache_stats = get_chart_cache().get_stats()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Cached Charts", cache_stats['entries'])
+    
+    with col2:
+        st.metric("Hit Rate", f"{cache_stats['hit_rate']:.1f}%", help=f"{cache_stats['hits']} hits, {cache_stats['misses']} rebuilds")
+    
+    with col3:
+        st.metric("Render Time Saved", f"{cache_stats['saved_seconds'] * 1000:,.0f} ms")
+    
+    if st.button("Clear Chart Cache"):
+        get_chart_cache().clear()
+        st.success("Chart cache cleared.")
     
     st.markdown("---")
     
+    if st.query_params.get("perf") == "1":
+        render_performance_panel()
+        st.markdown("---")
+    
     st.subheader("About")
     
     st.write("""
@@ -122,4 +307,72 @@ def render_settings():
     Built with modern technologies for a seamless user experience.
     """)
     
-    st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def render_performance_panel():
+    st.subheader("Performance")
+    
+    trace = st.session_state.get('trace')
+    if trace is None:
+        st.info("Tracing is not active for this session.")
+        return
+    
+    track_allocations = st.checkbox("Track allocations (slower)", value=trace.track_allocations, key="perf_track_alloc")
+    if track_allocations != trace.track_allocations:
+        trace.set_track_allocations(track_allocations)
+    
+    run = trace.last_completed_run()
+    if run is None:
+        st.info("No completed runs recorded yet. Interact with the app and come back.")
+        return
+    
+    st.caption(f"Spans from the previous rerun (#{run}).")
+    
+    spans = trace.get_spans(run)
+    timeline = pd.DataFrame([
+        {
+            'Span': '\u2003' * recorded['depth'] + recorded['name'],
+            'Category': recorded['category'],
+            'Start (ms)': (recorded['start_ns'] - spans[0]['start_ns']) / 1e6,
+            'Duration (ms)': recorded['duration_ms'],
+            'Allocated (KB)': recorded['alloc_kb']
+        }
+        for recorded in sorted(spans, key=lambda item: item['start_ns'])
+    ])
+    st.dataframe(timeline, use_container_width=True, hide_index=True)
+    
+    st.write("**Totals across the session**")
+    summary = pd.DataFrame(trace.summarize()).rename(columns={
+        'name': 'Span',
+        'category': 'Category',
+        'calls': 'Calls',
+        'total_ms': 'Total (ms)',
+        'mean_ms': 'Mean (ms)',
+        'max_ms': 'Max (ms)',
+        'alloc_kb': 'Allocated (KB)'
+    })
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.download_button(
+            label="Export Chrome Trace",
+            data=json.dumps(trace.to_chrome_trace()),
+            file_name="finance_tracker_trace.json",
+            mime="application/json"
+        )
+    
+    with col2:
+        st.download_button(
+            label="Export OpenTelemetry JSON",
+            data=json.dumps(trace.to_otlp()),
+            file_name="finance_tracker_otlp.json",
+            mime="application/json"
+        )
+    
+    with col3:
+        if st.button("Clear Trace"):
+            trace.clear()
+            st.rerun()
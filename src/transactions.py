@@ -1,7 +1,12 @@
 import streamlit as st
 from datetime import datetime
 import pandas as pd
+from utils.profiling import traced
+from utils.categorizer import prepare_import
+from utils.currency import CurrencyConverter, CURRENCY_CODES, SYMBOLS
+from utils.data_handler import TRANSFER_TYPE
 
+@traced('page')
 def render_transactions():
     st.markdown('<div class="content-card">', unsafe_allow_html=True)
     st.markdown('<h2 class="section-title">Transactions</h2>', unsafe_allow_html=True)
@@ -9,10 +14,15 @@ def render_transactions():
     data_handler = st.session_state.data_handler
     categories = data_handler.load_categories()
     currency = st.session_state.currency
+    base_currency = CurrencyConverter(data_handler).get_base_currency()
+    account_names = [account['name'] for account in data_handler.load_accounts()]
     
-    tab1, tab2 = st.tabs(["➕ Add Transaction", "📋 View & Manage Transactions"])
+    tab1, tab2, tab3, tab4 = st.tabs(["➕ Add Transaction", "📋 View & Manage Transactions", "🚩 Flagged", "📥 Import"])
     
     with tab1:
+        if st.session_state.get('anomaly_notice'):
+            st.warning(st.session_state.pop('anomaly_notice'))
+        
         st.markdown("### Add a New Transaction", unsafe_allow_html=True)
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -24,7 +34,7 @@ def render_transactions():
                 
                 trans_type = st.selectbox(
                     "Transaction Type",
-                    ["Income", "Expense"],
+                    ["Income", "Expense", TRANSFER_TYPE],
                     key="add_type"
                 )
                 
@@ -35,25 +45,46 @@ def render_transactions():
                 )
                 
                 amount = st.number_input(
-                    f"Amount ({currency})",
+                    "Amount",
                     min_value=0.01,
                     step=0.01,
                     format="%.2f",
                     key="add_amount"
                 )
                 
+                trans_currency = st.selectbox(
+                    "Currency",
+                    CURRENCY_CODES,
+                    index=CURRENCY_CODES.index(base_currency) if base_currency in CURRENCY_CODES else 0,
+                    key="add_currency"
+                )
+                
                 st.markdown('</div>', unsafe_allow_html=True)
             
             with col2:
                 st.markdown('<div style="background: #f8f9fa; padding: 1.8rem; border-radius: 12px;">', unsafe_allow_html=True)
                 
-                category_list = categories['income'] if trans_type == 'Income' else categories['expense']
-                
-                category = st.selectbox(
-                    "Category",
-                    options=category_list,
-                    key="add_category"
-                )
+                to_account = None
+                if trans_type == TRANSFER_TYPE:
+                    # Transfers move money between accounts and never count as income or expense
+                    category = TRANSFER_TYPE
+                    account = st.selectbox("From Account", account_names, key="add_from_account")
+                    to_account = st.selectbox(
+                        "To Account",
+                        account_names,
+                        index=1 if len(account_names) > 1 else 0,
+                        key="add_to_account"
+                    )
+                else:
+                    category_list = categories['income'] if trans_type == 'Income' else categories['expense']
+                    
+                    category = st.selectbox(
+                        "Category",
+                        options=category_list,
+                        key="add_category"
+                    )
+                    
+                    account = st.selectbox("Account", account_names, key="add_account")
                 
                 description = st.text_input(
                     "Description (optional)",
@@ -72,7 +103,7 @@ def render_transactions():
                     )
                 
                 with col_btn2:
-                    if st.button("➕ Add New Category", use_container_width=True, key="new_cat_btn"):
+                    if st.button("➕ Add New Category", use_container_width=True, key="new_cat_btn", disabled=trans_type == TRANSFER_TYPE):
                         st.session_state.show_category_form = True
                 
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -102,14 +133,33 @@ def render_transactions():
         
         # ── Feedback after adding transaction ────────────────────────────
         if add_button:
-            if amount > 0:
-                data_handler.save_transaction(
+            if trans_type == TRANSFER_TYPE and account == to_account:
+                st.error("Choose two different accounts for a transfer.")
+            elif trans_type == TRANSFER_TYPE and amount > 0:
+                data_handler.save_transfer(
+                    date=date.strftime('%Y-%m-%d'),
+                    amount=amount,
+                    from_account=account,
+                    to_account=to_account,
+                    description=description.strip() if description.strip() else TRANSFER_TYPE,
+                    currency=trans_currency
+                )
+                st.success("Transfer saved successfully!")
+                st.rerun()
+            elif amount > 0:
+                transaction_id = data_handler.save_transaction(
                     date=date.strftime('%Y-%m-%d'),
                     amount=amount,
                     category=category,
                     description=description.strip() if description.strip() else "No description",
-                    trans_type=trans_type
+                    trans_type=trans_type,
+                    currency=trans_currency,
+                    account=account
                 )
+                monitor = st.session_state.get('anomaly_monitor')
+                score = monitor.score_of(transaction_id) if monitor is not None else None
+                if score is not None and abs(score) >= monitor.scorer.threshold:
+                    st.session_state.anomaly_notice = f"The {category} amount of {SYMBOLS.get(trans_currency, currency)}{amount:,.2f} is unusual for this category (score {score:.1f}). It has been added to the Flagged tab."
                 st.success("Transaction saved successfully!")
                 st.rerun()
             else:
@@ -123,6 +173,64 @@ def render_transactions():
         
         transactions_df = data_handler.load_transactions()
         
+        quarantine = data_handler.load_quarantine()
+        if not quarantine.empty:
+            st.warning(f"{len(quarantine)} row{'s' if len(quarantine) != 1 else ''} could not be read and {'were' if len(quarantine) != 1 else 'was'} moved to quarantine. Correct the dates below to restore them.")
+            with st.expander("🧪 Quarantined Rows"):
+                edited_quarantine = st.data_editor(
+                    quarantine,
+                    column_config={
+                        'date': st.column_config.TextColumn("Date (YYYY-MM-DD)"),
+                        'reason': st.column_config.TextColumn("Reason"),
+                        'quarantined_at': st.column_config.TextColumn("Quarantined")
+                    },
+                    disabled=[column for column in quarantine.columns if column != 'date'],
+                    hide_index=True,
+                    use_container_width=True,
+                    key="quarantine_editor"
+                )
+                
+                q1, q2 = st.columns(2)
+                with q1:
+                    if st.button("↩️ Restore Fixed Rows", use_container_width=True, key="restore_quarantine_btn"):
+                        restored = data_handler.retry_quarantine(edited_quarantine)
+                        st.success(f"Restored {restored} row{'s' if restored != 1 else ''}.")
+                        st.rerun()
+                with q2:
+                    if st.button("🗑️ Discard Quarantined Rows", use_container_width=True, key="discard_quarantine_btn"):
+                        data_handler.clear_quarantine()
+                        st.rerun()
+
+        with st.expander("🕘 History"):
+            # Expander bodies run even when collapsed; reading the log and replaying it waits for the toggle
+            if not st.toggle("Show change history", key="show_history"):
+                st.caption("Turn this on to list recorded changes, undo the last one or view the ledger at an earlier time.")
+            else:
+                history = data_handler.events.history()
+                if history.empty:
+                    st.info("No changes recorded yet.")
+                else:
+                    h1, h2 = st.columns([1, 2])
+                    with h1:
+                        if st.button("↩️ Undo Last Change", use_container_width=True, key="undo_change_btn"):
+                            undone = data_handler.undo_last_change()
+                            if undone is None:
+                                st.info("Nothing left to undo.")
+                            else:
+                                st.success(f"Undid {undone['op']} #{undone['seq']}.")
+                                st.rerun()
+                    st.dataframe(history, hide_index=True, use_container_width=True)
+
+                    st.markdown("**View as of**")
+                    a1, a2 = st.columns(2)
+                    with a1:
+                        as_of_date = st.date_input("Date", datetime.now(), key="as_of_date")
+                    with a2:
+                        as_of_time = st.time_input("Time", datetime.now().time().replace(second=0, microsecond=0), key="as_of_time")
+                    as_of = data_handler.load_transactions_as_of(datetime.combine(as_of_date, as_of_time))
+                    st.markdown(f"**{len(as_of)} transaction{'s' if len(as_of) != 1 else ''} at that point**")
+                    st.dataframe(as_of.drop(columns=['id']), hide_index=True, use_container_width=True)
+
         if not transactions_df.empty:
             with st.container():
                 f1, f2, f3 = st.columns(3)
@@ -130,8 +238,8 @@ def render_transactions():
                 with f1:
                     filter_type = st.multiselect(
                         "Transaction Type",
-                        options=['Income', 'Expense'],
-                        default=['Income', 'Expense'],
+                        options=['Income', 'Expense', TRANSFER_TYPE],
+                        default=['Income', 'Expense', TRANSFER_TYPE],
                         key="filter_type"
                     )
                 
@@ -167,65 +275,105 @@ def render_transactions():
                 filtered_df = filtered_df.sort_values('amount', ascending=True)
             
             st.markdown(f"**Showing {len(filtered_df)} transaction{'s' if len(filtered_df) != 1 else ''}**")
-            
-            for idx, row in filtered_df.iterrows():
-                color = "#2ecc71" if row['type'] == 'Income' else "#e74c3c"
-                icon  = "↑" if row['type'] == 'Income' else "↓"
+
+            if not filtered_df.empty:
+                with st.expander(f"🧰 Bulk Actions ({len(filtered_df)} shown)"):
+                    selected_ids = filtered_df['id'].tolist()
+                    b1, b2 = st.columns(2)
+                    with b1:
+                        bulk_category = st.selectbox("Move to category", sorted(set(categories['income'] + categories['expense'])), key="bulk_category")
+                        if st.button("Recategorize All Shown", use_container_width=True, key="bulk_recategorize_btn"):
+                            changed = data_handler.bulk_update({'category': bulk_category}, ids=selected_ids)
+                            st.success(f"Moved {changed} transaction{'s' if changed != 1 else ''} to {bulk_category}.")
+                            st.rerun()
+                    with b2:
+                        confirm_delete = st.checkbox(f"Yes, delete all {len(selected_ids)} shown", key="bulk_delete_confirm")
+                        if st.button("🗑️ Delete All Shown", use_container_width=True, disabled=not confirm_delete, key="bulk_delete_btn"):
+                            deleted = data_handler.bulk_delete(ids=selected_ids)
+                            st.success(f"Deleted {deleted} transaction{'s' if deleted != 1 else ''}.")
+                            st.rerun()
+                    st.caption("Each bulk action is one change in the History and can be undone there.")
+
+            for _, row in filtered_df.iterrows():
+                # Rows are addressed by id: positions move when another session writes an earlier month
+                row_id = int(row['id'])
+                color = "#2ecc71" if row['type'] == 'Income' else "#3498db" if row['type'] == TRANSFER_TYPE else "#e74c3c"
+                icon  = "↑" if row['type'] == 'Income' else "⇄" if row['type'] == TRANSFER_TYPE else "↓"
+                row_account = row['account'] if 'account' in row and pd.notna(row['account']) else account_names[0]
+                row_to_account = row['to_account'] if 'to_account' in row and pd.notna(row['to_account']) else None
+                row_currency = row['currency'] if 'currency' in row and pd.notna(row['currency']) else base_currency
+                symbol = SYMBOLS.get(row_currency, f"{row_currency} ")
                 
                 with st.expander(
-                    f"{icon} {row['date'].strftime('%d %b %Y')} • {row['category']} • {currency}{row['amount']:,.2f}"
+                    f"{icon} {row['date'].strftime('%d %b %Y')} • {row['category']} • {symbol}{row['amount']:,.2f}"
                 ):
                     st.markdown(f"**Type:** {row['type']}")
-                    st.markdown(f"**Category:** {row['category']}")
-                    st.markdown(f"**Amount:** <span style='color:{color};font-weight:bold;font-size:1.25rem;'>{currency}{row['amount']:,.2f}</span>", unsafe_allow_html=True)
+                    if row['type'] == TRANSFER_TYPE:
+                        st.markdown(f"**Accounts:** {row_account} → {row_to_account}")
+                    else:
+                        st.markdown(f"**Category:** {row['category']}")
+                        st.markdown(f"**Account:** {row_account}")
+                    st.markdown(f"**Amount:** <span style='color:{color};font-weight:bold;font-size:1.25rem;'>{symbol}{row['amount']:,.2f}</span>", unsafe_allow_html=True)
                     st.markdown(f"**Description:** {row['description']}")
                     
                     c1, c2 = st.columns(2)
                     with c1:
-                        if st.button("🗑️ Delete", key=f"del_{idx}", use_container_width=True):
-                            data_handler.delete_transaction(idx)
+                        if st.button("🗑️ Delete", key=f"del_{row_id}", use_container_width=True):
+                            data_handler.delete_transaction(row_id)
                             st.success("Transaction deleted.")
                             st.rerun()
                     
                     with c2:
-                        if st.button("✏️ Edit", key=f"edit_{idx}", use_container_width=True):
-                            st.session_state[f'editing_{idx}'] = True
+                        if st.button("✏️ Edit", key=f"edit_{row_id}", use_container_width=True):
+                            st.session_state[f'editing_{row_id}'] = True
                             st.rerun()
                     
-                    if st.session_state.get(f'editing_{idx}', False):
-                        with st.form(f"edit_form_{idx}"):
+                    if st.session_state.get(f'editing_{row_id}', False):
+                        with st.form(f"edit_form_{row_id}"):
                             st.markdown("#### Edit Transaction")
                             
-                            edit_type = st.selectbox("Type", ["Income", "Expense"], index=0 if row['type'] == 'Income' else 1, key=f"etype_{idx}")
-                            edit_date = st.date_input("Date", row['date'], key=f"edate_{idx}")
-                            edit_amount = st.number_input("Amount", value=float(row['amount']), min_value=0.01, step=0.01, format="%.2f", key=f"eamt_{idx}")
+                            type_options = ["Income", "Expense", TRANSFER_TYPE]
+                            edit_type = st.selectbox("Type", type_options, index=type_options.index(row['type']) if row['type'] in type_options else 1, key=f"etype_{row_id}")
+                            edit_date = st.date_input("Date", row['date'], key=f"edate_{row_id}")
+                            edit_amount = st.number_input("Amount", value=float(row['amount']), min_value=0.01, step=0.01, format="%.2f", key=f"eamt_{row_id}")
                             
-                            edit_cat_list = categories['income'] if edit_type == 'Income' else categories['expense']
+                            if edit_type == TRANSFER_TYPE:
+                                edit_cat_list = [TRANSFER_TYPE]
+                            else:
+                                edit_cat_list = categories['income'] if edit_type == 'Income' else categories['expense']
                             try:
                                 idx_cat = edit_cat_list.index(row['category'])
                             except ValueError:
                                 idx_cat = 0
-                            edit_category = st.selectbox("Category", edit_cat_list, index=idx_cat, key=f"ecat_{idx}")
+                            edit_category = st.selectbox("Category", edit_cat_list, index=idx_cat, key=f"ecat_{row_id}")
                             
-                            edit_desc = st.text_input("Description", value=row['description'], key=f"edesc_{idx}")
+                            edit_desc = st.text_input("Description", value=row['description'], key=f"edesc_{row_id}")
+                            edit_account = st.selectbox("Account" if edit_type != TRANSFER_TYPE else "From Account", account_names, index=account_names.index(row_account) if row_account in account_names else 0, key=f"eacc_{row_id}")
+                            edit_to_account = None
+                            if edit_type == TRANSFER_TYPE:
+                                edit_to_account = st.selectbox("To Account", account_names, index=account_names.index(row_to_account) if row_to_account in account_names else 0, key=f"etoacc_{row_id}")
+                            edit_currency = st.selectbox("Currency", CURRENCY_CODES, index=CURRENCY_CODES.index(row_currency) if row_currency in CURRENCY_CODES else 0, key=f"ecur_{row_id}")
                             
                             cc1, cc2 = st.columns(2)
                             with cc1:
                                 if st.form_submit_button("💾 Save Changes", type="primary"):
                                     data_handler.update_transaction(
-                                        idx,
+                                        row_id,
                                         edit_date.strftime('%Y-%m-%d'),
                                         edit_amount,
                                         edit_category,
                                         edit_desc,
-                                        edit_type
+                                        edit_type,
+                                        currency=edit_currency,
+                                        account=edit_account,
+                                        to_account=edit_to_account
                                     )
-                                    st.session_state[f'editing_{idx}'] = False
+                                    st.session_state[f'editing_{row_id}'] = False
                                     st.success("Transaction updated!")
                                     st.rerun()
                             with cc2:
                                 if st.form_submit_button("Cancel"):
-                                    st.session_state[f'editing_{idx}'] = False
+                                    st.session_state[f'editing_{row_id}'] = False
                                     st.rerun()
         else:
             st.markdown("""
@@ -238,4 +386,113 @@ def render_transactions():
                 </div>
             """, unsafe_allow_html=True)
     
+    # ────────────────────────────────────────────────────────────────
+    #                   FLAGGED TRANSACTIONS TAB
+    # ────────────────────────────────────────────────────────────────
+    with tab3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        monitor = st.session_state.get('anomaly_monitor')
+        
+        if monitor is None:
+            st.info("Anomaly detection is not active for this session.")
+        else:
+            st.markdown("#### Flagged on Entry")
+            
+            flagged = monitor.load_flagged()
+            if not flagged.empty:
+                st.dataframe(
+                    flagged.iloc[::-1].rename(columns={
+                        'date': 'Date', 'amount': f'Amount ({currency})', 'category': 'Category',
+                        'description': 'Description', 'type': 'Type', 'score': 'Score', 'detected_at': 'Detected'
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info("No new transactions have been flagged.")
+            
+            st.markdown("#### Rescore History")
+            st.caption("Each transaction is scored against the previous 50 of its category (robust z-score of the log amount).")
+            
+            threshold = st.slider("Flag threshold", min_value=2.0, max_value=10.0, value=float(monitor.scorer.threshold), step=0.5, key="anomaly_threshold")
+            
+            if st.button("🔍 Rescore All Transactions", key="rescore_btn"):
+                st.session_state.anomaly_history = monitor.rescore_history(threshold=2.0)
+            
+            history = st.session_state.get('anomaly_history')
+            if history is not None:
+                history = history[history['score'].abs() >= threshold]
+                if history.empty:
+                    st.success("No outliers found at this threshold.")
+                else:
+                    st.markdown(f"**{len(history)} outlier{'s' if len(history) != 1 else ''} found**")
+                    st.dataframe(
+                        history.rename(columns={
+                            'date': 'Date', 'amount': f'Amount ({currency})', 'category': 'Category',
+                            'description': 'Description', 'type': 'Type', 'score': 'Score'
+                        }).round({'Score': 2}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+    
+    # ────────────────────────────────────────────────────────────────
+    #                   BULK IMPORT TAB
+    # ────────────────────────────────────────────────────────────────
+    with tab4:
+        st.markdown("<br>", unsafe_allow_html=True)
+        
+        if st.session_state.get('import_notice'):
+            st.success(st.session_state.pop('import_notice'))
+        
+        st.markdown("#### Import Bank Transactions")
+        st.caption("Upload a CSV with date, amount and description columns. Type and category are optional: negative amounts are treated as expenses and missing categories are suggested from your history.")
+        
+        uploaded = st.file_uploader("Bank export (CSV)", type=["csv"], key="import_file")
+        import_account = st.selectbox("Import into account", account_names, key="import_account")
+        categorizer = st.session_state.get('categorizer')
+        
+        if uploaded is not None and categorizer is not None:
+            try:
+                rows = prepare_import(pd.read_csv(uploaded))
+            except ValueError as e:
+                st.error(f"Could not read this file. {e}")
+                rows = None
+            
+            if rows is not None and rows.empty:
+                st.warning("No valid transactions were found in this file.")
+            elif rows is not None:
+                suggested = categorizer.categorize(rows)
+                low_confidence = int((suggested['confidence'] < 0.6).sum())
+                
+                st.markdown(f"**{len(suggested)} transaction{'s' if len(suggested) != 1 else ''} ready to import**")
+                if low_confidence:
+                    st.info(f"{low_confidence} suggestion{'s' if low_confidence != 1 else ''} have low confidence. Review the Category column before importing; your corrections are learned for next time.")
+                
+                all_categories = sorted(set(categories['expense']) | set(categories['income']))
+                edited = st.data_editor(
+                    suggested,
+                    column_config={
+                        'date': st.column_config.TextColumn("Date", disabled=True),
+                        'amount': st.column_config.NumberColumn("Amount", format="%.2f", disabled=True),
+                        'category': st.column_config.SelectboxColumn("Category", options=all_categories, required=True),
+                        'description': st.column_config.TextColumn("Description", disabled=True),
+                        'type': st.column_config.SelectboxColumn("Type", options=["Income", "Expense"], required=True),
+                        'currency': st.column_config.SelectboxColumn("Currency", options=CURRENCY_CODES),
+                        'confidence': st.column_config.ProgressColumn("Confidence", min_value=0.0, max_value=1.0, format="%.2f"),
+                        'source': st.column_config.TextColumn("Source", disabled=True)
+                    },
+                    disabled=['confidence'],
+                    hide_index=True,
+                    use_container_width=True,
+                    key="import_editor"
+                )
+                
+                if st.button(f"📥 Import {len(edited)} Transactions", type="primary", key="import_btn"):
+                    data_handler.save_transactions(edited.assign(account=import_account))
+                    st.session_state.import_notice = f"Imported {len(edited)} transactions."
+                    st.rerun()
+        elif categorizer is None:
+            st.info("Automatic categorization is not active for this session.")
+    
     st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
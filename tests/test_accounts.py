@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from utils.accounts import account_balances
+from utils.currency import CurrencyConverter
+from utils.data_handler import DataHandler, TRANSFER_TYPE, summarize_partition
+
+
+def test_balances_match_a_full_scan(tmp_path):
+    rng = np.random.default_rng(7)
+    rows = 400
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 900, rows), unit='D'),
+        'amount': rng.integers(1, 500, rows).astype(float),
+        'category': 'Other',
+        'description': 'x',
+        'type': rng.choice(['Income', 'Expense', TRANSFER_TYPE], rows),
+        'account': rng.choice(['Main', 'Savings', 'Card'], rows),
+    })
+    df['to_account'] = np.where(df['type'] == TRANSFER_TYPE, 'Savings', None)
+    handler = DataHandler(data_dir=str(tmp_path))
+    handler.replace_transactions(df)
+    handler.save_account('Savings', 'savings', 100.0)
+    full = handler.load_transactions(compact=False)
+    base = CurrencyConverter(handler).get_base_currency()
+
+    for as_of in ['2023-12-31', '2024-03-15', '2025-01-31', '2025-02-01', '2026-06-30']:
+        expected = {}
+        for account, nets in summarize_partition(full[full['date'] <= as_of])['accounts'].items():
+            expected[account] = sum(nets.values())
+        expected['Savings'] = expected.get('Savings', 0.0) + 100.0
+        balances = account_balances(handler, base, as_of).set_index('account')['balance']
+        for account, balance in expected.items():
+            assert np.isclose(balances.get(account, 0.0), balance), (as_of, account)
@@ -0,0 +1,37 @@
+import pandas as pd
+from utils.anomaly import AnomalyMonitor, AnomalyScorer
+from utils.currency import CurrencyConverter
+from utils.data_handler import DataHandler
+
+
+def monitored(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    for day in range(1, 11):
+        handler.save_transaction(f'2026-03-{day:02d}', 10.0 + day % 3, 'Food', 'x', 'Expense', currency='USD')
+    return handler, AnomalyMonitor(handler).attach()
+
+
+def test_foreign_amounts_are_scored_in_the_base_currency(tmp_path):
+    handler, monitor = monitored(tmp_path)
+    CurrencyConverter(handler).import_rates(pd.DataFrame({'date': ['2026-01-01'], 'base': ['USD'], 'quote': ['JPY'], 'rate': [150.0]}))
+
+    usual = handler.save_transaction('2026-03-12', 1650.0, 'Food', 'x', 'Expense', currency='JPY')
+    unusual = handler.save_transaction('2026-03-13', 1650.0, 'Food', 'x', 'Expense', currency='USD')
+    assert abs(monitor.score_of(usual)) < monitor.scorer.threshold
+    assert abs(monitor.score_of(unusual)) >= monitor.scorer.threshold
+
+
+def test_restore_and_deletes_keep_the_windows_in_step_with_the_ledger(tmp_path):
+    handler, monitor = monitored(tmp_path)
+    backup = handler.create_backup()
+    spike = handler.save_transaction('2026-03-20', 900.0, 'Food', 'x', 'Expense')
+
+    handler.delete_transaction(spike)
+    expected = AnomalyScorer()
+    expected.rescore(handler.load_transactions())
+    assert monitor.scorer.to_dict() == expected.to_dict()
+
+    handler.save_transaction('2026-03-21', 15.0, 'Travel', 'x', 'Expense')
+    handler.restore_backup(backup['id'])
+    expected.rescore(handler.load_transactions())
+    assert monitor.scorer.to_dict() == expected.to_dict()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_transactions, generate_budgets
+from utils.backends import MIN_BACKEND_ROWS, available_backends, set_backend
+from utils.calculations import FinancialCalculator
+from utils.data_handler import compact_transactions
+
+YEAR, MONTH = 2026, 6
+SEED = 42
+
+CALLS = [
+    ('get_monthly_summary', lambda df, budgets: FinancialCalculator.get_monthly_summary(df, YEAR, MONTH)),
+    ('get_expense_by_category', lambda df, budgets: FinancialCalculator.get_expense_by_category(df, YEAR, MONTH)),
+    ('get_monthly_trend', lambda df, budgets: FinancialCalculator.get_monthly_trend(df, 12)),
+    ('get_budget_comparison', lambda df, budgets: FinancialCalculator.get_budget_comparison(df, budgets, YEAR, MONTH)),
+    ('get_yearly_summary', lambda df, budgets: FinancialCalculator.get_yearly_summary(df, YEAR)),
+    ('get_category_analysis', lambda df, budgets: FinancialCalculator.get_category_analysis(df, YEAR)),
+]
+
+ENGINES = [name for name in available_backends() if name != 'pandas']
+
+
+@pytest.fixture(scope='module')
+def ledger():
+    # Just over the row count where the engines take over, with missing amounts, categories and dates, and transfers
+    df = generate_transactions(MIN_BACKEND_ROWS + 1000, seed=SEED, end_year=YEAR)
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+    df = compact_transactions(df)
+    rng = np.random.default_rng(SEED)
+    for column, share in (('amount', 0.01), ('category', 0.01), ('date', 0.005)):
+        df.loc[rng.random(len(df)) < share, column] = None
+    df.loc[rng.random(len(df)) < 0.02, 'type'] = 'Transfer'
+    return df, generate_budgets(seed=SEED, end_year=YEAR)
+
+
+@pytest.fixture(autouse=True)
+def pandas_afterwards():
+    yield
+    set_backend('pandas')
+
+
+def normalize(result):
+    if isinstance(result, dict):
+        return {key: float(value) for key, value in result.items()}
+    frame = result.copy()
+    for column in frame.columns:
+        if not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].astype(str)
+    if isinstance(frame.index, pd.DatetimeIndex):
+        return frame
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+@pytest.mark.skipif(not ENGINES, reason="neither polars nor duckdb is installed")
+@pytest.mark.parametrize('backend', ENGINES)
+@pytest.mark.parametrize('name, call', CALLS, ids=[name for name, _ in CALLS])
+def test_backend_matches_pandas(ledger, backend, name, call):
+    df, budgets = ledger
+    set_backend('pandas')
+    expected = normalize(call(df.copy(), budgets))
+    set_backend(backend)
+    actual = normalize(call(df, budgets))
+    if isinstance(expected, dict):
+        assert expected.keys() == actual.keys()
+        for key in expected:
+            assert np.isclose(expected[key], actual[key], rtol=1e-9), f"{key}: {expected[key]} != {actual[key]}"
+    else:
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_index_type=False, check_freq=False, rtol=1e-9)
@@ -0,0 +1,71 @@
+import os
+import zlib
+import pytest
+from utils.backups import BackupStore
+from utils.data_handler import DataHandler
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def store(tmp_path):
+    source = tmp_path / 'data'
+    write(str(source / 'a.csv'), b'a,b\n' + b'1,2\n' * 100)
+    write(str(source / 'sub' / 'c.csv.gz'), bytes(range(256)) * 4)
+    return BackupStore(str(source / 'backups'), str(source), chunk_size=64)
+
+
+def test_restore_brings_back_every_file(store):
+    backup = store.backup()
+    assert store.verify(backup['id']) == 2
+    assert store.backup()['new_chunks'] == 0
+
+    write(os.path.join(store.source, 'a.csv'), b'changed')
+    write(os.path.join(store.source, 'extra.csv'), b'new')
+    store.restore(backup['id'])
+    assert read(os.path.join(store.source, 'a.csv')) == b'a,b\n' + b'1,2\n' * 100
+    assert read(os.path.join(store.source, 'sub', 'c.csv.gz')) == bytes(range(256)) * 4
+    assert not os.path.exists(os.path.join(store.source, 'extra.csv'))
+
+
+def test_a_corrupted_block_fails_before_any_file_is_replaced(store):
+    backup = store.backup()
+    digest = store.load_manifest(backup['id'])['files']['a.csv']['chunks'][-1]
+    path = store._object_path(digest)
+    # Still valid zlib data, so only the hash check can catch it
+    write(path, zlib.compress(b'tampered'))
+    write(os.path.join(store.source, 'a.csv'), b'live')
+
+    with pytest.raises(ValueError, match='does not match its hash'):
+        store.verify(backup['id'])
+    with pytest.raises(ValueError, match='does not match its hash'):
+        store.restore(backup['id'])
+    assert read(os.path.join(store.source, 'a.csv')) == b'live'
+    assert not [name for name in os.listdir(store.source) if name.endswith('.tmp')]
+
+    os.remove(path)
+    with pytest.raises(ValueError, match='is missing'):
+        store.restore(backup['id'])
+
+
+def test_restored_ledger_matches_the_backup(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    handler.save_transaction('2026-03-10', 20.0, 'Food', 'x', 'Expense')
+    handler.save_transaction('2026-04-02', 500.0, 'Salary', 'x', 'Income')
+    backup = handler.create_backup()
+    expected = handler.load_transactions(compact=False)
+
+    handler.save_transaction('2026-04-05', 9.0, 'Food', 'x', 'Expense')
+    handler.delete_transaction(1)
+    handler.restore_backup(backup['id'])
+    assert handler.load_transactions(compact=False).equals(expected)
+    assert handler.events.history(limit=1)['op'].iloc[0] == 'restore'
@@ -0,0 +1,34 @@
+import pandas as pd
+from utils.calculations import FinancialCalculator
+from utils.data_handler import TRANSACTION_COLUMNS, compact_transactions
+
+
+def transactions(rows):
+    df = pd.DataFrame(rows, columns=['date', 'amount', 'category', 'type'])
+    df['date'] = pd.to_datetime(df['date'])
+    df['id'] = range(1, len(df) + 1)
+    df['description'] = 'x'
+    return df.reindex(columns=TRANSACTION_COLUMNS)
+
+
+def test_spend_projections_keep_uncategorized_expenses():
+    df = transactions([
+        ('2026-09-03', 10.0, 'Food', 'Expense'),
+        ('2026-10-02', 20.0, None, 'Expense'),
+        ('2026-10-05', 30.0, 'Food', 'Expense'),
+    ])
+    for frame in (df, compact_transactions(df.copy())):
+        projections = FinancialCalculator.get_spend_projections(frame, as_of='2026-10-10')
+        october = projections[(projections['year'] == 2026) & (projections['month'] == 10)]
+        assert october['spent'].sum() == 50.0
+        assert october.loc[october['category'].isna(), 'spent'].tolist() == [20.0]
+
+
+def test_budget_forecast_with_uncategorized_expense():
+    df = transactions([
+        ('2026-10-02', 20.0, None, 'Expense'),
+        ('2026-10-05', 30.0, 'Food', 'Expense'),
+    ])
+    budgets = pd.DataFrame({'category': ['Food'], 'amount': [100.0], 'month': ['2026-10']})
+    forecast = FinancialCalculator.get_budget_forecast(df, budgets, 2026, 10, as_of='2026-10-10')
+    assert forecast.loc[forecast['category'] == 'Food', 'actual'].tolist() == [30.0]
@@ -0,0 +1,47 @@
+import pandas as pd
+from utils.data_handler import DataHandler
+
+
+def ledger(handler):
+    df = handler.load_transactions(compact=False)
+    return df[['id', 'date', 'amount', 'category']].sort_values('id').reset_index(drop=True)
+
+
+def test_undo_reverses_each_kind_of_change(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    first = handler.save_transaction('2026-03-10', 20.0, 'Food', 'x', 'Expense')
+    handler.save_transaction('2026-04-02', 500.0, 'Salary', 'x', 'Income')
+    states = [ledger(handler)]
+
+    handler.update_transaction(first, '2026-05-01', 25.0, 'Rent', 'x', 'Expense')
+    states.append(ledger(handler))
+    handler.delete_transaction(first)
+    states.append(ledger(handler))
+    handler.reset_all_data()
+    assert handler.load_transactions().empty
+
+    # Each undo steps back over one change, the reset included
+    for expected in reversed(states):
+        assert handler.undo_last_change() is not None
+        pd.testing.assert_frame_equal(ledger(handler), expected)
+
+
+def test_as_of_replay_matches_the_ledger_at_each_point(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    # Snapshots every few events, so replay starts from one and applies the tail
+    handler.events.snapshot_every = 3
+    points = []
+    for day in range(1, 9):
+        transaction_id = handler.save_transaction(f'2026-03-{day:02d}', float(day), 'Food', 'x', 'Expense')
+        if day % 3 == 0:
+            handler.update_transaction(transaction_id, f'2026-03-{day:02d}', day * 10.0, 'Food', 'x', 'Expense')
+        if day == 5:
+            handler.delete_transaction(1)
+        points.append((handler.events.history(limit=1)['at'].iloc[0], ledger(handler)))
+    assert len(handler.events.snapshots()) > 1
+
+    for at, expected in points:
+        replayed = handler.load_transactions_as_of(at, compact=False)
+        replayed = replayed[['id', 'date', 'amount', 'category']].sort_values('id').reset_index(drop=True)
+        pd.testing.assert_frame_equal(replayed, expected, check_dtype=False)
+    assert handler.load_transactions_as_of('2000-01-01').empty
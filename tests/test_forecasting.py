@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+from utils.forecasting import CashFlowForecaster
+from utils.parallel_reports import ReportGenerator
+
+
+def test_forecast_history_keeps_uncategorized_rows():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2026-01-05', '2026-01-09', '2026-02-03', '2026-03-04', '2026-03-08']),
+        'amount': [4.0, 6.0, 7.0, 5.0, 100.0],
+        'type': ['Expense', 'Expense', 'Expense', 'Expense', 'Income'],
+        'category': ['Food', np.nan, np.nan, 'Food', np.nan],
+    })
+    rollup = ReportGenerator(max_workers=1).build_rollup(df)
+    flows, by_category = CashFlowForecaster().forecast(rollup, horizon=2)
+    history = flows[~flows['Forecast']]
+    assert history['Expenses'].tolist() == [10.0, 7.0, 5.0]
+    assert history['Expenses'].sum() == ReportGenerator.get_yearly_summary(rollup, 2026)['total_expenses']
+    assert history['Income'].sum() == 100.0
+    assert len(by_category) == 3
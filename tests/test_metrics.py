@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+from utils.metrics import MetricsStore
+
+
+def test_uncategorized_rows_count_in_built_and_patched_totals():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2026-10-01', '2026-10-02']),
+        'amount': [5.0, 7.0],
+        'type': ['Expense', 'Expense'],
+        'category': ['Food', np.nan],
+    })
+    built = MetricsStore.from_frame(df)
+    patched = MetricsStore.from_frame(df.iloc[:0])
+    patched.apply_change({'op': 'insert', 'after': df, 'data_version': 1})
+    for store in (built, patched):
+        assert store.get_monthly_summary(2026, 10)['total_expenses'] == 12.0
+        assert store.cells == {(2026, 10): {('Expense', 'Food'): [5.0, 1], ('Expense', 'nan'): [7.0, 1]}}
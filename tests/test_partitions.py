@@ -0,0 +1,67 @@
+import os
+import pandas as pd
+from utils.data_handler import DataHandler
+from utils.partitions import PartitionStore
+
+COLUMNS = ['id', 'date', 'amount']
+
+
+def rows(*dates):
+    return pd.DataFrame({'id': [None] * len(dates), 'date': list(dates), 'amount': [1.0] * len(dates)})
+
+
+def entry(store, period):
+    return next(entry for entry in store.load_manifest()['partitions'] if entry['period'] == period)
+
+
+def month(offset):
+    return (pd.Timestamp.now().to_period('M') + offset).strftime('%Y-%m')
+
+
+def test_hot_months_append_in_place_and_sealed_months_get_a_new_generation(tmp_path):
+    store = PartitionStore(str(tmp_path), COLUMNS, key='id')
+    hot, old = month(0), month(-6)
+
+    store.append(rows(f'{hot}-01', f'{old}-01'))
+    store.append(rows(f'{hot}-02'))
+    assert entry(store, hot)['file'] == f'{hot}.csv'
+    assert (entry(store, hot)['generation'], entry(store, hot)['rows']) == (1, 2)
+    assert entry(store, old)['file'] == f'{old}.g1.csv.gz'
+
+    store.append(rows(f'{old}-15'))
+    assert entry(store, old)['file'] == f'{old}.g2.csv.gz'
+    assert not os.path.exists(tmp_path / f'{old}.g1.csv.gz')
+    assert store.read()['id'].tolist() == [2, 4, 1, 3]
+
+
+def test_months_past_the_hot_window_are_sealed(tmp_path):
+    store = PartitionStore(str(tmp_path), COLUMNS, key='id', hot_months=12)
+    previous = month(-3)
+    store.append(rows(f'{previous}-01'))
+    assert entry(store, previous)['file'] == f'{previous}.csv'
+
+    store.hot_months = 1
+    store.append(rows(f'{month(0)}-01'))
+    assert entry(store, previous)['file'] == f'{previous}.g2.csv.gz'
+    assert entry(store, previous)['sealed']
+    assert not os.path.exists(tmp_path / f'{previous}.csv')
+    assert len(store.read()) == 2
+
+
+def test_keys_are_never_reused(tmp_path):
+    store = PartitionStore(str(tmp_path), COLUMNS, key='id')
+    store.append(rows(f'{month(0)}-01', f'{month(0)}-02'))
+    store.replace(pd.DataFrame(columns=COLUMNS))
+    assert store.append(rows(f'{month(0)}-03'))['id'].tolist() == [3]
+
+
+def test_restore_keeps_keys_used_after_the_backup(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    handler.save_transaction('2026-03-10', 20.0, 'Food', 'x', 'Expense')
+    backup = handler.create_backup()
+    used = [handler.save_transaction('2026-03-11', 5.0, 'Food', 'x', 'Expense') for _ in range(2)]
+
+    # The restored manifest's counter is older than the ids handed out since
+    handler.restore_backup(backup['id'])
+    assert handler.load_transactions()['id'].tolist() == [1]
+    assert handler.save_transaction('2026-03-12', 7.0, 'Food', 'x', 'Expense') > max(used)
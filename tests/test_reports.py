@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from utils.metrics import MetricsStore
+from utils.parallel_reports import ReportGenerator
+
+
+def test_comparison_covers_uncategorized_rows():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2025-10-03', '2025-10-09', '2026-10-01', '2026-10-02', '2026-10-04']),
+        'amount': [4.0, 6.0, 5.0, 7.0, 30.0],
+        'type': ['Expense', 'Expense', 'Expense', 'Expense', 'Income'],
+        'category': ['Food', np.nan, 'Food', np.nan, 'Salary'],
+    })
+    rollup = ReportGenerator(max_workers=1).build_rollup(df)
+    store = MetricsStore.from_frame(df)
+    for comparison in (
+        ReportGenerator.compare_periods(rollup, 'month', 2026, 10, basis='year'),
+        store.get_comparison('month', 2026, 10, basis='year'),
+    ):
+        totals = ReportGenerator.compare_totals(comparison)
+        assert totals.loc['Expenses', 'current'] == store.get_monthly_summary(2026, 10)['total_expenses'] == 12.0
+        assert totals.loc['Expenses', 'prior'] == ReportGenerator.get_yearly_summary(rollup, 2025)['total_expenses'] == 10.0
+        assert len(comparison) == 3
+        assert totals.loc['Income', 'current'] == 30.0
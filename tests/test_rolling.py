@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from utils.data_handler import DataHandler
+from utils.rolling import PrefixSums
+
+
+def test_patched_prefix_sums_match_a_rebuild(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    handler.save_transaction('2026-03-10', 20.0, 'Food', 'x', 'Expense')
+    handler.save_transaction('2026-03-12', 500.0, 'Salary', 'x', 'Income')
+    sums = PrefixSums.from_frame(handler.load_transactions(), handler.get_data_version()).attach(handler)
+
+    # Later and earlier days, a new series, an uncategorized row, then an edit and a delete
+    handler.save_transaction('2026-05-01', 30.0, 'Rent', 'x', 'Expense')
+    first = handler.save_transaction('2026-01-20', 12.0, 'Food', 'x', 'Expense')
+    handler.save_transaction('2026-03-11', 7.0, None, 'x', 'Expense')
+    handler.update_transaction(first, '2026-03-15', 15.0, 'Food', 'x', 'Expense')
+    handler.delete_transaction(1)
+    assert sums.is_current(handler.get_data_version())
+
+    rebuilt = PrefixSums.from_frame(handler.load_transactions())
+    for start, end in [('2026-01-01', '2026-12-31'), ('2026-03-11', '2026-03-15'), ('2026-05-01', '2026-05-01')]:
+        for category in (None, 'Food', 'Rent'):
+            assert np.isclose(sums.window_sum(start, end, category=category), rebuilt.window_sum(start, end, category=category))
+    assert np.isclose(sums.window_sum('2026-01-01', '2026-12-31', 'Income'), 500.0)
+    pd.testing.assert_series_equal(sums.rolling(7, start='2026-03-11', end='2026-05-01'), rebuilt.rolling(7, start='2026-03-11', end='2026-05-01'))
+
+    handler.reset_all_data()
+    assert sums.window_sum('2026-01-01', '2026-12-31') == 0.0
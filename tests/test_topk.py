@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from utils import topk
+from utils.data_handler import DataHandler
+from utils.topk import SortedKeys, TopIndex
+
+
+def test_patched_index_matches_a_rebuild(tmp_path):
+    handler = DataHandler(data_dir=str(tmp_path))
+    handler.save_transaction('2026-03-10', 20.0, 'Food', 'a', 'Expense')
+    handler.save_transaction('2026-03-12', 500.0, 'Salary', 'b', 'Income')
+    index = TopIndex.from_frame(handler.load_transactions(), handler.get_data_version()).attach(handler)
+
+    handler.save_transaction('2026-05-01', 30.0, 'Rent', 'c', 'Expense')
+    first = handler.save_transaction('2026-01-20', 12.0, 'Food', 'd', 'Expense')
+    handler.save_transaction('2026-03-11', 70.0, None, 'e', 'Expense')
+    handler.update_transaction(first, '2026-03-15', 15.0, 'Food', 'f', 'Expense')
+    handler.delete_transaction(1)
+    assert index.is_current(handler.get_data_version())
+
+    rebuilt = TopIndex.from_frame(handler.load_transactions())
+    pd.testing.assert_frame_equal(index.recent(10), rebuilt.recent(10))
+    pd.testing.assert_frame_equal(index.largest(10, 2026), rebuilt.largest(10, 2026))
+    pd.testing.assert_frame_equal(index.top_categories(10, 2026), rebuilt.top_categories(10, 2026))
+    assert index.recent(1)['description'].tolist() == ['c']
+    assert index.largest(1, 2026, 3)['amount'].tolist() == [70.0]
+
+    handler.reset_all_data()
+    assert index.recent(5).empty
+
+
+def test_sorted_keys_split_and_drain_chunks(monkeypatch):
+    monkeypatch.setattr(topk, 'CHUNK_KEYS', 4)
+    rng = np.random.default_rng(7)
+    keys = SortedKeys(rng.choice(1000, 6, replace=False))
+    for key in rng.choice(np.arange(1000, 2000), 40, replace=False):
+        keys.add([key])
+    assert max(len(chunk) for chunk in keys.chunks) <= 8
+    values = keys.values()
+    assert (np.diff(values) > 0).all() and len(values) == 46
+
+    removed = values[::3]
+    keys.remove(removed[:4])
+    keys.remove(removed[4:])
+    expected = np.setdiff1d(values, removed)
+    assert keys.values().tolist() == expected.tolist()
+    assert keys.last(3) == expected[::-1][:3].tolist()
+    assert keys.maxes == [chunk[-1] for chunk in keys.chunks]
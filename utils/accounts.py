@@ -0,0 +1,119 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.currency import CurrencyConverter, convert_amounts
+from utils.data_handler import summarize_partition
+from utils.partitions import merge_summaries
+from utils.profiling import traced
+
+_balance_cache = OrderedDict()
+_balance_lock = threading.Lock()
+_ledger_cache = OrderedDict()
+_ledger_lock = threading.Lock()
+
+
+class AccountLedger:
+    # Row i holds each (account, currency) pair's net over the first i months with activity
+
+    def __init__(self, months=(), pairs=(), cumulative=None):
+        self.months = np.asarray(months, dtype=np.int64)
+        self.pairs = list(pairs)
+        self.cumulative = cumulative if cumulative is not None else np.zeros((1, 0))
+
+    @classmethod
+    @traced('calc', name='AccountLedger.from_manifest')
+    def from_manifest(cls, entries):
+        rows = [
+            (pd.Period(entry['period'], freq='M').ordinal, account, currency, net)
+            for entry in entries
+            for account, nets in entry.get('summary', {}).get('accounts', {}).items()
+            for currency, net in nets.items()
+        ]
+        if not rows:
+            return cls()
+
+        grid = pd.DataFrame(rows, columns=['month', 'account', 'currency', 'net']).pivot_table(
+            index='month', columns=['account', 'currency'], values='net', aggfunc='sum', fill_value=0.0
+        )
+        cumulative = np.zeros((len(grid) + 1, grid.shape[1]))
+        np.cumsum(grid.to_numpy(dtype=float), axis=0, out=cumulative[1:])
+        return cls(grid.index.to_numpy(), grid.columns, cumulative)
+
+    def totals_before(self, month):
+        # Binary search for the months before the given one instead of merging every summary
+        position = np.searchsorted(self.months, pd.Period(month, freq='M').ordinal, side='left')
+        totals = {}
+        for (account, currency), net in zip(self.pairs, self.cumulative[position]):
+            totals.setdefault(account, {})[currency] = float(net)
+        return totals
+
+
+def get_account_ledger(data_handler, data_version, max_versions=4):
+    with _ledger_lock:
+        ledger = _ledger_cache.get(data_version)
+        if ledger is not None:
+            _ledger_cache.move_to_end(data_version)
+            return ledger
+
+    ledger = AccountLedger.from_manifest(data_handler.partitions.partitions())
+
+    with _ledger_lock:
+        _ledger_cache[data_version] = ledger
+        while len(_ledger_cache) > max_versions:
+            _ledger_cache.popitem(last=False)
+    return ledger
+
+
+@traced('calc')
+def account_balances(data_handler, target, as_of=None):
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.now()).normalize()
+    month = as_of.to_period('M')
+    converter = CurrencyConverter(data_handler)
+    base = converter.get_base_currency()
+
+    # Closed months are one lookup in the running manifest totals; only the as-of month is read
+    totals = get_account_ledger(data_handler, data_handler.get_data_version()).totals_before(month)
+    current = data_handler.load_transactions(compact=False, start=month.start_time, end=as_of)
+    if not current.empty:
+        totals = merge_summaries(totals, summarize_partition(current)['accounts'])
+
+    # Balances are held in their own currencies and revalued at the as-of rate
+    legs = pd.DataFrame(
+        [(account, currency or base, net) for account, nets in totals.items() for currency, net in nets.items()],
+        columns=['account', 'currency', 'amount']
+    ).assign(date=as_of)
+    converted = convert_amounts(legs, converter.load_rates(), target, base)
+    movements = converted.groupby('account')['amount'].sum()
+
+    accounts = data_handler.load_accounts()
+    names = [account['name'] for account in accounts]
+    names += sorted(set(movements.index) - set(names))
+    kinds = {account['name']: account.get('kind', '') for account in accounts}
+    opening = {account['name']: float(account.get('opening_balance', 0) or 0) for account in accounts}
+    return pd.DataFrame({
+        'account': names,
+        'kind': [kinds.get(name, '') for name in names],
+        'balance': [opening.get(name, 0.0) + float(movements.get(name, 0.0)) for name in names]
+    })
+
+
+def get_account_balances(data_handler, target, as_of=None, max_entries=8):
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.now()).normalize()
+    base = CurrencyConverter(data_handler).get_base_currency()
+    key = (data_handler.get_data_version(), target, base, as_of, json.dumps(data_handler.load_accounts(), sort_keys=True))
+    with _balance_lock:
+        cached = _balance_cache.get(key)
+        if cached is not None:
+            _balance_cache.move_to_end(key)
+            return cached.copy()
+
+    balances = account_balances(data_handler, target, as_of)
+
+    with _balance_lock:
+        _balance_cache[key] = balances
+        while len(_balance_cache) > max_entries:
+            _balance_cache.popitem(last=False)
+    return balances.copy()
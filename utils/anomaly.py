@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import warnings
+from collections import OrderedDict, deque
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.currency import CurrencyConverter
+from utils.profiling import traced
+
+WINDOW = 50
+MIN_HISTORY = 3
+THRESHOLD = 3.5
+# Floor on the MAD in log space (about 5%) so identical repeated amounts do not divide by zero
+MIN_MAD = 0.05
+CHUNK_ROWS = 100000
+# Scores of the latest inserts, kept so the session that wrote a row can read its own
+RECENT_SCORES = 1000
+
+
+def robust_score(value, window_values):
+    median = np.median(window_values)
+    mad = max(np.median(np.abs(window_values - median)), MIN_MAD)
+    return 0.6745 * (value - median) / mad
+
+
+class AnomalyScorer:
+
+    def __init__(self, window=WINDOW, min_history=MIN_HISTORY, threshold=THRESHOLD):
+        self.window = window
+        self.min_history = min_history
+        self.threshold = threshold
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def _window_for(self, key):
+        return self.windows.setdefault(key, deque(maxlen=self.window))
+
+    def score(self, amount, trans_type, category):
+        value = np.log1p(max(float(amount), 0.0))
+        with self._lock:
+            category_window = self._window_for((str(trans_type), str(category)))
+            type_window = self._window_for((str(trans_type), None))
+
+            # Thin categories fall back to every transaction of the same type
+            reference = category_window if len(category_window) >= self.min_history else type_window
+            score = robust_score(value, np.fromiter(reference, dtype=float)) if len(reference) >= self.min_history else 0.0
+
+            category_window.append(value)
+            type_window.append(value)
+        return score
+
+    def forget(self, amount, trans_type, category):
+        # An edited or deleted row leaves the windows if it is still in them; older values are not pulled back in
+        value = np.log1p(max(float(amount), 0.0))
+        with self._lock:
+            for key in ((str(trans_type), str(category)), (str(trans_type), None)):
+                window = self.windows.get(key)
+                if window is not None and value in window:
+                    window.remove(value)
+
+    def reset(self):
+        with self._lock:
+            self.windows.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'window': self.window,
+                'windows': [[key[0], key[1], list(values)] for key, values in self.windows.items()]
+            }
+
+    @classmethod
+    def from_dict(cls, state, **kwargs):
+        scorer = cls(window=state.get('window', WINDOW), **kwargs)
+        for trans_type, category, values in state.get('windows', []):
+            scorer._window_for((trans_type, category)).extend(values)
+        return scorer
+
+    @traced('calc', name='AnomalyScorer.rescore')
+    def rescore(self, df):
+        columns = ['date', 'amount', 'category', 'description', 'type', 'score']
+        if df.empty:
+            self.reset()
+            return pd.DataFrame(columns=columns)
+
+        ordered = df[df['date'].notna() & df['type'].isin(['Income', 'Expense'])].sort_values('date', kind='stable')
+        values = np.log1p(pd.to_numeric(ordered['amount'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float))
+        types = ordered['type'].astype(str).to_numpy()
+        categories = ordered['category'].astype(str).to_numpy()
+
+        category_scores, category_history, category_groups = self._rolling_scores(values, [types, categories])
+        type_scores, type_history, type_groups = self._rolling_scores(values, [types])
+
+        scores = np.where(category_history >= self.min_history, category_scores, type_scores)
+        scores = np.where(np.maximum(category_history, type_history) >= self.min_history, scores, 0.0)
+
+        # Leave the streaming windows exactly where a replay of the history would
+        with self._lock:
+            self.windows.clear()
+            for key, positions in category_groups.items():
+                self._window_for((str(key[0]), str(key[1]))).extend(values[positions[-self.window:]])
+            for key, positions in type_groups.items():
+                key = key[0] if isinstance(key, tuple) else key
+                self._window_for((str(key), None)).extend(values[positions[-self.window:]])
+
+        result = ordered[columns[:-1]].copy()
+        result['score'] = scores
+        return result
+
+    def _rolling_scores(self, values, key_columns):
+        scores = np.zeros(len(values))
+        history = np.zeros(len(values), dtype=np.int64)
+        groups = pd.Series(np.arange(len(values))).groupby(key_columns, sort=False).indices
+
+        for positions in groups.values():
+            group_values = values[positions]
+            # Each row is scored against the window of values that preceded it
+            padded = np.concatenate([np.full(self.window, np.nan), group_values[:-1]])
+            for start in range(0, len(positions), CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, len(positions))
+                windows = sliding_window_view(padded[start:stop + self.window - 1], self.window)
+                counts = np.isfinite(windows).sum(axis=1)
+                median = np.zeros(len(windows))
+                mad = np.zeros(len(windows))
+                # Full windows take the fast partition-based median; only a group's first rows need nanmedian
+                full = counts == self.window
+                if full.any():
+                    median[full] = np.median(windows[full], axis=1)
+                    mad[full] = np.median(np.abs(windows[full] - median[full, None]), axis=1)
+                partial = ~full & (counts > 0)
+                if partial.any():
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore', RuntimeWarning)
+                        median[partial] = np.nanmedian(windows[partial], axis=1)
+                        mad[partial] = np.nanmedian(np.abs(windows[partial] - median[partial, None]), axis=1)
+                mad = np.maximum(mad, MIN_MAD)
+                chunk_scores = 0.6745 * (group_values[start:stop] - median) / mad
+                scores[positions[start:stop]] = np.where(counts >= self.min_history, chunk_scores, 0.0)
+                history[positions[start:stop]] = counts
+        return scores, history, groups
+
+
+class AnomalyMonitor:
+
+    def __init__(self, data_handler, scorer=None):
+        self.data_handler = data_handler
+        self.state_file = os.path.join(data_handler.data_dir, "anomaly_state.json")
+        self.flagged_file = os.path.join(data_handler.data_dir, "anomalies.csv")
+        self.converter = CurrencyConverter(data_handler)
+        self.scorer = scorer or self._load_scorer()
+        # Shared by every session on the data directory, so scores are looked up by row id
+        self.scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_scorer(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                return AnomalyScorer.from_dict(json.load(f))
+
+        # First run: seed the running windows from the existing history
+        scorer = AnomalyScorer()
+        scorer.rescore(self._in_base(self.data_handler.load_transactions()))
+        self._save_state(scorer)
+        return scorer
+
+    def _in_base(self, df):
+        # Windows hold base-currency amounts, so a category mixing currencies is scored on one scale
+        return self.converter.convert(df, self.converter.get_base_currency())
+
+    def _save_state(self, scorer=None):
+        with open(self.state_file, 'w') as f:
+            json.dump((scorer or self.scorer).to_dict(), f)
+
+    def attach(self):
+        self.data_handler.subscribe(self.apply_change)
+        return self
+
+    def detach(self):
+        self.data_handler.unsubscribe(self.apply_change)
+
+    def apply_change(self, change):
+        if change['op'] == 'reset':
+            self.scorer.reset()
+            self._save_state()
+            if os.path.exists(self.flagged_file):
+                os.remove(self.flagged_file)
+            return
+
+        if change['op'] == 'restore':
+            # A restored or undone ledger is a different history; the windows are rebuilt from it
+            self.rescore_history()
+            return
+
+        before, after = change.get('before'), change.get('after')
+        if before is not None and not before.empty:
+            for _, row in self._in_base(before).iterrows():
+                if row['type'] in ('Income', 'Expense'):
+                    self.scorer.forget(row['amount'], row['type'], row['category'])
+        if change['op'] != 'insert':
+            # Edited rows rejoin the windows without being flagged again
+            if after is not None and not after.empty:
+                for _, row in self._in_base(after).iterrows():
+                    if row['type'] in ('Income', 'Expense'):
+                        self.scorer.score(row['amount'], row['type'], row['category'])
+            self._save_state()
+            return
+
+        flagged = []
+        for _, row in self._in_base(after).iterrows():
+            if row['type'] not in ('Income', 'Expense'):
+                continue
+            score = self.scorer.score(row['amount'], row['type'], row['category'])
+            with self._lock:
+                self.scores[int(row['id'])] = score
+                while len(self.scores) > RECENT_SCORES:
+                    self.scores.popitem(last=False)
+            if abs(score) >= self.scorer.threshold:
+                flagged.append({
+                    'date': row['date'],
+                    'amount': row['amount'],
+                    'category': row['category'],
+                    'description': row['description'],
+                    'type': row['type'],
+                    'score': round(score, 2),
+                    'detected_at': datetime.now().isoformat(timespec='seconds')
+                })
+
+        self._save_state()
+        if flagged:
+            pd.DataFrame(flagged).to_csv(
+                self.flagged_file,
+                mode='a',
+                header=not os.path.exists(self.flagged_file),
+                index=False
+            )
+
+    def score_of(self, transaction_id):
+        with self._lock:
+            return self.scores.get(transaction_id)
+
+    def load_flagged(self):
+        if not os.path.exists(self.flagged_file):
+            return pd.DataFrame(columns=['date', 'amount', 'category', 'description', 'type', 'score', 'detected_at'])
+        return pd.read_csv(self.flagged_file)
+
+    def rescore_history(self, threshold=None):
+        threshold = threshold if threshold is not None else self.scorer.threshold
+        scored = self.scorer.rescore(self._in_base(self.data_handler.load_transactions()))
+        self._save_state()
+        return scored[scored['score'].abs() >= threshold].sort_values('score', key=np.abs, ascending=False)
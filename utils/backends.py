@@ -0,0 +1,277 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.profiling import span
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+DEFAULT_BACKEND = 'pandas'
+# Below this many rows, handing the frame to another engine costs more than the query saves
+MIN_BACKEND_ROWS = 100_000
+
+_frame_cache = OrderedDict()
+_frame_lock = threading.Lock()
+_active = {'name': os.environ.get('FINANCE_COMPUTE_BACKEND', DEFAULT_BACKEND)}
+
+
+def _codes(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), list(values.cat.categories)
+    codes, labels = pd.factorize(values)
+    return codes, list(labels)
+
+
+def to_arrow(df):
+    # Engines group on integers only: a monthly period ordinal and category/type codes.
+    # Labels stay on the pandas side and are attached to the few grouped rows afterwards.
+    dates = df['date'].to_numpy(dtype='datetime64[ns]')
+    category_codes, categories = _codes(df['category'])
+    type_codes, types = _codes(df['type'])
+    table = pa.table({
+        'period': pa.array(dates.astype('datetime64[M]').astype(np.int32), mask=np.isnat(dates)),
+        'amount': pa.array(pd.to_numeric(df['amount'], errors='coerce'), from_pandas=True, type=pa.float64()),
+        'category': pa.array(category_codes.astype(np.int32), mask=category_codes < 0),
+        'type': pa.array(type_codes.astype(np.int32), mask=type_codes < 0)
+    })
+    return table, {'category': categories, 'type': types}
+
+
+def decode(totals, labels):
+    for column, names in labels.items():
+        if column in totals.columns:
+            # Null codes land on the trailing None
+            lookup = np.array(names + [None], dtype=object)
+            totals[column] = lookup[totals[column].fillna(-1).to_numpy(dtype=np.int64)]
+    return totals
+
+
+def period_ordinal(year, month=1):
+    return pd.Period(year=year, month=month, freq='M').ordinal
+
+
+def period_range(year, month=None):
+    start = period_ordinal(year, month or 1)
+    return start, start + (1 if month else 12)
+
+
+def period_starts(ordinals):
+    return pd.PeriodIndex.from_ordinals(ordinals, freq='M').to_timestamp()
+
+
+def summarize_totals(total_income, total_expenses):
+    balance = total_income - total_expenses
+    return {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'balance': balance,
+        'savings_rate': (balance / total_income) * 100 if total_income > 0 else 0
+    }
+
+
+class ColumnarBackend:
+    # Engines only answer two grouped queries; the calculator's result shapes are built here
+
+    @classmethod
+    def available(cls):
+        raise NotImplementedError
+
+    @classmethod
+    def convert(cls, table):
+        return table
+
+    @classmethod
+    def totals(cls, frame, keys, year=None, month=None):
+        raise NotImplementedError
+
+    @classmethod
+    def frame(cls, df, max_entries=2):
+        # Pages call several calculator methods on the same frame; convert it once per engine
+        key = (id(df), len(df), cls.name)
+        with _frame_lock:
+            cached = _frame_cache.get(key)
+            if cached is not None and cached[0] is df:
+                _frame_cache.move_to_end(key)
+                return cached[1]
+
+        with span('to_engine', 'calc', engine=cls.name, rows=len(df)):
+            table, labels = to_arrow(df)
+            frame = (cls.convert(table), labels)
+
+        with _frame_lock:
+            _frame_cache[key] = (df, frame)
+            while len(_frame_cache) > max_entries:
+                _frame_cache.popitem(last=False)
+        return frame
+
+    @classmethod
+    def category_totals(cls, df, year, month=None):
+        frame, labels = cls.frame(df)
+        return decode(cls.totals(frame, ['type', 'category'], year, month), labels)
+
+    @classmethod
+    def month_totals(cls, df, year=None):
+        frame, labels = cls.frame(df)
+        return decode(cls.totals(frame, ['period', 'type'], year), labels)
+
+    @classmethod
+    def _type_total(cls, totals, trans_type):
+        return float(totals.loc[totals['type'] == trans_type, 'amount'].sum())
+
+    @classmethod
+    def get_monthly_summary(cls, df, year, month):
+        totals = cls.category_totals(df, year, month)
+        return summarize_totals(cls._type_total(totals, 'Income'), cls._type_total(totals, 'Expense'))
+
+    @classmethod
+    def get_expense_by_category(cls, df, year, month):
+        totals = cls.category_totals(df, year, month)
+        expenses = totals[(totals['type'] == 'Expense') & totals['category'].notna()]
+        if expenses.empty:
+            return pd.DataFrame()
+        return expenses[['category', 'amount']].sort_values('amount', ascending=False).reset_index(drop=True)
+
+    @classmethod
+    def get_monthly_trend(cls, df, months=6):
+        totals = cls.month_totals(df)
+        trend_df = pd.DataFrame({
+            'Income': totals[totals['type'] == 'Income'].set_index('period')['amount'],
+            'Expenses': totals[totals['type'] == 'Expense'].set_index('period')['amount']
+        }).fillna(0)
+        trend_df['Balance'] = trend_df['Income'] - trend_df['Expenses']
+        trend_df.index = period_starts(trend_df.index.to_numpy()).rename('year_month')
+        return trend_df.sort_index().tail(months)
+
+    @classmethod
+    def get_budget_comparison(cls, transactions_df, budgets_df, year, month):
+        if budgets_df.empty:
+            return pd.DataFrame()
+
+        monthly_budgets = budgets_df[budgets_df['month'] == f"{year}-{month:02d}"]
+        if monthly_budgets.empty:
+            return pd.DataFrame()
+
+        totals = cls.category_totals(transactions_df, year, month)
+        expenses = totals[(totals['type'] == 'Expense') & totals['category'].notna()]
+        actual_expenses = expenses.set_index('category')['amount']
+
+        comparison = monthly_budgets.copy()
+        comparison['actual'] = comparison['category'].astype(str).map(actual_expenses).fillna(0)
+        comparison['remaining'] = comparison['amount'] - comparison['actual']
+        comparison['percentage'] = (comparison['actual'] / comparison['amount'] * 100).round(1)
+        return comparison
+
+    @classmethod
+    def get_yearly_summary(cls, df, year):
+        totals = cls.category_totals(df, year)
+        months_count = cls.month_totals(df, year)['period'].nunique() or 1
+
+        summary = summarize_totals(cls._type_total(totals, 'Income'), cls._type_total(totals, 'Expense'))
+        del summary['savings_rate']
+        summary['average_monthly_income'] = summary['total_income'] / months_count
+        summary['average_monthly_expenses'] = summary['total_expenses'] / months_count
+        return summary
+
+    @classmethod
+    def get_category_analysis(cls, df, year):
+        totals = cls.category_totals(df, year)
+        totals = totals[totals['type'].notna() & totals['category'].notna()]
+        return totals.sort_values('amount', ascending=False).reset_index(drop=True)
+
+
+class PolarsBackend(ColumnarBackend):
+    name = 'polars'
+
+    @classmethod
+    def available(cls):
+        return pa is not None and pl is not None
+
+    @classmethod
+    def convert(cls, table):
+        return pl.from_arrow(table)
+
+    @classmethod
+    def totals(cls, frame, keys, year=None, month=None):
+        query = frame.lazy()
+        if year is not None:
+            start, end = period_range(year, month)
+            query = query.filter((pl.col('period') >= start) & (pl.col('period') < end))
+        else:
+            query = query.filter(pl.col('period').is_not_null())
+        return query.group_by(keys).agg(pl.col('amount').sum()).collect().to_pandas()
+
+
+class DuckDBBackend(ColumnarBackend):
+    name = 'duckdb'
+    _connection = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        return pa is not None and duckdb is not None
+
+    @classmethod
+    def totals(cls, frame, keys, year=None, month=None):
+        where, params = 'period IS NOT NULL', []
+        if year is not None:
+            where, params = 'period >= ? AND period < ?', list(period_range(year, month))
+        sql = f"""
+            SELECT {', '.join(keys)}, coalesce(sum(amount), 0) AS amount
+            FROM transactions
+            WHERE {where}
+            GROUP BY ALL
+        """
+        with cls._lock:
+            if cls._connection is None:
+                cls._connection = duckdb.connect()
+            cls._connection.register('transactions', frame)
+            try:
+                return cls._connection.execute(sql, params).df()
+            finally:
+                cls._connection.unregister('transactions')
+
+
+BACKENDS = OrderedDict([
+    ('pandas', None),
+    ('polars', PolarsBackend),
+    ('duckdb', DuckDBBackend)
+])
+
+
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend is None or backend.available()]
+
+
+def set_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown compute backend: {name}")
+    # A configured engine that is not installed here falls back to pandas
+    _active['name'] = name if name in available_backends() else DEFAULT_BACKEND
+    return _active['name']
+
+
+def get_backend_name():
+    return _active['name']
+
+
+def get_backend(rows=None):
+    backend = BACKENDS.get(_active['name'])
+    if backend is None or not backend.available():
+        return None
+    if rows is not None and rows < MIN_BACKEND_ROWS:
+        return None
+    return backend
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from utils.profiling import traced, span
+
+CHUNK_SIZE = 1024 * 1024
+# Already-compressed files gain nothing from a second pass
+STORED_SUFFIXES = ('.gz',)
+
+
+class BackupStore:
+
+    def __init__(self, directory, source, exclude=('backups',), chunk_size=CHUNK_SIZE):
+        self.directory = directory
+        self.source = source
+        self.exclude = exclude
+        self.chunk_size = chunk_size
+        self.objects_dir = os.path.join(directory, "objects")
+        self.manifests_dir = os.path.join(directory, "manifests")
+        self._lock = threading.Lock()
+
+        for path in (self.objects_dir, self.manifests_dir):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    def _files(self):
+        files = []
+        for root, dirs, names in os.walk(self.source):
+            relative_root = os.path.relpath(root, self.source)
+            dirs[:] = sorted(name for name in dirs if os.path.normpath(os.path.join(relative_root, name)) not in self.exclude)
+            for name in sorted(names):
+                if not name.endswith('.tmp'):
+                    files.append(os.path.normpath(os.path.join(relative_root, name)))
+        return files
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _put(self, chunk, stored):
+        # Blocks are named by the hash of their content, so a block already present is never written again
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        data = chunk if stored else zlib.compress(chunk, 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        return digest, len(data)
+
+    def _get(self, digest, stored):
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            raise ValueError(f"Block {digest[:12]} is missing")
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            chunk = data if stored else zlib.decompress(data)
+        except zlib.error:
+            raise ValueError(f"Block {digest[:12]} is corrupted")
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise ValueError(f"Block {digest[:12]} does not match its hash")
+        return chunk
+
+    def list_backups(self):
+        backups = []
+        for name in sorted(os.listdir(self.manifests_dir), reverse=True):
+            if name.endswith('.json'):
+                with open(os.path.join(self.manifests_dir, name), 'r') as f:
+                    manifest = json.load(f)
+                backups.append({key: value for key, value in manifest.items() if key != 'files'})
+        return backups
+
+    def load_manifest(self, backup_id):
+        path = os.path.join(self.manifests_dir, f"{backup_id}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"Backup {backup_id} does not exist")
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    @traced('io', name='BackupStore.backup')
+    def backup(self):
+        with self._lock:
+            backups = self.list_backups()
+            previous = self.load_manifest(backups[0]['id'])['files'] if backups else {}
+
+            files = {}
+            written = new_chunks = reused = 0
+            for relative in self._files():
+                path = os.path.join(self.source, relative)
+                stat = os.stat(path)
+                known = previous.get(relative)
+                if known is not None and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                    # Unchanged since the last backup: its blocks are already stored
+                    files[relative] = known
+                    reused += 1
+                    continue
+
+                stored = relative.endswith(STORED_SUFFIXES)
+                chunks = []
+                with span('backup_file', 'io', file=relative), open(path, 'rb') as f:
+                    while True:
+                        chunk = f.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        digest, size = self._put(chunk, stored)
+                        chunks.append(digest)
+                        written += size
+                        new_chunks += bool(size)
+                files[relative] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'stored': stored, 'chunks': chunks}
+
+            created = datetime.now()
+            backup_id = created.strftime('%Y%m%d-%H%M%S-%f')
+            manifest = {
+                'id': backup_id,
+                'created': created.isoformat(timespec='seconds'),
+                'files': files,
+                'file_count': len(files),
+                'total_bytes': sum(entry['size'] for entry in files.values()),
+                'new_chunks': new_chunks,
+                'written_bytes': written,
+                'unchanged_files': reused
+            }
+            path = os.path.join(self.manifests_dir, f"{backup_id}.json")
+            with open(path + '.tmp', 'w') as f:
+                json.dump(manifest, f)
+            os.replace(path + '.tmp', path)
+            return {key: value for key, value in manifest.items() if key != 'files'}
+
+    @traced('io', name='BackupStore.verify')
+    def verify(self, backup_id):
+        manifest = self.load_manifest(backup_id)
+        for relative, entry in manifest['files'].items():
+            size = sum(len(self._get(digest, entry['stored'])) for digest in entry['chunks'])
+            if size != entry['size']:
+                raise ValueError(f"{relative} restores to {size} bytes instead of {entry['size']}")
+        return manifest['file_count']
+
+    @traced('io', name='BackupStore.restore')
+    def restore(self, backup_id, skip=()):
+        manifest = self.load_manifest(backup_id)
+        files = {relative: entry for relative, entry in manifest['files'].items() if relative.split(os.sep)[0] not in skip}
+
+        with self._lock:
+            # Every block is read and checked before any live file is touched
+            staged = []
+            try:
+                for relative, entry in files.items():
+                    path = os.path.join(self.source, relative)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path + '.tmp', 'wb') as f:
+                        for digest in entry['chunks']:
+                            f.write(self._get(digest, entry['stored']))
+                    staged.append(path)
+            except ValueError:
+                for relative in files:
+                    path = os.path.join(self.source, relative) + '.tmp'
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+
+            for path in staged:
+                os.replace(path + '.tmp', path)
+            for relative in self._files():
+                if relative not in files and relative.split(os.sep)[0] not in skip:
+                    os.remove(os.path.join(self.source, relative))
+        return len(files)
+
+    def prune(self, keep=10):
+        with self._lock:
+            backups = self.list_backups()
+            for backup in backups[keep:]:
+                os.remove(os.path.join(self.manifests_dir, f"{backup['id']}.json"))
+
+            # Blocks no remaining backup refers to are deleted
+            referenced = set()
+            for backup in backups[:keep]:
+                for entry in self.load_manifest(backup['id'])['files'].values():
+                    referenced.update(entry['chunks'])
+            removed = 0
+            for prefix in os.listdir(self.objects_dir):
+                for name in os.listdir(os.path.join(self.objects_dir, prefix)):
+                    if prefix + name not in referenced:
+                        os.remove(os.path.join(self.objects_dir, prefix, name))
+                        removed += 1
+            return removed
@@ -1,9 +1,35 @@
+import functools
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from utils.backends import get_backend
+from utils.profiling import traced
+from utils.streaming import ChunkedLedger, StreamingBackend
+
+
+def dispatched(fn):
+    # Large frames run on the configured engine; the pandas body below is the reference implementation
+    @functools.wraps(fn)
+    def wrapper(df, *args, **kwargs):
+        # An on-disk ledger is never loaded whole, whatever its size
+        backend = StreamingBackend if isinstance(df, ChunkedLedger) else get_backend(len(df))
+        if backend is not None:
+            return getattr(backend, fn.__name__)(df, *args, **kwargs)
+        return fn(df, *args, **kwargs)
+    return wrapper
+
 
 class FinancialCalculator:
     
     @staticmethod
+    def get_window(year, month, months=1):
+        # Date range covering `months` calendar months ending with year/month, for partition pruning
+        last = pd.Period(year=year, month=month, freq='M')
+        return (last - (months - 1)).start_time, last.end_time.normalize()
+    
+    @staticmethod
+    @traced('calc')
+    @dispatched
     def get_monthly_summary(df, year, month):
         if df.empty:
             return {
@@ -34,6 +60,8 @@ class FinancialCalculator:
         }
     
     @staticmethod
+    @traced('calc')
+    @dispatched
     def get_expense_by_category(df, year, month):
         if df.empty:
             return pd.DataFrame()
@@ -47,12 +75,14 @@ class FinancialCalculator:
         if monthly_expenses.empty:
             return pd.DataFrame()
         
-        category_summary = monthly_expenses.groupby('category')['amount'].sum().reset_index()
+        category_summary = monthly_expenses.groupby('category', observed=True)['amount'].sum().reset_index()
         category_summary = category_summary.sort_values('amount', ascending=False)
         
         return category_summary
     
     @staticmethod
+    @traced('calc')
+    @dispatched
     def get_monthly_trend(df, months=6):
         if df.empty:
             return pd.DataFrame()
@@ -75,6 +105,8 @@ class FinancialCalculator:
         return trend_df
     
     @staticmethod
+    @traced('calc')
+    @dispatched
     def get_budget_comparison(transactions_df, budgets_df, year, month):
         if budgets_df.empty:
             return pd.DataFrame()
@@ -91,7 +123,7 @@ class FinancialCalculator:
             (transactions_df['type'] == 'Expense')
         ]
         
-        actual_expenses = monthly_expenses.groupby('category')['amount'].sum()
+        actual_expenses = monthly_expenses.groupby('category', observed=True)['amount'].sum()
         
         comparison = monthly_budgets.copy()
         comparison['actual'] = comparison['category'].map(actual_expenses).fillna(0)
@@ -101,6 +133,8 @@ class FinancialCalculator:
         return comparison
     
     @staticmethod
+    @traced('calc')
+    @dispatched
     def get_yearly_summary(df, year):
         if df.empty:
             return {
@@ -130,13 +164,100 @@ class FinancialCalculator:
         }
     
     @staticmethod
+    @traced('calc')
+    @dispatched
     def get_category_analysis(df, year):
         if df.empty:
             return pd.DataFrame()
         
         yearly_data = df[df['date'].dt.year == year]
         
-        category_summary = yearly_data.groupby(['type', 'category'])['amount'].sum().reset_index()
+        category_summary = yearly_data.groupby(['type', 'category'], observed=True)['amount'].sum().reset_index()
         category_summary = category_summary.sort_values('amount', ascending=False)
         
-        return category_summary
\ No newline at end of file
+        return category_summary
+    
+    @staticmethod
+    @traced('calc')
+    def get_spend_projections(df, as_of=None, last_month=None):
+        columns = ['category', 'year', 'month', 'spent', 'expected', 'projected']
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        
+        as_of = pd.Timestamp(as_of if as_of is not None else datetime.now()).normalize()
+        expenses = df[(df['type'] == 'Expense') & df['date'].notna() & (df['date'] < as_of + pd.Timedelta(days=1))]
+        if expenses.empty:
+            return pd.DataFrame(columns=columns)
+        
+        current = as_of.year * 12 + as_of.month - 1
+        periods = (expenses['date'].dt.year * 12 + expenses['date'].dt.month - 1).to_numpy()
+        first = int(periods.min())
+        last = max(current, last_month[0] * 12 + last_month[1] - 1 if last_month else current)
+        # Uncategorized spend keeps its own row instead of a -1 code that bincount rejects
+        codes, categories = pd.factorize(expenses['category'], use_na_sentinel=False)
+        n_cats, n_months = len(categories), last - first + 1
+        
+        # Category x month spend matrix; the whole engine works on this grid
+        spent = np.bincount(
+            codes * n_months + (periods - first),
+            weights=expenses['amount'].to_numpy(dtype=float),
+            minlength=n_cats * n_months
+        ).reshape(n_cats, n_months)
+        
+        month_index = np.arange(first, last + 1)
+        month_of_year = month_index % 12
+        history = month_index < current
+        
+        # Trailing mean of up to 12 completed months before each month
+        cumulative = np.concatenate([np.zeros((n_cats, 1)), np.cumsum(spent, axis=1)], axis=1)
+        window_end = np.minimum(np.arange(n_months), current - first)
+        window_start = np.maximum(window_end - 12, 0)
+        trailing_mean = (cumulative[:, window_end] - cumulative[:, window_start]) / np.maximum(window_end - window_start, 1)
+        
+        # Seasonality: how a calendar month compares with the category's average completed month
+        seasonal = np.ones((n_cats, 12))
+        if history.any():
+            overall_mean = spent[:, history].mean(axis=1, keepdims=True)
+            month_sums = np.zeros((n_cats, 12))
+            month_counts = np.bincount(month_of_year[history], minlength=12)
+            np.add.at(month_sums.T, month_of_year[history], spent[:, history].T)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = (month_sums / np.maximum(month_counts, 1)) / overall_mean
+            seasonal = np.where((month_counts > 0) & np.isfinite(ratio) & (overall_mean > 0), ratio, 1.0)
+        
+        expected = trailing_mean * seasonal[:, month_of_year]
+        
+        days_in_month = as_of.days_in_month
+        elapsed = np.where(month_index < current, 1.0, np.where(month_index == current, as_of.day / days_in_month, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            run_rate = np.where(elapsed > 0, spent / elapsed, 0.0)
+        
+        # Blend toward the run rate as the month progresses, never below what is already spent
+        projected = np.maximum(elapsed * run_rate + (1 - elapsed) * expected, spent)
+        
+        return pd.DataFrame({
+            'category': np.repeat(np.asarray(categories, dtype=object), n_months),
+            'year': np.tile(month_index // 12, n_cats),
+            'month': np.tile(month_index % 12 + 1, n_cats),
+            'spent': spent.ravel(),
+            'expected': expected.ravel(),
+            'projected': projected.ravel()
+        }, columns=columns)
+    
+    @staticmethod
+    @traced('calc')
+    def get_budget_forecast(transactions_df, budgets_df, year, month, as_of=None):
+        comparison = FinancialCalculator.get_budget_comparison(transactions_df, budgets_df, year, month)
+        if comparison.empty:
+            return comparison
+        
+        projections = FinancialCalculator.get_spend_projections(transactions_df, as_of=as_of, last_month=(year, month))
+        projections = projections[(projections['year'] == year) & (projections['month'] == month)]
+        projected = projections.set_index(projections['category'].astype(str))['projected']
+        
+        comparison['projected'] = comparison['category'].astype(str).map(projected).fillna(0)
+        comparison['projected'] = comparison[['projected', 'actual']].max(axis=1)
+        comparison['projected_overspend'] = (comparison['projected'] - comparison['amount']).clip(lower=0)
+        comparison['projected_percentage'] = (comparison['projected'] / comparison['amount'] * 100).round(1)
+        
+        return comparison
@@ -0,0 +1,320 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from utils.data_handler import DATE_FORMAT, parse_dates
+from utils.profiling import traced
+
+TOKEN_PATTERN = r"[a-z][a-z&']+"
+STOP_TOKENS = {
+    'no', 'description', 'the', 'and', 'for', 'of', 'to', 'at', 'in', 'on',
+    'pos', 'card', 'debit', 'credit', 'payment', 'purchase', 'transaction', 'ref'
+}
+SMOOTHING = 1.0
+# A merchant becomes a rule once it has been seen this often with one dominant category
+MIN_RULE_SUPPORT = 3
+MIN_RULE_PURITY = 0.9
+FALLBACK_CATEGORY = 'Other'
+IMPORT_COLUMNS = ['date', 'amount', 'category', 'description', 'type', 'currency']
+
+
+def tokenize(descriptions):
+    tokens = pd.Series(descriptions, dtype=object).fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN)
+    return tokens.map(lambda words: [word for word in words if word not in STOP_TOKENS])
+
+
+def merchant_keys(tokens):
+    # The leading words of a bank description are almost always the merchant name
+    return tokens.str[:2].str.join(' ')
+
+
+def prepare_import(raw):
+    columns = {column.lower().strip(): column for column in raw.columns}
+    missing = [name for name in ('date', 'amount', 'description') if name not in columns]
+    if missing:
+        raise ValueError(f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+
+    rows = pd.DataFrame({
+        'date': raw[columns['date']].astype(str).str.strip(),
+        'amount': pd.to_numeric(raw[columns['amount']], errors='coerce'),
+        'description': raw[columns['description']].fillna('').astype(str).str.strip()
+    })
+
+    # Bank exports usually sign the amount instead of carrying a type column
+    if 'type' in columns:
+        rows['type'] = raw[columns['type']].astype(str).str.strip().str.capitalize()
+    else:
+        rows['type'] = np.where(rows['amount'] < 0, 'Expense', 'Income')
+    rows['amount'] = rows['amount'].abs()
+
+    if 'category' in columns:
+        rows['category'] = raw[columns['category']].astype(object).replace('', None)
+    else:
+        rows['category'] = None
+
+    if 'currency' in columns:
+        rows['currency'] = raw[columns['currency']].astype(str).str.strip().str.upper().replace('', None)
+    else:
+        rows['currency'] = None
+
+    rows.loc[rows['description'] == '', 'description'] = 'No description'
+    rows = rows[(rows['amount'] > 0) & rows['type'].isin(['Income', 'Expense'])]
+    # Unparseable dates are kept as written so saving them sends the rows to quarantine
+    dates = parse_dates(rows['date'])
+    rows['date'] = dates.dt.strftime(DATE_FORMAT).where(dates.notna(), rows['date'])
+    return rows[IMPORT_COLUMNS].reset_index(drop=True)
+
+
+class Categorizer:
+
+    def __init__(self, smoothing=SMOOTHING):
+        self.smoothing = smoothing
+        self.token_counts = {}
+        self.class_counts = {}
+        self.merchant_counts = {}
+        self.rules = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _adjust(counts, key, delta):
+        value = counts.get(key, 0) + delta
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    @traced('calc', name='Categorizer.learn')
+    def learn(self, df, sign=1):
+        if df is None or df.empty:
+            return
+
+        rows = pd.DataFrame({
+            'type': df['type'].astype(str).to_numpy(),
+            'category': df['category'].astype(str).to_numpy(),
+            'tokens': tokenize(df['description']).to_numpy()
+        })
+        rows['merchant'] = merchant_keys(rows['tokens'])
+
+        documents = rows.groupby(['type', 'category'], sort=False).size()
+        merchants = rows[rows['merchant'] != ''].groupby(['type', 'merchant', 'category'], sort=False).size()
+        exploded = rows[['type', 'category', 'tokens']].explode('tokens').dropna(subset=['tokens'])
+        tokens = exploded.groupby(['type', 'category', 'tokens'], sort=False).size()
+
+        with self._lock:
+            for (trans_type, category), count in documents.items():
+                self._adjust(self.class_counts.setdefault(trans_type, {}), category, sign * int(count))
+            for (trans_type, merchant, category), count in merchants.items():
+                by_merchant = self.merchant_counts.setdefault(trans_type, {})
+                self._adjust(by_merchant.setdefault(merchant, {}), category, sign * int(count))
+                if not by_merchant[merchant]:
+                    del by_merchant[merchant]
+            for (trans_type, category, token), count in tokens.items():
+                by_category = self.token_counts.setdefault(trans_type, {})
+                self._adjust(by_category.setdefault(category, {}), token, sign * int(count))
+            self._compiled.clear()
+
+    def add_rule(self, description, trans_type, category):
+        merchant = merchant_keys(tokenize([description])).iloc[0]
+        if not merchant:
+            return None
+        with self._lock:
+            self.rules.setdefault(str(trans_type), {})[merchant] = category
+            self._compiled.clear()
+        return merchant
+
+    def rename_category(self, renamed):
+        # Counts follow the rewritten transactions; pinned rules have to be pointed at the new name here
+        with self._lock:
+            for rules in self.rules.values():
+                for merchant, category in rules.items():
+                    rules[merchant] = renamed.get(category, category)
+            self._compiled.clear()
+
+    def remove_rule(self, merchant, trans_type):
+        with self._lock:
+            self.rules.get(str(trans_type), {}).pop(merchant, None)
+            self._compiled.clear()
+
+    def reset(self):
+        with self._lock:
+            self.token_counts.clear()
+            self.class_counts.clear()
+            self.merchant_counts.clear()
+            self._compiled.clear()
+
+    def _compile(self, trans_type):
+        compiled = self._compiled.get(trans_type)
+        if compiled is not None:
+            return compiled
+
+        classes = sorted(self.class_counts.get(trans_type, {}))
+        by_category = self.token_counts.get(trans_type, {})
+        vocabulary = sorted({token for category in classes for token in by_category.get(category, {})})
+        index = {token: i for i, token in enumerate(vocabulary)}
+
+        counts = np.zeros((len(vocabulary), len(classes)))
+        for j, category in enumerate(classes):
+            for token, count in by_category.get(category, {}).items():
+                counts[index[token], j] = count
+
+        # Multinomial naive Bayes with Laplace smoothing
+        totals = counts.sum(axis=0) + self.smoothing * max(len(vocabulary), 1)
+        log_likelihood = np.log((counts + self.smoothing) / totals)
+        documents = np.array([self.class_counts[trans_type][category] for category in classes], dtype=float)
+        log_prior = np.log(documents / documents.sum()) if len(classes) else documents
+
+        merchant_rules = {}
+        for merchant, categories in self.merchant_counts.get(trans_type, {}).items():
+            support = sum(categories.values())
+            category, count = max(categories.items(), key=lambda item: item[1])
+            if support >= MIN_RULE_SUPPORT and count / support >= MIN_RULE_PURITY:
+                merchant_rules[merchant] = (category, count / support)
+        for merchant, category in self.rules.get(trans_type, {}).items():
+            merchant_rules[merchant] = (category, 1.0)
+
+        compiled = (np.array(classes, dtype=object), index, log_likelihood, log_prior, merchant_rules)
+        self._compiled[trans_type] = compiled
+        return compiled
+
+    @traced('calc', name='Categorizer.predict')
+    def predict(self, df):
+        result = pd.DataFrame({
+            'category': pd.Series(FALLBACK_CATEGORY, index=df.index, dtype=object),
+            'confidence': 0.0,
+            'source': 'none'
+        })
+        if df.empty:
+            return result
+
+        tokens = tokenize(df['description'])
+        tokens.index = df.index
+        merchants = merchant_keys(tokens)
+        types = df['type'].astype(str)
+
+        with self._lock:
+            compiled = {trans_type: self._compile(trans_type) for trans_type in types.unique()}
+
+        for trans_type, (classes, index, log_likelihood, log_prior, merchant_rules) in compiled.items():
+            rows = types.index[types == trans_type]
+
+            if len(classes):
+                row_tokens = tokens.loc[rows].reset_index(drop=True).explode()
+                token_ids = row_tokens.map(index).dropna()
+                positions = token_ids.index.to_numpy()
+                token_ids = token_ids.to_numpy(dtype=np.int64)
+
+                # Sum each row's token log-likelihoods per class with one bincount per class
+                scores = np.tile(log_prior, (len(rows), 1))
+                for j in range(len(classes)):
+                    scores[:, j] += np.bincount(positions, weights=log_likelihood[token_ids, j], minlength=len(rows))
+
+                scores -= scores.max(axis=1, keepdims=True)
+                probabilities = np.exp(scores)
+                probabilities /= probabilities.sum(axis=1, keepdims=True)
+                best = probabilities.argmax(axis=1)
+
+                known = np.bincount(positions, minlength=len(rows)) > 0
+                result.loc[rows[known], 'category'] = classes[best[known]]
+                result.loc[rows[known], 'confidence'] = probabilities[known, best[known]]
+                result.loc[rows[known], 'source'] = 'model'
+
+            if merchant_rules:
+                matched = merchants.loc[rows].map(merchant_rules).dropna()
+                if not matched.empty:
+                    result.loc[matched.index, 'category'] = matched.str[0]
+                    result.loc[matched.index, 'confidence'] = matched.str[1].astype(float)
+                    result.loc[matched.index, 'source'] = 'rule'
+
+        return result
+
+    def categorize(self, df, overwrite=False):
+        predicted = self.predict(df)
+        result = df.copy()
+        result['category'] = result['category'].astype(object)
+        if overwrite:
+            missing = pd.Series(True, index=df.index)
+        else:
+            missing = result['category'].isna() | (result['category'].astype(str).str.strip() == '')
+        result.loc[missing, 'category'] = predicted.loc[missing, 'category']
+        result['confidence'] = predicted['confidence'].where(missing, 1.0)
+        result['source'] = predicted['source'].where(missing, 'imported')
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'token_counts': self.token_counts,
+                'class_counts': self.class_counts,
+                'merchant_counts': self.merchant_counts,
+                'rules': self.rules
+            }
+
+    @classmethod
+    def from_dict(cls, state, **kwargs):
+        categorizer = cls(**kwargs)
+        categorizer.token_counts = state.get('token_counts', {})
+        categorizer.class_counts = state.get('class_counts', {})
+        categorizer.merchant_counts = state.get('merchant_counts', {})
+        categorizer.rules = state.get('rules', {})
+        return categorizer
+
+
+class CategorizerService:
+
+    def __init__(self, data_handler, categorizer=None):
+        self.data_handler = data_handler
+        self.state_file = os.path.join(data_handler.data_dir, "categorizer.json")
+        self.categorizer = categorizer or self._load_categorizer()
+
+    def _load_categorizer(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as f:
+                return Categorizer.from_dict(json.load(f))
+
+        # First run: train on every categorized transaction already on file
+        categorizer = Categorizer()
+        categorizer.learn(self.data_handler.load_transactions(compact=False))
+        self._save_state(categorizer)
+        return categorizer
+
+    def _save_state(self, categorizer=None):
+        with open(self.state_file, 'w') as f:
+            json.dump((categorizer or self.categorizer).to_dict(), f)
+
+    def attach(self):
+        self.data_handler.subscribe(self.apply_change)
+        return self
+
+    def detach(self):
+        self.data_handler.unsubscribe(self.apply_change)
+
+    def apply_change(self, change):
+        if change['op'] == 'reset':
+            self.categorizer.reset()
+            self._save_state()
+            return
+
+        before = change.get('before')
+        after = change.get('after')
+        self.categorizer.learn(before, sign=-1)
+        self.categorizer.learn(after, sign=1)
+
+        if change.get('renamed'):
+            self.categorizer.rename_category(change['renamed'])
+        # A manual re-categorization pins the merchant so the correction applies immediately; bulk edits pin nothing
+        elif change['op'] == 'update' and before is not None and after is not None and len(after) == 1:
+            old, new = before.iloc[0], after.iloc[0]
+            if old['category'] != new['category']:
+                self.categorizer.add_rule(new['description'], new['type'], new['category'])
+
+        self._save_state()
+
+    def categorize(self, df, overwrite=False):
+        return self.categorizer.categorize(df, overwrite=overwrite)
+
+    def retrain(self):
+        self.categorizer.reset()
+        self.categorizer.learn(self.data_handler.load_transactions(compact=False))
+        self._save_state()
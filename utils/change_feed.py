@@ -0,0 +1,64 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+# Changes kept for readers that fall behind; older cursors are told to reload instead
+FEED_SIZE = 1024
+# These swap the whole ledger, so they carry no per-record ids
+RELOAD_OPS = ('reset', 'restore')
+
+
+def change_ids(op, before=None, after=None, key='id'):
+    if op in RELOAD_OPS:
+        return {'inserted': [], 'updated': [], 'deleted': []}
+    before_ids = [int(value) for value in before[key]] if before is not None else []
+    after_ids = [int(value) for value in after[key]] if after is not None else []
+    kept = set(before_ids) & set(after_ids)
+    return {
+        'inserted': [value for value in after_ids if value not in kept],
+        'updated': [value for value in after_ids if value in kept],
+        'deleted': [value for value in before_ids if value not in kept]
+    }
+
+
+class ChangeFeed:
+
+    def __init__(self, seq=0, size=FEED_SIZE):
+        self._changes = deque(maxlen=size)
+        self._condition = threading.Condition()
+        self._seq = seq
+
+    def publish(self, change):
+        entry = {
+            'seq': change['seq'],
+            'op': change['op'],
+            'inserted': change['inserted'],
+            'updated': change['updated'],
+            'deleted': change['deleted'],
+            'reload': change['op'] in RELOAD_OPS,
+            'data_version': change['data_version'],
+            'at': datetime.now().isoformat(timespec='seconds')
+        }
+        with self._condition:
+            self._changes.append(entry)
+            self._seq = entry['seq']
+            self._condition.notify_all()
+        return entry
+
+    def latest_seq(self):
+        with self._condition:
+            return self._seq
+
+    def since(self, seq):
+        # None means the cursor is older than anything kept, so the reader must reload
+        with self._condition:
+            if seq >= self._seq:
+                return []
+            if not self._changes or self._changes[0]['seq'] > seq + 1:
+                return None
+            return [entry for entry in self._changes if entry['seq'] > seq]
+
+    def wait(self, seq, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > seq, timeout)
+            return self._seq
@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from utils.profiling import span
+
+
+class ChartCache:
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def get_figure(self, data_version, period, chart_type, build):
+        key = (data_version, period, chart_type)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            figure_json, cost = entry
+            started = time.perf_counter()
+            figure = json.loads(figure_json) if figure_json is not None else None
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += max(cost - (time.perf_counter() - started), 0.0)
+            return figure
+
+        started = time.perf_counter()
+        with span('plotly_build', 'chart', chart=chart_type):
+            fig = build()
+            figure_json = fig.to_json() if fig is not None else None
+        cost = time.perf_counter() - started
+
+        with self._lock:
+            self.misses += 1
+            self.build_seconds += cost
+            self._entries[key] = (figure_json, cost)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return json.loads(figure_json) if figure_json is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0,
+                'build_seconds': self.build_seconds,
+                'saved_seconds': self.saved_seconds
+            }
+
+
+_chart_cache = ChartCache()
+
+
+def get_chart_cache():
+    return _chart_cache
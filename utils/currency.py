@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.profiling import traced, span
+
+CURRENCIES = OrderedDict([
+    ('US Dollar', ('USD', '$')),
+    ('Euro', ('EUR', '€')),
+    ('British Pound', ('GBP', '£')),
+    ('Japanese Yen', ('JPY', '¥')),
+    ('Indian Rupee', ('INR', '₹')),
+    ('Nigerian Naira', ('NGN', '₦')),
+    ('Canadian Dollar', ('CAD', 'C$')),
+    ('Australian Dollar', ('AUD', 'A$'))
+])
+CURRENCY_CODES = [code for code, _ in CURRENCIES.values()]
+SYMBOLS = {code: symbol for code, symbol in CURRENCIES.values()}
+RATE_COLUMNS = ['date', 'base', 'quote', 'rate']
+
+_conversion_cache = OrderedDict()
+_conversion_lock = threading.Lock()
+
+
+def code_for_symbol(symbol, default='USD'):
+    for code, currency_symbol in CURRENCIES.values():
+        if currency_symbol == symbol:
+            return code
+    return default
+
+
+def normalize_rates(rates):
+    if rates.empty:
+        return pd.DataFrame(columns=['date', 'currency', 'per_anchor']), None
+
+    # Every rate is re-expressed against one anchor currency so any pair converts through it
+    anchor = rates['base'].mode().iloc[0]
+    direct = rates[rates['base'] == anchor]
+    inverse = rates[(rates['quote'] == anchor) & (rates['base'] != anchor)]
+    table = pd.concat([
+        pd.DataFrame({'date': direct['date'], 'currency': direct['quote'], 'per_anchor': direct['rate']}),
+        pd.DataFrame({'date': inverse['date'], 'currency': inverse['base'], 'per_anchor': 1.0 / inverse['rate']})
+    ], ignore_index=True)
+    table = table.drop_duplicates(['date', 'currency'], keep='last').sort_values('date', kind='stable')
+    return table.reset_index(drop=True), anchor
+
+
+def _asof_rates(dates, currencies, table, anchor):
+    found = np.full(len(dates), np.nan)
+    for currency, rates in table.groupby('currency', sort=False):
+        rows = np.flatnonzero(currencies == currency)
+        if not len(rows):
+            continue
+        # The latest rate on or before each date; dates before the first rate take the earliest one
+        positions = np.searchsorted(rates['date'].to_numpy(), dates[rows], side='right') - 1
+        found[rows] = rates['per_anchor'].to_numpy()[np.maximum(positions, 0)]
+
+    found[currencies == anchor] = 1.0
+    return found
+
+
+@traced('calc')
+def convert_amounts(df, rates, target, default):
+    converted = df.copy()
+    if df.empty:
+        converted.attrs['unconverted'] = 0
+        return converted
+
+    if 'currency' in df.columns:
+        source = df['currency'].astype(object).fillna(default).to_numpy()
+    else:
+        source = np.full(len(df), default, dtype=object)
+    dates = pd.to_datetime(df['date'], format='mixed', errors='coerce').to_numpy()
+
+    factor = np.ones(len(df))
+    foreign = source != target
+    if foreign.any():
+        table, anchor = normalize_rates(rates)
+        with span('fx_asof_join', 'calc', rows=int(foreign.sum())):
+            source_rates = _asof_rates(dates[foreign], source[foreign], table, anchor)
+            target_rates = _asof_rates(dates[foreign], np.full(foreign.sum(), target, dtype=object), table, anchor)
+        factor[foreign] = target_rates / source_rates
+
+    # Rows with no usable rate keep their original amount and are reported back to the caller
+    missing = ~np.isfinite(factor)
+    factor[missing] = 1.0
+    converted['amount'] = pd.to_numeric(df['amount'], errors='coerce').to_numpy(dtype=float) * factor
+    converted.attrs['unconverted'] = int(missing.sum())
+    return converted
+
+
+class CurrencyConverter:
+
+    def __init__(self, data_handler):
+        self.data_handler = data_handler
+        self.rates_file = data_handler.fx_rates_file
+
+    def get_base_currency(self):
+        settings = self.data_handler.load_settings()
+        return settings.get('base_currency') or code_for_symbol(settings.get('currency', '$'))
+
+    @traced('io')
+    def load_rates(self):
+        if not os.path.exists(self.rates_file):
+            return pd.DataFrame(columns=RATE_COLUMNS)
+        rates = pd.read_csv(self.rates_file)
+        rates['date'] = pd.to_datetime(rates['date'], format='%Y-%m-%d', errors='coerce')
+        return rates.dropna(subset=['date', 'rate'])
+
+    @traced('io')
+    def import_rates(self, raw):
+        columns = {column.lower().strip(): column for column in raw.columns}
+        missing = [name for name in RATE_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+
+        incoming = pd.DataFrame({
+            'date': pd.to_datetime(raw[columns['date']], format='mixed', errors='coerce'),
+            'base': raw[columns['base']].astype(str).str.strip().str.upper(),
+            'quote': raw[columns['quote']].astype(str).str.strip().str.upper(),
+            'rate': pd.to_numeric(raw[columns['rate']], errors='coerce')
+        })
+        incoming = incoming[incoming['date'].notna() & (incoming['rate'] > 0) & (incoming['base'] != incoming['quote'])]
+        if incoming.empty:
+            return 0
+
+        # Re-imported dates replace the stored rate for that pair
+        existing = self.load_rates()
+        rates = pd.concat([existing, incoming], ignore_index=True) if not existing.empty else incoming
+        rates = rates.drop_duplicates(['date', 'base', 'quote'], keep='last').sort_values(['date', 'base', 'quote'])
+        rates.assign(date=rates['date'].dt.strftime('%Y-%m-%d')).to_csv(self.rates_file, index=False)
+        return len(incoming)
+
+    def convert(self, df, target):
+        return convert_amounts(df, self.load_rates(), target, self.get_base_currency())
+
+
+def get_reporting_transactions(data_handler, target, start=None, end=None, max_entries=4):
+    converter = CurrencyConverter(data_handler)
+    base = converter.get_base_currency()
+    key = (data_handler.get_data_version(), target, base, start, end)
+    with _conversion_lock:
+        cached = _conversion_cache.get(key)
+        if cached is not None:
+            _conversion_cache.move_to_end(key)
+            return cached.copy()
+
+    transactions = data_handler.load_transactions(start=start, end=end)
+    converted = convert_amounts(transactions, converter.load_rates(), target, base)
+
+    with _conversion_lock:
+        _conversion_cache[key] = converted
+        while len(_conversion_cache) > max_entries:
+            _conversion_cache.popitem(last=False)
+    return converted.copy()
+
+
+def get_reporting_ledger(data_handler, target, memory_limit_mb=None):
+    # Rates are loaded once; each chunk is converted as it is read
+    converter = CurrencyConverter(data_handler)
+    rates, base = converter.load_rates(), converter.get_base_currency()
+    return data_handler.open_ledger(memory_limit_mb, convert=lambda chunk: convert_amounts(chunk, rates, target, base))
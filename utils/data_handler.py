@@ -1,27 +1,187 @@
+import numpy as np
 import pandas as pd
 import os
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime
+from functools import wraps
 import json
+from utils.backups import BackupStore
+from utils.change_feed import ChangeFeed, RELOAD_OPS, change_ids
+from utils.events import EventLog
+from utils.partitions import PartitionStore
+from utils.profiling import traced, span
+from utils.streaming import ChunkedLedger
+
+try:
+    import pyarrow  # noqa: F401
+    DESCRIPTION_DTYPE = 'string[pyarrow]'
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    DESCRIPTION_DTYPE = None
+    CSV_ENGINE = 'c'
+
+TRANSFER_TYPE = 'Transfer'
+TRANSACTION_TYPES = ['Expense', 'Income', TRANSFER_TYPE]
+TRANSACTION_COLUMNS = ['id', 'date', 'amount', 'category', 'description', 'type', 'currency', 'account', 'to_account']
+ACCOUNT_KINDS = ['Checking', 'Savings', 'Credit Card', 'Cash']
+DEFAULT_ACCOUNT = 'Main'
+DATE_FORMAT = '%Y-%m-%d'
+# Quarantined rows are outside the ledger and get a fresh id when restored
+QUARANTINE_COLUMNS = TRANSACTION_COLUMNS[1:] + ['reason', 'quarantined_at']
+# Label columns parsed straight into categoricals when a compact frame is wanted
+CATEGORY_DTYPES = {column: 'category' for column in ('category', 'type', 'currency', 'account', 'to_account')}
+# Below this many rows the Arrow reader's setup costs more than it saves over the C parser
+ARROW_MIN_ROWS = 10000
+
+# In-memory budget for a loaded transaction row: 8 B id + 8 B date + 8 B amount + 1 B category code
+# + 1 B type code, leaving ~6 B for the description dictionary code.
+TARGET_BYTES_PER_ROW = 32
+
+
+def compact_transactions(df):
+    if df.empty:
+        return df
+
+    df['category'] = df['category'].astype('category')
+    for column in ('currency', 'account', 'to_account'):
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    types = TRANSACTION_TYPES + sorted(set(df['type'].dropna().unique()) - set(TRANSACTION_TYPES))
+    df['type'] = pd.Categorical(df['type'], categories=types)
+
+    # Repetitive descriptions ("No description", merchant names) intern best as a dictionary
+    descriptions = df['description']
+    if descriptions.nunique() <= len(descriptions) // 2:
+        df['description'] = descriptions.astype('category')
+    elif DESCRIPTION_DTYPE is not None:
+        df['description'] = descriptions.astype(DESCRIPTION_DTYPE)
+
+    return df
+
+
+def parse_dates(values):
+    # Canonical dates take the fixed-format fast path; only the leftovers pay for format inference
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry].astype(str), format='mixed', errors='coerce')
+    return parsed
+
+
+def normalize_date(value):
+    return pd.Timestamp(value).strftime(DATE_FORMAT)
+
+
+def summarize_partition(frame):
+    # Net movement per account and currency, so balances never need to re-read a sealed month
+    amounts = pd.to_numeric(frame['amount'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    types = frame['type'].to_numpy()
+    is_transfer = types == TRANSFER_TYPE
+    legs = pd.DataFrame({
+        'account': frame['account'].fillna(DEFAULT_ACCOUNT).to_numpy(dtype=object),
+        'currency': frame['currency'].fillna('').to_numpy(dtype=object),
+        'net': np.where(types == 'Income', amounts, np.where((types == 'Expense') | is_transfer, -amounts, 0.0))
+    })
+    incoming = is_transfer & frame['to_account'].notna().to_numpy()
+    if incoming.any():
+        legs = pd.concat([legs, pd.DataFrame({
+            'account': frame['to_account'].to_numpy(dtype=object)[incoming],
+            'currency': legs['currency'].to_numpy()[incoming],
+            'net': amounts[incoming]
+        })], ignore_index=True)
+
+    accounts = {}
+    for (account, currency), net in legs.groupby(['account', 'currency'], sort=False)['net'].sum().items():
+        accounts.setdefault(str(account), {})[str(currency)] = float(net)
+    return {'accounts': accounts}
+
+
+def memory_per_row(df):
+    if df.empty:
+        return 0.0
+    return df.memory_usage(deep=True, index=False).sum() / len(df)
+
+
+def exclusive(method):
+    # Sessions share one handler; read-modify-write paths run one at a time
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            outermost = self._base_version is None
+            if outermost:
+                # Cached frames at this version can take the write's delta instead of a re-read
+                self._base_version = self.partitions.get_version()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                if outermost:
+                    self._base_version = None
+    return wrapper
+
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def get_data_handler(data_dir="data"):
+    # One handler per data directory for the whole process, shared by every browser session
+    key = os.path.abspath(data_dir)
+    with _handlers_lock:
+        handler = _handlers.get(key)
+        if handler is None:
+            handler = DataHandler(data_dir)
+            _handlers[key] = handler
+        return handler
+
 
 class DataHandler:
-    def __init__(self):
-        self.data_dir = "data"
+    def __init__(self, data_dir="data"):
+        self.data_dir = data_dir
         self.transactions_file = os.path.join(self.data_dir, "transactions.csv")
         self.budgets_file = os.path.join(self.data_dir, "budgets.csv")
         self.settings_file = os.path.join(self.data_dir, "settings.json")
         self.categories_file = os.path.join(self.data_dir, "categories.json")
+        self.fx_rates_file = os.path.join(self.data_dir, "fx_rates.csv")
+        self.accounts_file = os.path.join(self.data_dir, "accounts.json")
+        self.quarantine_file = os.path.join(self.data_dir, "quarantine.csv")
+        
+        self._listeners = []
+        self._services = {}
+        self._frames = OrderedDict()
+        self._lock = threading.RLock()
+        self._frames_lock = threading.Lock()
+        self._base_version = None
         
         self._ensure_data_directory()
+        self.partitions = PartitionStore(
+            os.path.join(self.data_dir, "transactions"),
+            TRANSACTION_COLUMNS,
+            date_format=DATE_FORMAT,
+            summarize=summarize_partition,
+            key='id'
+        )
+        self.events = EventLog(os.path.join(self.data_dir, "ledger"), TRANSACTION_COLUMNS, date_format=DATE_FORMAT)
+        self.backups = BackupStore(os.path.join(self.data_dir, "backups"), self.data_dir)
         self._initialize_files()
+        self.feed = ChangeFeed(self.events.last_seq())
     
     def _ensure_data_directory(self):
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
     
     def _initialize_files(self):
-        if not os.path.exists(self.transactions_file):
-            df = pd.DataFrame(columns=['date', 'amount', 'category', 'description', 'type'])
-            df.to_csv(self.transactions_file, index=False)
+        if not self.partitions.exists():
+            self._migrate_transactions()
+        elif self.partitions.load_manifest()['columns'] != TRANSACTION_COLUMNS:
+            # Partitions written before rows had ids get them assigned once
+            self.partitions.replace(self.partitions.read())
+        
+        if self.events.last_seq() == 0 and self.partitions.total_rows():
+            # History starts from whatever is on disk when the event log is first created
+            self.events.append('baseline', state=self.load_transactions(compact=False))
         
         if not os.path.exists(self.budgets_file):
             df = pd.DataFrame(columns=['category', 'amount', 'month'])
@@ -59,48 +219,554 @@ class DataHandler:
             }
             with open(self.categories_file, 'w') as f:
                 json.dump(categories, f)
+        
+        if not os.path.exists(self.accounts_file):
+            accounts = [{'name': DEFAULT_ACCOUNT, 'kind': 'Checking', 'opening_balance': 0.0}]
+            with open(self.accounts_file, 'w') as f:
+                json.dump(accounts, f)
+    
+    def _migrate_transactions(self):
+        # One-time split of the single-file ledger into monthly partitions; the old file is left as a backup
+        if not os.path.exists(self.transactions_file):
+            self.partitions.clear()
+            return
+
+        df = pd.read_csv(self.transactions_file, dtype={'date': str}).reindex(columns=TRANSACTION_COLUMNS)
+        parsed = parse_dates(df['date'])
+        bad = parsed.isna()
+        self._quarantine(df[bad & df['date'].isna()], "Missing date")
+        self._quarantine(df[bad & df['date'].notna()], "Unparseable date")
+        df = df[~bad].reset_index(drop=True)
+        df['date'] = parsed[~bad].dt.strftime(DATE_FORMAT).to_numpy()
+        self.partitions.replace(df)
+    
+    def subscribe(self, callback):
+        # Per-session listeners are held weakly, so a closed session stops receiving changes
+        with self._lock:
+            if callback not in self._callbacks():
+                ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+                self._listeners.append(ref)
+        return callback
+    
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._listeners = [ref for ref in self._listeners if ref() is not None and ref() != callback]
+    
+    def _callbacks(self):
+        self._listeners = [ref for ref in self._listeners if ref() is not None]
+        return [ref() for ref in self._listeners]
+    
+    def shared(self, name, factory):
+        # Services that persist into the data directory exist once per handler, not once per session
+        with self._lock:
+            service = self._services.get(name)
+            if service is None:
+                service = factory(self)
+                self._services[name] = service
+            return service
+    
+    def _notify(self, op, before=None, after=None, state=None, **extra):
+        # Every mutation is recorded before listeners see it; the event log is the undoable history
+        event = self.events.append(op, before=before, after=after, state=state, **extra)
+        change = {
+            'op': op,
+            'before': before,
+            'after': after,
+            'seq': event['seq'],
+            'data_version': self.get_data_version(),
+            **change_ids(op, before, after),
+            **extra
+        }
+        self._patch_frames(change)
+        for callback in self._callbacks():
+            callback(change)
+        # Sessions that did not make the change pick it up from the feed on their next poll
+        self.feed.publish(change)
+        
+        if self.events.due():
+            self.events.snapshot(self.load_transactions(compact=False))
+    
+    def get_data_version(self):
+        parts = []
+        for path in (self.partitions.manifest_file, self.budgets_file, self.fx_rates_file):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+        return ':'.join(parts)
+    
+    @traced('io')
+    def load_transactions(self, compact=True, start=None, end=None, max_entries=4):
+        # Every session reads through one cache; any write changes the manifest version and misses it
+        key = (
+            self.partitions.get_version(),
+            compact,
+            None if start is None else pd.Timestamp(start),
+            None if end is None else pd.Timestamp(end)
+        )
+        with self._frames_lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._frames.move_to_end(key)
+                return cached.copy()
+        
+        # Sessions that miss together wait for one read instead of each parsing the same files
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is None:
+                cached = self._read_transactions(compact, start, end)
+                with self._frames_lock:
+                    self._frames[key] = cached
+                    while len(self._frames) > max_entries:
+                        self._frames.popitem(last=False)
+        return cached.copy()
+    
+    def _patch_frames(self, change, max_entries=4):
+        base, version = self._base_version, self.partitions.get_version()
+        self._base_version = version
+        if base is None or change['op'] in RELOAD_OPS:
+            return
+        with self._frames_lock:
+            cached = [(key, frame) for key, frame in self._frames.items() if key[0] == base]
+        
+        for (_, compact, start, end), frame in cached:
+            # Only frames holding whole months keep a contiguous position index after the patch
+            if end is not None or (start is not None and start != start.to_period('M').start_time):
+                continue
+            with span('patch_frame', 'io', rows=len(frame)):
+                patched = self._apply_change(frame, change, compact, start)
+            selected = self.partitions.partitions(start)
+            rows = sum(entry['rows'] for entry in selected)
+            if len(patched) != rows:
+                continue
+            offset = selected[0]['offset'] if selected else 0
+            patched.index = pd.RangeIndex(offset, offset + rows)
+            with self._frames_lock:
+                self._frames[(version, compact, start, end)] = patched
+                while len(self._frames) > max_entries:
+                    self._frames.popitem(last=False)
+    
+    @staticmethod
+    def _apply_change(frame, change, compact, start):
+        rows = change['after'].reindex(columns=TRANSACTION_COLUMNS) if change['after'] is not None else pd.DataFrame(columns=TRANSACTION_COLUMNS)
+        rows = rows.assign(date=pd.to_datetime(rows['date'], format=DATE_FORMAT) if not rows.empty else rows['date'])
+        if start is not None:
+            rows = rows[rows['date'] >= start]
+        if frame.empty:
+            return compact_transactions(rows.reset_index(drop=True)) if compact else rows.reset_index(drop=True)
+        
+        # Files keep their row order: an edit within its month stays in place, anything else lands at the month's end
+        months = frame['date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+        row_months = rows['date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+        updated = frame['id'].isin(change['updated']).to_numpy()
+        ids = frame['id'].to_numpy()[updated]
+        place = rows['id'].map(pd.Series(frame.index.to_numpy(dtype=float)[updated], index=ids)).to_numpy(dtype=float)
+        stays = rows['id'].map(pd.Series(months[updated].astype(float), index=ids)).to_numpy(dtype=float) == row_months
+        end = frame.index.max() + 1
+        place = np.where(stays, place, end + np.arange(len(rows)))
+        
+        keep = ~frame['id'].isin(change['deleted'] + change['updated']).to_numpy()
+        kept = frame[keep] if not keep.all() else frame.copy(deep=False)
+        if compact and not rows.empty:
+            kept, rows = DataHandler._align_dtypes(kept, rows)
+        combined = pd.concat([kept, rows], ignore_index=True) if not rows.empty else kept.reset_index(drop=True)
+        order = np.lexsort((
+            np.concatenate([kept.index.to_numpy(dtype=float), place]),
+            np.concatenate([months[keep], row_months])
+        ))
+        # Today's rows usually belong at the very end, which needs no reordering
+        if (order == np.arange(len(order))).all():
+            return combined
+        return combined.take(order).reset_index(drop=True)
+    
+    @staticmethod
+    def _align_dtypes(kept, rows):
+        # New rows take the cached frame's dictionaries, extended by any value they introduce
+        rows = rows.copy()
+        for column in kept.columns:
+            if isinstance(kept[column].dtype, pd.CategoricalDtype):
+                values = rows[column].astype(object)
+                missing = [value for value in values.dropna().unique() if value not in kept[column].cat.categories]
+                if missing:
+                    kept[column] = kept[column].cat.add_categories(missing)
+                rows[column] = pd.Categorical(values, dtype=kept[column].dtype)
+            elif rows[column].dtype != kept[column].dtype:
+                rows[column] = rows[column].astype(kept[column].dtype)
+        return kept, rows
+    
+    def invalidate(self):
+        # For files changed behind the handler's back in ways the version stamp cannot see
+        with self._frames_lock:
+            self._frames.clear()
+    
+    def _read_partitions(self, compact, start, end):
+        if CSV_ENGINE == 'pyarrow' and sum(entry['rows'] for entry in self.partitions.partitions(start, end)) >= ARROW_MIN_ROWS:
+            try:
+                # Arrow parses the canonical dates and the repeated labels natively, well ahead of the C parser
+                return self.partitions.read(start, end, engine='pyarrow', dtype=dict(CATEGORY_DTYPES if compact else {}, date='datetime64[us]'))
+            except ValueError:
+                # A date Arrow cannot read: the C parser leaves it as text for the repair below
+                pass
+        return self.partitions.read(start, end, parse_dates=['date'], date_format=DATE_FORMAT)
     
-    def load_transactions(self):
-        df = pd.read_csv(self.transactions_file)
+    def _read_transactions(self, compact, start, end):
+        with span('read_csv', 'io'):
+            # Only partitions overlapping [start, end] are read; dates are stored in one canonical format
+            df = self._read_partitions(compact, start, end)
         if not df.empty:
-            df['date'] = pd.to_datetime(df['date'], format='mixed', errors='coerce')
+            if not pd.api.types.is_datetime64_any_dtype(df['date']) or df['date'].isna().any():
+                # Rows edited by hand: repair the affected partitions once
+                with span('normalize_dates', 'io'):
+                    self._normalize_partitions(start, end)
+                df = self._read_partitions(compact, start, end)
+            if start is not None:
+                df = df[df['date'] >= pd.Timestamp(start)]
+            if end is not None:
+                df = df[df['date'] < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)]
+            if compact:
+                with span('compact_dtypes', 'io'):
+                    df = compact_transactions(df)
 
         return df
     
-    def save_transaction(self, date, amount, category, description, trans_type):
-        df = self.load_transactions()
+    def _normalize_partitions(self, start=None, end=None):
+        repaired = {}
+        for entry in self.partitions.partitions(start, end):
+            df = self.partitions.read_partition({'file': entry['file']}, dtype={'date': str})
+            parsed = parse_dates(df['date'])
+            canonical = parsed.dt.strftime(DATE_FORMAT)
+            if parsed.notna().all() and (canonical == df['date']).all():
+                continue
+
+            bad = parsed.isna()
+            self._quarantine(df[bad & df['date'].isna()], "Missing date")
+            self._quarantine(df[bad & df['date'].notna()], "Unparseable date")
+            if df.loc[bad, 'id'].notna().any():
+                self.events.append('quarantine', before=df[bad & df['id'].notna()])
+            df = df[~bad].reset_index(drop=True)
+            df['date'] = canonical[~bad].to_numpy()
+            repaired[entry['period']] = df
+
+        if not repaired:
+            return
+        # A repaired date can belong to another month; those rows move to their own partition
+        rows = pd.concat(repaired.values(), ignore_index=True)
+        periods = rows['date'].str[:7]
+        self.partitions.write_partitions({period: rows[periods == period] for period in repaired})
+        self.partitions.append(rows[~periods.isin(list(repaired))])
+    
+    def _quarantine(self, rows, reason):
+        if rows.empty:
+            return
+        rows = rows.reindex(columns=QUARANTINE_COLUMNS[:-2]).assign(
+            reason=reason,
+            quarantined_at=datetime.now().isoformat(timespec='seconds')
+        )
+        rows.to_csv(
+            self.quarantine_file,
+            mode='a',
+            header=not os.path.exists(self.quarantine_file),
+            index=False
+        )
+    
+    @traced('io')
+    def load_quarantine(self):
+        if not os.path.exists(self.quarantine_file):
+            return pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        return pd.read_csv(self.quarantine_file, dtype={'date': str})
+    
+    @traced('io')
+    @exclusive
+    def retry_quarantine(self, rows):
+        parsed = parse_dates(rows['date'])
+        fixed = rows[parsed.notna()].assign(date=parsed[parsed.notna()].dt.strftime(DATE_FORMAT))
+        remaining = rows[parsed.isna()]
+        
+        if remaining.empty:
+            self.clear_quarantine()
+        else:
+            remaining.reindex(columns=QUARANTINE_COLUMNS).to_csv(self.quarantine_file, index=False)
+        if not fixed.empty:
+            self.save_transactions(fixed)
+        return len(fixed)
+    
+    @traced('io')
+    @exclusive
+    def clear_quarantine(self):
+        if os.path.exists(self.quarantine_file):
+            os.remove(self.quarantine_file)
+        return True
+    
+    @traced('io')
+    @exclusive
+    def save_transaction(self, date, amount, category, description, trans_type, currency=None, account=None, to_account=None):
         new_row = pd.DataFrame([{
-            'date': date,
+            # Written as text like save_transactions does, so appending to a sealed month keeps one date format
+            'date': normalize_date(date),
             'amount': amount,
             'category': category,
             'description': description,
-            'type': trans_type
+            'type': trans_type,
+            'currency': currency,
+            'account': account,
+            'to_account': to_account
         }])
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(self.transactions_file, index=False)
+        new_row = self.partitions.append(new_row)
+        self._notify('insert', after=new_row)
+        # The new id lets the caller find what listeners recorded about this row
+        return int(new_row['id'].iloc[0])
+    
+    def save_transfer(self, date, amount, from_account, to_account, description="Transfer", currency=None):
+        return self.save_transaction(
+            date,
+            amount,
+            TRANSFER_TYPE,
+            description,
+            TRANSFER_TYPE,
+            currency=currency,
+            account=from_account,
+            to_account=to_account
+        )
+
+    @traced('io')
+    @exclusive
+    def save_transactions(self, rows):
+        if rows.empty:
+            return True
+
+        new_rows = rows.reindex(columns=TRANSACTION_COLUMNS).reset_index(drop=True)
+        parsed = parse_dates(new_rows['date'])
+        self._quarantine(new_rows[parsed.isna()], "Unparseable date")
+        new_rows = new_rows[parsed.notna()].reset_index(drop=True)
+        new_rows['date'] = parsed[parsed.notna()].dt.strftime(DATE_FORMAT).to_numpy()
+        if new_rows.empty:
+            return True
+        
+        # Rows land in their month's partition; only sealed months pay for a rewrite
+        new_rows = self.partitions.append(new_rows)
+        self._notify('insert', after=new_rows)
         return True
+
+    def _read_partition(self, entry):
+        return self.partitions.read_partition(entry, parse_dates=['date'], date_format=DATE_FORMAT)
     
-    def delete_transaction(self, index):
-        df = self.load_transactions()
-        df = df.drop(index)
-        df = df.reset_index(drop=True)
-        df.to_csv(self.transactions_file, index=False)
+    @traced('io')
+    @exclusive
+    def replace_transactions(self, df):
+        before = self.load_transactions(compact=False)
+        after = self.partitions.replace(df.reindex(columns=TRANSACTION_COLUMNS))
+        self._notify('restore', before=before, after=after, state=after)
         return True
     
-    def update_transaction(self, index, date, amount, category, description, trans_type):
+    def _rewrite(self, remove=None, add=None):
+        # Takes rows out by id and puts rows back in their month, touching only those partitions
+        changes = [rows for rows in (remove, add) if rows is not None and not rows.empty]
+        periods = sorted({period for rows in changes for period in rows['date'].to_numpy().astype('datetime64[M]').astype(str)})
+        removed = set(remove['id']) if remove is not None else set()
+        add_periods = add['date'].to_numpy().astype('datetime64[M]').astype(str) if add is not None else None
+        
+        frames = {}
+        for period in periods:
+            entries = self.partitions.partitions(f"{period}-01", f"{period}-01")
+            current = self._read_partition(entries[0]) if entries else pd.DataFrame(columns=TRANSACTION_COLUMNS)
+            incoming = add[add_periods == period] if add is not None else add
+            kept = current[~current['id'].isin(removed)]
+            if incoming is None or incoming.empty:
+                frames[period] = kept.reset_index(drop=True)
+                continue
+            # Rows edited within their month keep their place in the file, as cached frames expect; others go at the end
+            place = pd.Series(np.arange(len(current), dtype=float), index=current['id'].to_numpy())
+            order = np.concatenate([
+                place.loc[kept['id'].to_numpy()].to_numpy(),
+                incoming['id'].map(place).fillna(pd.Series(len(current) + np.arange(len(incoming)), index=incoming.index)).to_numpy(dtype=float)
+            ])
+            combined = pd.concat([frame for frame in (kept, incoming) if not frame.empty], ignore_index=True)
+            frames[period] = combined.take(np.argsort(order, kind='stable')).reset_index(drop=True)
+        self.partitions.write_partitions(frames)
+    
+    def _select(self, ids=None, where=None):
+        # Rows chosen by id and/or by column values; a date range in the filter limits which months are read
+        if ids is None and not where:
+            raise ValueError("Choose transactions by id or by filter")
+        where = dict(where or {})
+        start, end = where.pop('start', None), where.pop('end', None)
+        unknown = [column for column in where if column not in TRANSACTION_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown column{'s' if len(unknown) > 1 else ''}: {', '.join(unknown)}")
+        
+        df = self.load_transactions(compact=False, start=start, end=end)
+        mask = np.ones(len(df), dtype=bool)
+        if ids is not None:
+            mask &= df['id'].isin(list(ids)).to_numpy()
+        for column, values in where.items():
+            values = list(values) if isinstance(values, (list, tuple, set, pd.Series, np.ndarray)) else [values]
+            mask &= df[column].isin(values).to_numpy()
+        return df[mask]
+    
+    @traced('io')
+    @exclusive
+    def bulk_update(self, changes, ids=None, where=None):
+        fields = {column: value for column, value in changes.items() if column != 'id'}
+        unknown = [column for column in fields if column not in TRANSACTION_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown column{'s' if len(unknown) > 1 else ''}: {', '.join(unknown)}")
+        before = self._select(ids, where)
+        if before.empty:
+            return 0
+        
+        after = before.copy()
+        for column, value in fields.items():
+            after[column] = pd.Timestamp(normalize_date(value)) if column == 'date' else value
+        if 'type' in fields and fields['type'] != TRANSFER_TYPE:
+            after['to_account'] = None
+        # Every selected row is written in one pass over the months involved, as one undoable change
+        self._rewrite(remove=before, add=after)
+        self._notify('update', before=before, after=after)
+        return len(after)
+    
+    @traced('io')
+    @exclusive
+    def bulk_delete(self, ids=None, where=None):
+        before = self._select(ids, where)
+        if before.empty:
+            return 0
+        self._rewrite(remove=before)
+        self._notify('delete', before=before)
+        return len(before)
+    
+    def rename_category(self, old, new, category_type=None):
+        return self.merge_categories([old], new, category_type)
+    
+    @traced('io')
+    @exclusive
+    def merge_categories(self, sources, target, category_type=None):
+        # Transactions, budgets and the category lists all move to the target together; merging is renaming onto a name in use
+        target = str(target).strip()
+        sources = [source for source in sources if source != target]
+        if not target:
+            raise ValueError("The new category name cannot be empty")
+        if not sources:
+            return {'transactions': 0, 'budgets': 0}
+        
+        categories = self.load_categories()
+        kinds = [category_type] if category_type is not None else list(categories)
+        where = {'category': sources}
+        if category_type is not None:
+            where['type'] = category_type.capitalize()
+        renamed = {source: target for source in sources}
+        moved = self._select(where=where)
+        if not moved.empty:
+            after = moved.assign(category=target)
+            self._rewrite(remove=moved, add=after)
+            self._notify('update', before=moved, after=after, renamed=renamed)
+        
+        budgets = self.load_budgets()
+        # Budgets are kept for expense categories only
+        affected = budgets['category'].isin(sources) & (category_type in (None, 'expense'))
+        if affected.any():
+            # Budgets of merged categories for the same month add up
+            budgets.loc[affected, 'category'] = target
+            budgets = budgets.groupby(['category', 'month'], sort=False, as_index=False)['amount'].sum()[['category', 'amount', 'month']]
+            budgets.to_csv(self.budgets_file, index=False)
+        
+        for kind in kinds:
+            names = categories.get(kind, [])
+            if any(name in sources for name in names):
+                names = [target if name in sources else name for name in names]
+                categories[kind] = list(dict.fromkeys(names))
+        with open(self.categories_file, 'w') as f:
+            json.dump(categories, f)
+        return {'transactions': len(moved), 'budgets': int(affected.sum())}
+    
+    @traced('io')
+    @exclusive
+    def undo_last_change(self):
+        event = self.events.undoable()
+        if event is None:
+            return None
+        
+        if event['op'] in ('reset', 'restore'):
+            # Whole-ledger changes go back to the state just before them: one snapshot plus its tail
+            before = self.load_transactions(compact=False)
+            after = self.partitions.replace(self.events.replay(through=event['seq'] - 1))
+            self._notify('restore', before=before, after=after, state=after, undoes=event['seq'])
+        else:
+            # Row changes carry their own before/after images, so the inverse needs no replay
+            before = self.events.frame(event['after'])
+            after = self.events.frame(event['before'])
+            self._rewrite(remove=before, add=after)
+            inverse = {'insert': 'delete', 'delete': 'insert', 'update': 'update'}[event['op']]
+            self._notify(inverse, before=before if not before.empty else None, after=after if not after.empty else None, undoes=event['seq'])
+        return event
+    
+    def open_ledger(self, memory_limit_mb=None, convert=None):
+        # For histories too large to load: calculator methods accept this in place of a frame
+        return ChunkedLedger(self.partitions, memory_limit_mb, convert)
+    
+    @traced('io')
+    def load_transactions_as_of(self, when, compact=True):
+        df = self.events.replay(until=when)
+        if compact and not df.empty:
+            df = compact_transactions(df)
+        return df
+    
+    def _locate(self, transaction_id):
+        # Positions shift whenever another session writes an earlier month; ids never do
         df = self.load_transactions()
-        df.loc[index, 'date'] = date
+        dates = df.loc[df['id'] == transaction_id, 'date']
+        if dates.empty:
+            raise ValueError(f"Transaction {transaction_id} does not exist")
+        entry = self.partitions.partitions(dates.iloc[0], dates.iloc[0])[0]
+        df = self._read_partition(entry)
+        return entry, df, df.index[df['id'] == transaction_id][0]
+    
+    @traced('io')
+    @exclusive
+    def delete_transaction(self, transaction_id):
+        # Only the partition holding the row is read and rewritten
+        entry, df, index = self._locate(transaction_id)
+        before = df.loc[[index]]
+        self.partitions.write_partitions({entry['period']: df.drop(index)})
+        self._notify('delete', before=before)
+        return True
+    
+    @traced('io')
+    @exclusive
+    def update_transaction(self, transaction_id, date, amount, category, description, trans_type, currency=None, account=None, to_account=None):
+        entry, df, index = self._locate(transaction_id)
+        before = df.loc[[index]].copy()
+        df.loc[index, 'date'] = pd.Timestamp(normalize_date(date))
         df.loc[index, 'amount'] = amount
         df.loc[index, 'category'] = category
         df.loc[index, 'description'] = description
         df.loc[index, 'type'] = trans_type
-        df.to_csv(self.transactions_file, index=False)
+        if currency is not None:
+            df.loc[index, 'currency'] = currency
+        if account is not None:
+            df.loc[index, 'account'] = account
+        if trans_type == TRANSFER_TYPE:
+            df.loc[index, 'to_account'] = to_account
+        else:
+            df.loc[index, 'to_account'] = None
+        after = df.loc[[index]]
+        
+        period = normalize_date(date)[:7]
+        if period == entry['period']:
+            self.partitions.write_partitions({period: df})
+        else:
+            # A new date moves the row into its month's partition
+            target = self.partitions.partitions(date, date)
+            moved = pd.concat([self._read_partition(target[0]), after]) if target else after
+            self.partitions.write_partitions({entry['period']: df.drop(index), period: moved})
+        self._notify('update', before=before, after=after)
         return True
     
+    @traced('io')
     def load_budgets(self):
         df = pd.read_csv(self.budgets_file)
         return df
     
+    @traced('io')
+    @exclusive
     def save_budget(self, category, amount, month):
         df = self.load_budgets()
         existing = df[(df['category'] == category) & (df['month'] == month)]
@@ -118,10 +784,13 @@ class DataHandler:
         df.to_csv(self.budgets_file, index=False)
         return True
     
+    @traced('io')
     def load_categories(self):
         with open(self.categories_file, 'r') as f:
             return json.load(f)
     
+    @traced('io')
+    @exclusive
     def save_category(self, category_type, category_name):
         categories = self.load_categories()
         if category_name not in categories[category_type]:
@@ -130,22 +799,70 @@ class DataHandler:
                 json.dump(categories, f)
         return True
     
+    @traced('io')
+    def load_accounts(self):
+        with open(self.accounts_file, 'r') as f:
+            return json.load(f)
+    
+    @traced('io')
+    @exclusive
+    def save_account(self, name, kind, opening_balance=0.0):
+        accounts = self.load_accounts()
+        for account in accounts:
+            if account['name'] == name:
+                account.update({'kind': kind, 'opening_balance': float(opening_balance)})
+                break
+        else:
+            accounts.append({'name': name, 'kind': kind, 'opening_balance': float(opening_balance)})
+        with open(self.accounts_file, 'w') as f:
+            json.dump(accounts, f)
+        return True
+    
+    @traced('io')
     def load_settings(self):
         with open(self.settings_file, 'r') as f:
             return json.load(f)
     
+    @traced('io')
+    @exclusive
     def save_settings(self, settings):
         with open(self.settings_file, 'w') as f:
             json.dump(settings, f)
         return True
     
+    @traced('io')
+    @exclusive
+    def create_backup(self, keep=30):
+        # Holding the partition lock keeps the manifest and its files consistent in the backup
+        with self.partitions._lock:
+            backup = self.backups.backup()
+        self.backups.prune(keep)
+        return backup
+    
+    @traced('io')
+    @exclusive
+    def restore_backup(self, backup_id):
+        before = self.load_transactions(compact=False)
+        next_key = self.partitions.load_manifest().get('next_key', 1)
+        with self.partitions._lock:
+            # The live event log is kept, so the restore is one more change in the history and can be undone
+            self.backups.restore(backup_id, skip=('ledger',))
+            self.partitions.reserve_keys(next_key)
+        after = self.load_transactions(compact=False)
+        self._notify('restore', before=before, after=after, state=after)
+        return True
+    
+    @traced('io')
+    @exclusive
     def reset_all_data(self):
+        self.partitions.clear()
         if os.path.exists(self.transactions_file):
-            df = pd.DataFrame(columns=['date', 'amount', 'category', 'description', 'type'])
-            df.to_csv(self.transactions_file, index=False)
+            os.remove(self.transactions_file)
         
         if os.path.exists(self.budgets_file):
             df = pd.DataFrame(columns=['category', 'amount', 'month'])
             df.to_csv(self.budgets_file, index=False)
         
+        self.clear_quarantine()
+        self._notify('reset')
         return True
\ No newline at end of file
@@ -0,0 +1,131 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+MAX_CHART_POINTS = 500
+
+TIER_RULES = OrderedDict([
+    ('day', None),
+    ('week', 'W-MON'),
+    ('month', 'MS'),
+    ('quarter', 'QS'),
+    ('year', 'YS')
+])
+# Coarse points are labelled with the start of their period; these periods find the one containing a date
+TIER_PERIODS = {'week': 'W-SUN', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+_tier_cache = OrderedDict()
+_tier_lock = threading.Lock()
+
+
+def build_tiers(df):
+    empty = pd.DataFrame(columns=['Income', 'Expenses', 'Balance'], dtype=float)
+    if df.empty:
+        return {tier: empty for tier in TIER_RULES}
+
+    valid = df[df['date'].notna() & df['type'].isin(['Income', 'Expense'])]
+    if valid.empty:
+        return {tier: empty for tier in TIER_RULES}
+
+    daily = valid.groupby([valid['date'].dt.normalize(), 'type'], observed=True)['amount'].sum().unstack(fill_value=0)
+    daily = daily.reindex(columns=['Income', 'Expense'], fill_value=0).rename(columns={'Expense': 'Expenses'})
+    daily = daily.sort_index()
+    daily.columns.name = None
+
+    tiers = {}
+    for tier, rule in TIER_RULES.items():
+        if rule is None:
+            frame = daily.copy()
+        else:
+            frame = daily.resample(rule, label='left', closed='left').sum()
+            frame = frame[(frame['Income'] != 0) | (frame['Expenses'] != 0)]
+        frame['Balance'] = frame['Income'] - frame['Expenses']
+        tiers[tier] = frame
+    return tiers
+
+
+def get_tiers(df, data_version, max_versions=4):
+    with _tier_lock:
+        tiers = _tier_cache.get(data_version)
+        if tiers is not None:
+            _tier_cache.move_to_end(data_version)
+            return tiers
+
+    tiers = build_tiers(df)
+
+    with _tier_lock:
+        _tier_cache[data_version] = tiers
+        while len(_tier_cache) > max_versions:
+            _tier_cache.popitem(last=False)
+    return tiers
+
+
+def lttb_indices(x, y, threshold):
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    bucket_edges = np.linspace(1, n - 1, threshold - 1)
+    bucket_edges = np.floor(bucket_edges).astype(np.int64)
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, stop = bucket_edges[i], max(bucket_edges[i + 1], bucket_edges[i] + 1)
+        next_start = stop
+        next_stop = bucket_edges[i + 2] if i + 2 < len(bucket_edges) else n
+        next_stop = max(next_stop, next_start + 1)
+
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's mean
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:stop] - y[selected]) -
+            (x[selected] - x[start:stop]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        indices[i + 1] = selected
+
+    return indices
+
+
+def visible_points(tiers, tier, start, end):
+    frame = tiers[tier]
+    if frame.empty:
+        return frame
+    if start is not None and tier in TIER_PERIODS:
+        # A period that began before the range still overlaps it
+        start = pd.Timestamp(start).to_period(TIER_PERIODS[tier]).start_time
+    return frame.loc[start:end]
+
+
+def select_tier(tiers, start, end, max_points=MAX_CHART_POINTS):
+    for tier in TIER_RULES:
+        visible = visible_points(tiers, tier, start, end)
+        if len(visible) <= max_points:
+            return tier, visible
+    return 'year', visible_points(tiers, 'year', start, end)
+
+
+def downsample_cashflow(tiers, start, end, max_points=MAX_CHART_POINTS):
+    tier, visible = select_tier(tiers, start, end, max_points)
+    if len(visible) <= max_points:
+        return tier, visible
+
+    # Even yearly points overflow the budget: keep the visually significant ones of each series
+    x = visible.index.asi8
+    per_series = max(max_points // 2, 3)
+    keep = np.union1d(
+        lttb_indices(x, visible['Income'].to_numpy(), per_series),
+        lttb_indices(x, visible['Expenses'].to_numpy(), per_series)
+    )
+    return 'lttb', visible.iloc[keep[:max_points]]
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import pandas as pd
+from utils.profiling import traced, span
+
+# A snapshot is taken after this many events, so a load never replays more than this tail
+SNAPSHOT_EVERY = 500
+UNDOABLE_OPS = ('insert', 'delete', 'update', 'reset', 'restore')
+# These replace the whole ledger; restore and baseline point at a snapshot of the new state
+BULK_OPS = ('reset', 'restore', 'baseline')
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def _state_for(directory):
+    # Every session's handler over the same directory shares one sequence counter and lock
+    with _shared_lock:
+        state = _shared.get(directory)
+        if state is None:
+            state = {'lock': threading.RLock(), 'seq': None, 'at': None, 'segment': None}
+            _shared[directory] = state
+        return state
+
+
+class EventLog:
+
+    def __init__(self, directory, columns, key='id', date_column='date', date_format='%Y-%m-%d', snapshot_every=SNAPSHOT_EVERY):
+        self.directory = directory
+        self.columns = columns
+        self.key = key
+        self.date_column = date_column
+        self.date_format = date_format
+        self.snapshot_every = snapshot_every
+        self.segments_dir = os.path.join(directory, "events")
+        self.snapshots_dir = os.path.join(directory, "snapshots")
+        self.snapshots_file = os.path.join(directory, "snapshots.json")
+        self._state = _state_for(os.path.abspath(directory))
+
+        for path in (self.segments_dir, self.snapshots_dir):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    def _segments(self):
+        names = sorted(name for name in os.listdir(self.segments_dir) if name.endswith('.jsonl'))
+        return [(int(name.split('.')[0]), os.path.join(self.segments_dir, name)) for name in names]
+
+    @staticmethod
+    def _read_segment(path):
+        with open(path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def snapshots(self):
+        if not os.path.exists(self.snapshots_file):
+            return []
+        with open(self.snapshots_file, 'r') as f:
+            return json.load(f)
+
+    def _load_position(self):
+        state = self._state
+        if state['seq'] is not None:
+            return
+        segments = self._segments()
+        events = self._read_segment(segments[-1][1]) if segments else []
+        snapshots = self.snapshots()
+        if events:
+            state['seq'], state['at'] = events[-1]['seq'], events[-1]['at']
+        elif snapshots:
+            state['seq'], state['at'] = snapshots[-1]['seq'], snapshots[-1]['at']
+        else:
+            state['seq'], state['at'] = 0, None
+        # Appends continue the newest segment unless a snapshot has been taken since it started
+        if segments and (not snapshots or segments[-1][0] > snapshots[-1]['seq']):
+            state['segment'] = segments[-1][1]
+
+    def last_seq(self):
+        with self._state['lock']:
+            self._load_position()
+            return self._state['seq']
+
+    def records(self, frame):
+        if frame is None or frame.empty:
+            return []
+        frame = frame.reindex(columns=self.columns)
+        if pd.api.types.is_datetime64_any_dtype(frame[self.date_column]):
+            frame[self.date_column] = frame[self.date_column].dt.strftime(self.date_format)
+        return json.loads(frame.to_json(orient='records'))
+
+    def frame(self, records):
+        frame = pd.DataFrame(records or [], columns=self.columns).infer_objects()
+        frame[self.date_column] = pd.to_datetime(frame[self.date_column], format=self.date_format, errors='coerce')
+        return frame
+
+    @traced('io', name='EventLog.append')
+    def append(self, op, before=None, after=None, state=None, **extra):
+        with self._state['lock']:
+            self._load_position()
+            seq = self._state['seq'] + 1
+            event = {'seq': seq, 'at': datetime.now().isoformat(timespec='microseconds'), 'op': op}
+            event.update(extra)
+            if op not in BULK_OPS:
+                event['before'] = self.records(before)
+                event['after'] = self.records(after)
+
+            if self._state['segment'] is None:
+                self._state['segment'] = os.path.join(self.segments_dir, f"{seq:012d}.jsonl")
+            with open(self._state['segment'], 'a') as f:
+                f.write(json.dumps(event) + '\n')
+            self._state['seq'], self._state['at'] = seq, event['at']
+
+            if op in ('restore', 'baseline'):
+                self.snapshot(state)
+            return event
+
+    def _latest_snapshot_seq(self):
+        snapshots = self.snapshots()
+        return snapshots[-1]['seq'] if snapshots else 0
+
+    def due(self):
+        with self._state['lock']:
+            self._load_position()
+            return self._state['seq'] - self._latest_snapshot_seq() >= self.snapshot_every
+
+    def _snapshot_path(self, seq):
+        return os.path.join(self.snapshots_dir, f"{seq:012d}.csv.gz")
+
+    @traced('io', name='EventLog.snapshot')
+    def snapshot(self, frame):
+        with self._state['lock']:
+            self._load_position()
+            seq = self._state['seq']
+            path = self._snapshot_path(seq)
+            frame = frame.reindex(columns=self.columns)
+            # Fast compression: snapshots are written often and read only on replay
+            frame.to_csv(path + '.tmp', index=False, date_format=self.date_format, compression={'method': 'gzip', 'compresslevel': 1})
+            os.replace(path + '.tmp', path)
+
+            snapshots = [entry for entry in self.snapshots() if entry['seq'] != seq]
+            snapshots.append({'seq': seq, 'at': self._state['at'] or datetime.now().isoformat(timespec='microseconds'), 'rows': len(frame)})
+            with open(self.snapshots_file + '.tmp', 'w') as f:
+                json.dump(snapshots, f)
+            os.replace(self.snapshots_file + '.tmp', self.snapshots_file)
+
+            # The next event starts a new segment, so the tail after this snapshot is one short file
+            self._state['segment'] = None
+            return seq
+
+    def read_snapshot(self, seq):
+        if not seq:
+            return self.frame([])
+        return pd.read_csv(self._snapshot_path(seq), parse_dates=[self.date_column], date_format=self.date_format)
+
+    def events(self, after=0, until=None, through=None):
+        segments = self._segments()
+        for i, (first, path) in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1][0] <= after + 1:
+                continue
+            for event in self._read_segment(path):
+                if event['seq'] <= after:
+                    continue
+                if (until is not None and event['at'] > until) or (through is not None and event['seq'] > through):
+                    return
+                yield event
+
+    @traced('calc', name='EventLog.replay')
+    def replay(self, until=None, through=None):
+        if until is not None:
+            until = pd.Timestamp(until).isoformat(timespec='microseconds')
+
+        # Start from the newest snapshot at or before the requested point, then apply the tail
+        base_seq = 0
+        for entry in self.snapshots():
+            if (until is None or entry['at'] <= until) and (through is None or entry['seq'] <= through):
+                base_seq = entry['seq']
+        with span('read_snapshot', 'io', seq=base_seq):
+            base = self.read_snapshot(base_seq)
+
+        added = OrderedDict()
+        removed = set()
+        for event in self.events(after=base_seq, until=until, through=through):
+            if event['op'] in BULK_OPS:
+                base = self.read_snapshot(event['seq']) if event['op'] != 'reset' else self.frame([])
+                added.clear()
+                removed.clear()
+                continue
+            for row in event.get('before', []):
+                removed.add(row[self.key])
+                added.pop(row[self.key], None)
+            for row in event.get('after', []):
+                added[row[self.key]] = row
+
+        state = base[~base[self.key].isin(removed | set(added))]
+        if added:
+            state = pd.concat([state, self.frame(list(added.values()))], ignore_index=True)
+        return state.sort_values([self.date_column, self.key], kind='stable').reset_index(drop=True)
+
+    def undoable(self):
+        # Walk back from the newest event, skipping compensations and the events they already undid
+        undone = set()
+        for _, path in reversed(self._segments()):
+            for event in reversed(self._read_segment(path)):
+                if 'undoes' in event:
+                    undone.add(event['undoes'])
+                elif event['seq'] not in undone and event['op'] in UNDOABLE_OPS:
+                    return event
+        return None
+
+    def history(self, limit=20):
+        events = []
+        for _, path in reversed(self._segments()):
+            for event in reversed(self._read_segment(path)):
+                events.append({
+                    'seq': event['seq'],
+                    'at': event['at'],
+                    'op': event['op'],
+                    'rows': max(len(event.get('before', [])), len(event.get('after', []))),
+                    'undoes': event.get('undoes')
+                })
+                if len(events) >= limit:
+                    break
+            if len(events) >= limit:
+                break
+        history = pd.DataFrame(events, columns=['seq', 'at', 'op', 'rows', 'undoes'])
+        history['undoes'] = history['undoes'].astype('Int64')
+        return history
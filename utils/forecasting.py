@@ -0,0 +1,143 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.profiling import traced
+
+MODELS = OrderedDict([
+    ('moving_average', 'Moving Average'),
+    ('exponential_smoothing', 'Exponential Smoothing'),
+    ('seasonal', 'Seasonal Decomposition')
+])
+
+_forecast_cache = OrderedDict()
+_forecast_lock = threading.Lock()
+
+
+class CashFlowForecaster:
+
+    def __init__(self, window=6, alpha=0.4, beta=0.1, season_length=12):
+        self.window = window
+        self.alpha = alpha
+        self.beta = beta
+        self.season_length = season_length
+
+    @staticmethod
+    def build_matrix(rollup):
+        flows = rollup[rollup['type'].isin(['Income', 'Expense'])]
+        if flows.empty:
+            return pd.DataFrame()
+
+        periods = pd.to_datetime(pd.DataFrame({'year': flows['year'], 'month': flows['month'], 'day': 1})).dt.to_period('M')
+        # Uncategorized rows are a series of their own, as in the summaries
+        matrix = flows.assign(period=periods).groupby(
+            ['type', 'category', 'period'], observed=True, dropna=False
+        )['amount'].sum().unstack('period', fill_value=0.0)
+        # Months with no activity at all still count as zero observations
+        full_range = pd.period_range(matrix.columns.min(), matrix.columns.max(), freq='M')
+        return matrix.reindex(columns=full_range, fill_value=0.0)
+
+    def moving_average(self, values, horizon):
+        window = min(self.window, values.shape[1])
+        level = values[:, -window:].mean(axis=1)
+        return np.repeat(level[:, None], horizon, axis=1)
+
+    def exponential_smoothing(self, values, horizon):
+        # Holt's linear method, one time step at a time but vectorized across every series
+        level = values[:, 0].copy()
+        trend = np.zeros(values.shape[0]) if values.shape[1] < 2 else values[:, 1] - values[:, 0]
+        for t in range(1, values.shape[1]):
+            previous_level = level
+            level = self.alpha * values[:, t] + (1 - self.alpha) * (level + trend)
+            trend = self.beta * (level - previous_level) + (1 - self.beta) * trend
+        steps = np.arange(1, horizon + 1)
+        return np.maximum(level[:, None] + trend[:, None] * steps[None, :], 0)
+
+    def seasonal(self, values, horizon, first_period):
+        season = self.season_length
+        n_series, n_months = values.shape
+        if n_months < season * 2:
+            return self.exponential_smoothing(values, horizon)
+
+        # Centred 2x12 moving average as the trend component, from prefix sums across all series at once
+        half = season // 2
+        cumulative = np.concatenate([np.zeros((n_series, 1)), np.cumsum(values, axis=1)], axis=1)
+        centre = np.arange(half, n_months - half)
+        inner = cumulative[:, centre + half] - cumulative[:, centre - half + 1]
+        trend = np.full(values.shape, np.nan)
+        trend[:, centre] = (inner + 0.5 * values[:, centre - half] + 0.5 * values[:, centre + half]) / season
+
+        detrended = values - trend
+        month_of_year = (np.arange(n_months) + first_period.month - 1) % season
+        sums = np.zeros((n_series, season))
+        counts = np.zeros(season)
+        np.add.at(sums.T, month_of_year[centre], detrended[:, centre].T)
+        np.add.at(counts, month_of_year[centre], 1)
+        seasonal_index = sums / np.maximum(counts, 1)
+        seasonal_index -= seasonal_index.mean(axis=1, keepdims=True)
+
+        # Linear fit over the last two seasons of the trend carries it forward
+        recent = centre[-season * 2:]
+        x = recent - recent.mean()
+        slope = ((trend[:, recent] - trend[:, recent].mean(axis=1, keepdims=True)) * x).sum(axis=1) / (x ** 2).sum()
+        last_trend = trend[:, recent[-1]]
+
+        steps = np.arange(1, horizon + 1) + (n_months - 1 - recent[-1])
+        future_months = (np.arange(n_months, n_months + horizon) + first_period.month - 1) % season
+        forecast = last_trend[:, None] + slope[:, None] * steps[None, :] + seasonal_index[:, future_months]
+        return np.maximum(forecast, 0)
+
+    @traced('calc', name='CashFlowForecaster.forecast')
+    def forecast(self, rollup, horizon=12, model='exponential_smoothing'):
+        matrix = self.build_matrix(rollup)
+        if matrix.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        values = matrix.to_numpy(dtype=float)
+        first_period = matrix.columns[0]
+
+        if model == 'moving_average':
+            predicted = self.moving_average(values, horizon)
+        elif model == 'seasonal':
+            predicted = self.seasonal(values, horizon, first_period)
+        else:
+            predicted = self.exponential_smoothing(values, horizon)
+
+        future = pd.period_range(matrix.columns[-1] + 1, periods=horizon, freq='M')
+        by_category = pd.DataFrame(predicted, index=matrix.index, columns=future)
+
+        history = self._cash_flow(matrix)
+        projected = self._cash_flow(by_category)
+        projected['Cumulative Balance'] = history['Balance'].sum() + projected['Balance'].cumsum()
+        history['Cumulative Balance'] = history['Balance'].cumsum()
+        return pd.concat([history.assign(Forecast=False), projected.assign(Forecast=True)]), by_category
+
+    @staticmethod
+    def _cash_flow(matrix):
+        types = matrix.index.get_level_values('type')
+        flow = pd.DataFrame({
+            'Income': matrix[types == 'Income'].sum(axis=0),
+            'Expenses': matrix[types == 'Expense'].sum(axis=0)
+        })
+        flow['Balance'] = flow['Income'] - flow['Expenses']
+        flow.index = flow.index.to_timestamp()
+        flow.index.name = 'month'
+        return flow
+
+
+def get_forecast(rollup, data_version, horizon=12, model='exponential_smoothing', max_entries=16):
+    key = (data_version, horizon, model)
+    with _forecast_lock:
+        cached = _forecast_cache.get(key)
+        if cached is not None:
+            _forecast_cache.move_to_end(key)
+            return cached
+
+    # The report page's cached rollup is passed in, so the history is never aggregated twice
+    result = CashFlowForecaster().forecast(rollup, horizon=horizon, model=model)
+
+    with _forecast_lock:
+        _forecast_cache[key] = result
+        while len(_forecast_cache) > max_entries:
+            _forecast_cache.popitem(last=False)
+    return result
@@ -0,0 +1,167 @@
+import threading
+import pandas as pd
+from utils.parallel_reports import ReportGenerator, ROLLUP_COLUMNS, period_window
+from utils.profiling import traced
+
+FLOW_TYPES = ('Income', 'Expense')
+
+
+class MetricsStore:
+
+    def __init__(self):
+        self.cells = {}
+        self.month_totals = {}
+        self.data_version = None
+        self.currency = None
+        self.convert = None
+        self._results = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    @traced('calc', name='MetricsStore.from_frame')
+    def from_frame(cls, df, data_version=None, currency=None, convert=None):
+        store = cls()
+        store.data_version = data_version
+        # Frames arrive already in the reporting currency; write deltas go through convert
+        store.currency = currency
+        store.convert = convert
+        if df.empty:
+            return store
+
+        valid = df[df['date'].notna() & df['type'].isin(FLOW_TYPES)]
+        grouped = valid.groupby(
+            [valid['date'].dt.year, valid['date'].dt.month, 'type', 'category'],
+            observed=True, dropna=False
+        )['amount'].agg(['sum', 'count'])
+
+        # Uncategorized rows land in the same 'nan' cell that write deltas patch
+        for (year, month, trans_type, category), row in grouped.iterrows():
+            store._add_cell((int(year), int(month), str(trans_type), str(category)), row['sum'], int(row['count']))
+        return store
+
+    def attach(self, data_handler):
+        data_handler.subscribe(self.apply_change)
+        return self
+
+    def detach(self, data_handler):
+        data_handler.unsubscribe(self.apply_change)
+
+    def _add_cell(self, key, amount, count):
+        year, month, trans_type, category = key
+        month_cells = self.cells.setdefault((year, month), {})
+        cell = month_cells.setdefault((trans_type, category), [0.0, 0])
+        cell[0] += amount
+        cell[1] += count
+        if cell[1] <= 0:
+            del month_cells[(trans_type, category)]
+            if not month_cells:
+                del self.cells[(year, month)]
+
+        totals = self.month_totals.setdefault((year, month), {'Income': 0.0, 'Expense': 0.0, 'Income_count': 0, 'Expense_count': 0})
+        totals[trans_type] += amount
+        totals[f"{trans_type}_count"] += count
+        if totals['Income_count'] <= 0 and totals['Expense_count'] <= 0:
+            del self.month_totals[(year, month)]
+
+    def _apply_rows(self, rows, sign):
+        touched = set()
+        if rows is None or rows.empty:
+            return touched
+
+        if self.convert is not None:
+            rows = self.convert(rows)
+        dates = pd.to_datetime(rows['date'], format='mixed', errors='coerce')
+        for date, amount, trans_type, category in zip(dates, rows['amount'], rows['type'], rows['category']):
+            if pd.isna(date) or trans_type not in FLOW_TYPES:
+                continue
+            key = (date.year, date.month, str(trans_type), str(category))
+            self._add_cell(key, sign * float(amount), sign)
+            touched.add((date.year, date.month))
+        return touched
+
+    def apply_change(self, change):
+        with self._lock:
+            if change['op'] == 'reset':
+                self.cells.clear()
+                self.month_totals.clear()
+                self._results.clear()
+            else:
+                touched = self._apply_rows(change.get('before'), -1)
+                touched |= self._apply_rows(change.get('after'), 1)
+                # Only the results that read a touched month are dropped; everything else stays cached
+                for key in list(self._results):
+                    if key[0] in ('trend', 'comparison') or (key[1], key[2]) in touched:
+                        del self._results[key]
+            self.data_version = change.get('data_version')
+
+    def is_current(self, data_version, currency=None):
+        return self.data_version is not None and self.data_version == data_version and self.currency == currency
+
+    def get_monthly_summary(self, year, month):
+        key = ('summary', year, month)
+        with self._lock:
+            if key not in self._results:
+                totals = self.month_totals.get((year, month), {'Income': 0.0, 'Expense': 0.0})
+                total_income = totals['Income']
+                total_expenses = totals['Expense']
+                balance = total_income - total_expenses
+
+                savings_rate = 0
+                if total_income > 0:
+                    savings_rate = (balance / total_income) * 100
+
+                self._results[key] = {
+                    'total_income': total_income,
+                    'total_expenses': total_expenses,
+                    'balance': balance,
+                    'savings_rate': savings_rate
+                }
+            return dict(self._results[key])
+
+    def get_expense_by_category(self, year, month):
+        key = ('categories', year, month)
+        with self._lock:
+            if key not in self._results:
+                rows = [
+                    {'category': category, 'amount': cell[0]}
+                    for (trans_type, category), cell in self.cells.get((year, month), {}).items()
+                    if trans_type == 'Expense'
+                ]
+                if rows:
+                    result = pd.DataFrame(rows).sort_values('amount', ascending=False).reset_index(drop=True)
+                else:
+                    result = pd.DataFrame()
+                self._results[key] = result
+            return self._results[key].copy()
+
+    def get_monthly_trend(self, months=6):
+        key = ('trend', months, None)
+        with self._lock:
+            if key not in self._results:
+                recent = sorted(self.month_totals)[-months:] if months else []
+                if not recent:
+                    result = pd.DataFrame()
+                else:
+                    result = pd.DataFrame({
+                        'Income': [self.month_totals[period]['Income'] for period in recent],
+                        'Expenses': [self.month_totals[period]['Expense'] for period in recent]
+                    }, index=pd.DatetimeIndex([pd.Timestamp(year, month, 1) for year, month in recent], name='year_month'))
+                    result['Balance'] = result['Income'] - result['Expenses']
+                self._results[key] = result
+            return self._results[key].copy()
+
+    def get_comparison(self, granularity, year, index=1, basis='previous'):
+        key = ('comparison', (granularity, year, index, basis), None)
+        with self._lock:
+            if key not in self._results:
+                # Only the cells of the two compared periods are laid out as a rollup
+                windows = period_window(granularity, year, index, basis)
+                rows = [
+                    (period // 12, period % 12 + 1, trans_type, category, cell[0], cell[1])
+                    for start, end in windows
+                    for period in range(start, end)
+                    for (trans_type, category), cell in self.cells.get((period // 12, period % 12 + 1), {}).items()
+                ]
+                rollup = pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+                self._results[key] = ReportGenerator.compare_periods(rollup, granularity, year, index, basis)
+            return self._results[key].copy()
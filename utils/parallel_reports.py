@@ -0,0 +1,264 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from utils.profiling import traced
+
+ROLLUP_COLUMNS = ['year', 'month', 'type', 'category', 'amount', 'count']
+COMPARISON_COLUMNS = ['type', 'category', 'current', 'prior', 'change', 'change_pct']
+# Months per comparable period
+GRANULARITIES = {'month': 1, 'quarter': 3, 'year': 12}
+
+
+def period_window(granularity, year, index=1, basis='previous'):
+    # Month ordinals (year * 12 + month - 1) covering the period and the one it is compared against
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown period granularity: {granularity}")
+    if basis not in ('previous', 'year'):
+        raise ValueError(f"Unknown comparison basis: {basis}")
+    length = GRANULARITIES[granularity]
+    if not 1 <= index <= 12 // length:
+        raise ValueError(f"A {granularity} index must be between 1 and {12 // length}")
+    start = year * 12 + (index - 1) * length
+    prior = start - (12 if basis == 'year' else length)
+    return (start, start + length), (prior, prior + length)
+
+
+def _attach(spec):
+    name, dtype, length = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+
+
+def _aggregate_slice(months, types, cats, amounts, start, stop, n_types, n_cats):
+    # One flat key per (month, type, category) cell so a single bincount does the groupby
+    base = int(months[start])
+    span = int(months[stop - 1]) - base + 1
+    keys = ((months[start:stop].astype(np.int64) - base) * n_types + types[start:stop]) * n_cats + cats[start:stop]
+    sums = np.bincount(keys, weights=amounts[start:stop], minlength=span * n_types * n_cats)
+    counts = np.bincount(keys, minlength=span * n_types * n_cats)
+    cells = np.flatnonzero(counts)
+    cat_codes = cells % n_cats
+    type_codes = (cells // n_cats) % n_types
+    month_codes = cells // (n_cats * n_types) + base
+    return month_codes, type_codes, cat_codes, sums[cells], counts[cells]
+
+
+def _aggregate_shared(specs, start, stop, n_types, n_cats):
+    handles = [_attach(spec) for spec in specs]
+    try:
+        arrays = [array for _, array in handles]
+        result = _aggregate_slice(*arrays, start, stop, n_types, n_cats)
+        return tuple(np.array(part) for part in result)
+    finally:
+        for shm, _ in handles:
+            shm.close()
+
+
+class ReportGenerator:
+
+    def __init__(self, max_workers=None, min_rows_per_worker=250000):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_rows_per_worker = min_rows_per_worker
+
+    @traced('calc')
+    def build_rollup(self, df):
+        if df.empty:
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+        valid = df[df['date'].notna()]
+        if valid.empty:
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+        months = (valid['date'].dt.year.to_numpy(np.int32) * 12 + valid['date'].dt.month.to_numpy(np.int32) - 1)
+        type_codes, type_labels = pd.factorize(valid['type'], use_na_sentinel=False)
+        cat_codes, cat_labels = pd.factorize(valid['category'], use_na_sentinel=False)
+        amounts = pd.to_numeric(valid['amount'], errors='coerce').fillna(0).to_numpy(np.float64)
+
+        # Sorting by month makes every year a contiguous slice that a worker can own
+        order = np.argsort(months, kind='stable')
+        columns = [
+            months[order],
+            type_codes[order].astype(np.int32),
+            cat_codes[order].astype(np.int32),
+            amounts[order],
+        ]
+
+        tasks = self._partition(columns[0])
+        n_types, n_cats = len(type_labels), len(cat_labels)
+
+        if len(tasks) == 1:
+            parts = [_aggregate_slice(*columns, 0, len(order), n_types, n_cats)]
+        else:
+            parts = self._run_parallel(columns, tasks, n_types, n_cats)
+
+        return self._merge(parts, type_labels, cat_labels, n_types, n_cats)
+
+    def _partition(self, sorted_months):
+        n_rows = len(sorted_months)
+        workers = min(self.max_workers, n_rows // self.min_rows_per_worker)
+        if workers <= 1:
+            return [(0, n_rows)]
+
+        years = sorted_months // 12
+        boundaries = np.flatnonzero(np.diff(years)) + 1
+        year_starts = np.concatenate([[0], boundaries])
+        year_stops = np.concatenate([boundaries, [n_rows]])
+
+        if len(year_starts) < workers:
+            # Few, heavy years: split on month boundaries instead
+            boundaries = np.flatnonzero(np.diff(sorted_months)) + 1
+            year_starts = np.concatenate([[0], boundaries])
+            year_stops = np.concatenate([boundaries, [n_rows]])
+
+        target = n_rows / workers
+        tasks = []
+        start = 0
+        for stop in year_stops:
+            if stop - start >= target:
+                tasks.append((start, int(stop)))
+                start = int(stop)
+        if start < n_rows:
+            tasks.append((start, n_rows))
+        return tasks
+
+    def _run_parallel(self, columns, tasks, n_types, n_cats):
+        blocks = []
+        try:
+            specs = []
+            for column in columns:
+                shm = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+                blocks.append(shm)
+                np.ndarray(column.shape, dtype=column.dtype, buffer=shm.buf)[:] = column
+                specs.append((shm.name, column.dtype.str, len(column)))
+
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+                futures = [
+                    pool.submit(_aggregate_shared, specs, start, stop, n_types, n_cats)
+                    for start, stop in tasks
+                ]
+                return [future.result() for future in futures]
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    @staticmethod
+    def _merge(parts, type_labels, cat_labels, n_types, n_cats):
+        month_codes = np.concatenate([part[0] for part in parts])
+        type_codes = np.concatenate([part[1] for part in parts])
+        cat_codes = np.concatenate([part[2] for part in parts])
+        sums = np.concatenate([part[3] for part in parts])
+        counts = np.concatenate([part[4] for part in parts])
+
+        # Adjacent partitions can share a month when split on month boundaries
+        keys = (month_codes * n_types + type_codes) * n_cats + cat_codes
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        merged_sums = np.bincount(inverse, weights=sums)
+        merged_counts = np.bincount(inverse, weights=counts).astype(np.int64)
+
+        month_codes = unique_keys // (n_types * n_cats)
+        rollup = pd.DataFrame({
+            'year': month_codes // 12,
+            'month': month_codes % 12 + 1,
+            'type': np.asarray(type_labels, dtype=object)[(unique_keys // n_cats) % n_types],
+            'category': np.asarray(cat_labels, dtype=object)[unique_keys % n_cats],
+            'amount': merged_sums,
+            'count': merged_counts
+        })
+        return rollup
+
+    @staticmethod
+    def get_yearly_summary(rollup, year):
+        yearly_data = rollup[rollup['year'] == year]
+
+        total_income = yearly_data[yearly_data['type'] == 'Income']['amount'].sum()
+        total_expenses = yearly_data[yearly_data['type'] == 'Expense']['amount'].sum()
+        balance = total_income - total_expenses
+
+        months_count = yearly_data['month'].nunique()
+        if months_count == 0:
+            months_count = 1
+
+        return {
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'balance': balance,
+            'average_monthly_income': total_income / months_count,
+            'average_monthly_expenses': total_expenses / months_count
+        }
+
+    @staticmethod
+    def get_category_analysis(rollup, year):
+        if rollup.empty:
+            return pd.DataFrame()
+
+        yearly_data = rollup[rollup['year'] == year]
+
+        category_summary = yearly_data.groupby(['type', 'category'])['amount'].sum().reset_index()
+        category_summary = category_summary.sort_values('amount', ascending=False)
+
+        return category_summary
+
+    @staticmethod
+    def get_monthly_trend(rollup, months=6):
+        if rollup.empty:
+            return pd.DataFrame()
+
+        periods = pd.to_datetime(pd.DataFrame({'year': rollup['year'], 'month': rollup['month'], 'day': 1}))
+        flows = rollup.assign(period=periods)
+
+        income_trend = flows[flows['type'] == 'Income'].groupby('period')['amount'].sum()
+        expense_trend = flows[flows['type'] == 'Expense'].groupby('period')['amount'].sum()
+
+        trend_df = pd.DataFrame({
+            'Income': income_trend,
+            'Expenses': expense_trend
+        }).fillna(0)
+
+        trend_df['Balance'] = trend_df['Income'] - trend_df['Expenses']
+        trend_df.index.name = 'year_month'
+
+        trend_df = trend_df.sort_index().tail(months)
+
+        return trend_df
+
+    @staticmethod
+    def compare_periods(rollup, granularity, year, index=1, basis='previous'):
+        # Both sides are sliced from the same month rollup, so a comparison costs one pass like a summary
+        (start, end), (prior_start, prior_end) = period_window(granularity, year, index, basis)
+        if rollup.empty:
+            return pd.DataFrame(columns=COMPARISON_COLUMNS)
+
+        months = rollup['year'].to_numpy(np.int64) * 12 + rollup['month'].to_numpy(np.int64) - 1
+        current = (months >= start) & (months < end)
+        prior = (months >= prior_start) & (months < prior_end)
+        cells = rollup[current | prior]
+        if cells.empty:
+            return pd.DataFrame(columns=COMPARISON_COLUMNS)
+
+        side = np.where(current[current | prior], 'current', 'prior')
+        # dropna=False keeps uncategorized rows, which the summaries count too
+        table = cells.assign(side=side).groupby(
+            ['type', 'category', 'side'], observed=True, dropna=False
+        )['amount'].sum().unstack('side', fill_value=0.0).reindex(columns=['current', 'prior'], fill_value=0.0)
+        table.columns.name = None
+
+        table['change'] = table['current'] - table['prior']
+        # A category with nothing in the prior period has no meaningful percentage
+        table['change_pct'] = (table['change'] / table['prior'].where(table['prior'] != 0) * 100).astype(float)
+        table = table.reset_index().sort_values(['type', 'current'], ascending=[True, False])
+        return table[COMPARISON_COLUMNS].reset_index(drop=True)
+
+    @staticmethod
+    def compare_totals(comparison):
+        totals = pd.DataFrame(0.0, index=pd.Index(['Income', 'Expenses', 'Balance'], name='type'), columns=['current', 'prior'])
+        if not comparison.empty:
+            flows = comparison.groupby('type')[['current', 'prior']].sum()
+            totals.loc['Income'] = flows.loc['Income'] if 'Income' in flows.index else 0.0
+            totals.loc['Expenses'] = flows.loc['Expense'] if 'Expense' in flows.index else 0.0
+        totals.loc['Balance'] = totals.loc['Income'] - totals.loc['Expenses']
+        totals['change'] = totals['current'] - totals['prior']
+        totals['change_pct'] = totals['change'] / totals['prior'].abs().where(totals['prior'] != 0) * 100
+        return totals
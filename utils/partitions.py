@@ -0,0 +1,254 @@
+import io
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.profiling import span
+
+MANIFEST_VERSION = 1
+# The current month and the one before stay as plain appendable CSV; anything older is sealed
+HOT_MONTHS = 2
+# zlib window bits that accept a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def period_of(value):
+    return pd.Timestamp(value).strftime('%Y-%m')
+
+
+def merge_summaries(left, right):
+    merged = dict(left)
+    for key, value in right.items():
+        if isinstance(value, dict):
+            merged[key] = merge_summaries(merged.get(key, {}), value)
+        else:
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def hot_cutoff(hot_months=HOT_MONTHS, now=None):
+    now = pd.Timestamp(now or datetime.now())
+    return (now.to_period('M') - (hot_months - 1)).strftime('%Y-%m')
+
+
+class PartitionStore:
+
+    def __init__(self, directory, columns, date_column='date', date_format='%Y-%m-%d', hot_months=HOT_MONTHS, summarize=None, key=None):
+        self.directory = directory
+        self.columns = columns
+        self.key = key
+        self.date_column = date_column
+        self.date_format = date_format
+        self.hot_months = hot_months
+        self.summarize = summarize
+        self.manifest_file = os.path.join(directory, "manifest.json")
+        self._lock = threading.RLock()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def exists(self):
+        return os.path.exists(self.manifest_file)
+
+    def load_manifest(self):
+        if not self.exists():
+            return {'version': MANIFEST_VERSION, 'columns': self.columns, 'next_key': 1, 'partitions': []}
+        with open(self.manifest_file, 'r') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        manifest['partitions'].sort(key=lambda entry: entry['period'])
+        # Readers only ever see a complete manifest: write aside, then swap in
+        temporary = self.manifest_file + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temporary, self.manifest_file)
+
+    def get_version(self):
+        if not self.exists():
+            return ''
+        # Sealed files never change; the hot CSVs are included so edits made outside the app are seen
+        parts = [self.manifest_file] + [self._path(entry) for entry in self.load_manifest()['partitions'] if not entry['sealed']]
+        stats = [os.stat(path) for path in parts if os.path.exists(path)]
+        return ':'.join(f"{stat.st_mtime_ns}-{stat.st_size}" for stat in stats)
+
+    def partitions(self, start=None, end=None):
+        first = period_of(start) if start is not None else None
+        last = period_of(end) if end is not None else None
+
+        offset = 0
+        selected = []
+        for entry in self.load_manifest()['partitions']:
+            if (first is None or entry['period'] >= first) and (last is None or entry['period'] <= last):
+                selected.append(dict(entry, offset=offset))
+            offset += entry['rows']
+        return selected
+
+    def total_rows(self):
+        return sum(entry['rows'] for entry in self.load_manifest()['partitions'])
+
+    def _path(self, entry):
+        return os.path.join(self.directory, entry['file'])
+
+    def read_partition(self, entry, **read_kwargs):
+        frame = pd.read_csv(self._path(entry), **read_kwargs)
+        if 'offset' in entry:
+            # Rows keep their position in the full history so edits can address them
+            frame.index = pd.RangeIndex(entry['offset'], entry['offset'] + len(frame))
+        return frame
+
+    def read_chunks(self, entry, chunksize, **read_kwargs):
+        # Sealed files are replaced, never rewritten, so an open reader keeps a consistent view
+        with pd.read_csv(self._path(entry), chunksize=chunksize, **read_kwargs) as reader:
+            yield from reader
+
+    def _read_bytes(self, entry):
+        with open(self._path(entry), 'rb') as f:
+            data = f.read()
+        if entry['file'].endswith('.gz'):
+            # One zlib call per file; gzip.open's buffered reader costs more than the inflate on small months
+            data = zlib.decompress(data, GZIP_WBITS)
+        return data if data.endswith(b'\n') else data + b'\n'
+
+    def read(self, start=None, end=None, **read_kwargs):
+        with self._lock:
+            selected = self.partitions(start, end)
+            if not selected:
+                return pd.DataFrame(columns=self.columns)
+            with span('read_partitions', 'io', partitions=len(selected)):
+                # One parse over the stitched partitions instead of a reader per month
+                chunks = [self._read_bytes(entry) for entry in selected]
+                chunks[1:] = [chunk[chunk.index(b'\n') + 1:] for chunk in chunks[1:]]
+                frame = pd.read_csv(io.BytesIO(b''.join(chunks)), **read_kwargs)
+        # Selected partitions are contiguous, so positions continue from the first offset
+        offset = selected[0]['offset']
+        frame.index = pd.RangeIndex(offset, offset + len(frame))
+        return frame
+
+    def _assign_keys(self, manifest, frame):
+        if self.key is None:
+            return frame
+        # Keys come from a counter kept in the manifest, so they are never reused, even after a reset
+        next_key = manifest.get('next_key', 1)
+        missing = frame[self.key].isna().to_numpy()
+        if missing.any():
+            frame = frame.copy()
+            frame.loc[missing, self.key] = np.arange(next_key, next_key + missing.sum())
+        if len(frame):
+            frame[self.key] = frame[self.key].astype('int64')
+            next_key = max(next_key, int(frame[self.key].max()) + 1)
+        manifest['next_key'] = next_key
+        return frame
+
+    def reserve_keys(self, next_key):
+        # Restoring older files must not hand out keys that were already used since
+        with self._lock:
+            manifest = self.load_manifest()
+            if manifest.get('next_key', 1) < next_key:
+                manifest['next_key'] = next_key
+                self._save_manifest(manifest)
+
+    def _entry(self, period, frame, generation, sealed):
+        name = f"{period}.g{generation}.csv.gz" if sealed else f"{period}.csv"
+        return {
+            'period': period,
+            'file': name,
+            'rows': len(frame),
+            'generation': generation,
+            'sealed': sealed,
+            'summary': self.summarize(frame) if self.summarize is not None and len(frame) else {}
+        }
+
+    def _write(self, manifest, period, frame):
+        # Sealed partitions are never modified in place; a change writes the next generation
+        current = next((entry for entry in manifest['partitions'] if entry['period'] == period), None)
+        sealed = period < hot_cutoff(self.hot_months)
+        generation = current['generation'] + 1 if current is not None else 1
+        frame = self._assign_keys(manifest, frame.reindex(columns=self.columns))
+
+        manifest['partitions'] = [entry for entry in manifest['partitions'] if entry['period'] != period]
+        if len(frame):
+            entry = self._entry(period, frame, generation, sealed)
+            path = self._path(entry)
+            if sealed:
+                frame.to_csv(path, index=False, date_format=self.date_format, compression='gzip')
+            else:
+                frame.to_csv(path + '.tmp', index=False, date_format=self.date_format)
+                os.replace(path + '.tmp', path)
+            manifest['partitions'].append(entry)
+
+        if current is not None and (not len(frame) or current['file'] != entry['file']):
+            return self._path(current)
+        return None
+
+    def write_partitions(self, frames):
+        with self._lock:
+            manifest = self.load_manifest()
+            stale = [self._write(manifest, period, frame) for period, frame in frames.items()]
+            stale += self._seal(manifest)
+            self._save_manifest(manifest)
+            self._remove(stale)
+
+    def append(self, rows):
+        if rows.empty:
+            return rows
+        rows = rows.reindex(columns=self.columns)
+        periods = rows[self.date_column].astype(str).str[:7]
+
+        with self._lock:
+            manifest = self.load_manifest()
+            rows = self._assign_keys(manifest, rows)
+            entries = {entry['period']: entry for entry in manifest['partitions']}
+            stale = []
+            for period, group in rows.groupby(periods, sort=True):
+                entry = entries.get(period)
+                if entry is not None and not entry['sealed']:
+                    # Hot partitions take new rows in place
+                    group.to_csv(self._path(entry), mode='a', header=False, index=False, date_format=self.date_format)
+                    entry['rows'] += len(group)
+                    if self.summarize is not None:
+                        entry['summary'] = merge_summaries(entry.get('summary', {}), self.summarize(group))
+                elif entry is not None:
+                    existing = pd.read_csv(self._path(entry))
+                    stale.append(self._write(manifest, period, pd.concat([existing, group], ignore_index=True)))
+                else:
+                    stale.append(self._write(manifest, period, group))
+            stale += self._seal(manifest)
+            self._save_manifest(manifest)
+            self._remove(stale)
+        return rows
+
+    def replace(self, df):
+        df = df.reindex(columns=self.columns)
+        periods = df[self.date_column].astype(str).str[:7]
+        with self._lock:
+            previous = self.load_manifest()
+            old = [self._path(entry) for entry in previous['partitions']]
+            manifest = {'version': MANIFEST_VERSION, 'columns': self.columns, 'next_key': previous.get('next_key', 1), 'partitions': []}
+            df = self._assign_keys(manifest, df)
+            for period, group in df.groupby(periods, sort=True):
+                self._write(manifest, period, group)
+            self._save_manifest(manifest)
+            current = {self._path(entry) for entry in manifest['partitions']}
+            self._remove([path for path in old if path not in current])
+        return df
+
+    def clear(self):
+        self.replace(pd.DataFrame(columns=self.columns))
+
+    def _seal(self, manifest):
+        cutoff = hot_cutoff(self.hot_months)
+        stale = []
+        for entry in list(manifest['partitions']):
+            if not entry['sealed'] and entry['period'] < cutoff:
+                frame = pd.read_csv(self._path(entry))
+                stale.append(self._write(manifest, entry['period'], frame))
+        return stale
+
+    def _remove(self, paths):
+        for path in paths:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,182 @@
+import functools
+import os
+import secrets
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class Trace:
+
+    def __init__(self, max_spans=5000):
+        self.spans = deque(maxlen=max_spans)
+        self.track_allocations = False
+        self.run_id = 0
+        self.trace_id = secrets.token_hex(16)
+        self._wall_origin_ns = time.time_ns()
+        self._perf_origin_ns = time.perf_counter_ns()
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def begin_run(self):
+        self.run_id += 1
+        self._stack = []
+        return self.run_id
+
+    def set_track_allocations(self, enabled):
+        # tracemalloc is process-wide, so it is only ever started here and left running for other sessions
+        self.track_allocations = enabled
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def record(self, name, category, start_ns, end_ns, alloc_bytes, span_id, parent_id, depth, attributes):
+        with self._lock:
+            self.spans.append({
+                'run': self.run_id,
+                'name': name,
+                'category': category,
+                'start_ns': start_ns - self._perf_origin_ns,
+                'duration_ms': (end_ns - start_ns) / 1e6,
+                'alloc_kb': alloc_bytes / 1024 if alloc_bytes is not None else None,
+                'span_id': span_id,
+                'parent_id': parent_id,
+                'depth': depth,
+                'thread': threading.get_ident(),
+                'attributes': attributes
+            })
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def get_spans(self, run=None):
+        with self._lock:
+            spans = list(self.spans)
+        if run is not None:
+            spans = [recorded for recorded in spans if recorded['run'] == run]
+        return spans
+
+    def last_completed_run(self):
+        runs = [recorded['run'] for recorded in self.get_spans() if recorded['run'] < self.run_id]
+        return max(runs) if runs else None
+
+    def summarize(self, run=None):
+        totals = {}
+        for recorded in self.get_spans(run):
+            entry = totals.setdefault(recorded['name'], {
+                'name': recorded['name'],
+                'category': recorded['category'],
+                'calls': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'alloc_kb': 0.0
+            })
+            entry['calls'] += 1
+            entry['total_ms'] += recorded['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], recorded['duration_ms'])
+            entry['alloc_kb'] += recorded['alloc_kb'] or 0.0
+        rows = sorted(totals.values(), key=lambda entry: entry['total_ms'], reverse=True)
+        for entry in rows:
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        return rows
+
+    def to_chrome_trace(self, run=None):
+        pid = os.getpid()
+        events = []
+        for recorded in self.get_spans(run):
+            args = dict(recorded['attributes'] or {})
+            args['run'] = recorded['run']
+            if recorded['alloc_kb'] is not None:
+                args['alloc_kb'] = round(recorded['alloc_kb'], 1)
+            events.append({
+                'name': recorded['name'],
+                'cat': recorded['category'],
+                'ph': 'X',
+                'ts': recorded['start_ns'] / 1000,
+                'dur': recorded['duration_ms'] * 1000,
+                'pid': pid,
+                'tid': recorded['thread'],
+                'args': args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_otlp(self, run=None, service_name='finance-tracker'):
+        spans = []
+        for recorded in self.get_spans(run):
+            start = self._wall_origin_ns + recorded['start_ns']
+            attributes = [
+                {'key': 'finance.category', 'value': {'stringValue': recorded['category']}},
+                {'key': 'finance.run', 'value': {'intValue': str(recorded['run'])}}
+            ]
+            if recorded['alloc_kb'] is not None:
+                attributes.append({'key': 'finance.alloc_kb', 'value': {'doubleValue': recorded['alloc_kb']}})
+            for key, value in (recorded['attributes'] or {}).items():
+                attributes.append({'key': key, 'value': {'stringValue': str(value)}})
+            spans.append({
+                'traceId': self.trace_id,
+                'spanId': recorded['span_id'],
+                'parentSpanId': recorded['parent_id'] or '',
+                'name': recorded['name'],
+                'kind': 1,
+                'startTimeUnixNano': str(start),
+                'endTimeUnixNano': str(start + int(recorded['duration_ms'] * 1e6)),
+                'attributes': attributes
+            })
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+                'scopeSpans': [{'scope': {'name': 'utils.profiling'}, 'spans': spans}]
+            }]
+        }
+
+
+def activate(trace):
+    _local.trace = trace
+
+
+def deactivate():
+    _local.trace = None
+
+
+def get_active_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def span(name, category='app', **attributes):
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+
+    parent_id = trace._stack[-1] if trace._stack else None
+    span_id = secrets.token_hex(8)
+    trace._stack.append(span_id)
+    measure_alloc = trace.track_allocations and tracemalloc.is_tracing()
+    alloc_before = tracemalloc.get_traced_memory()[0] if measure_alloc else None
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter_ns()
+        alloc = tracemalloc.get_traced_memory()[0] - alloc_before if measure_alloc else None
+        trace._stack.pop()
+        trace.record(name, category, started, ended, alloc, span_id, parent_id, len(trace._stack), attributes)
+
+
+def traced(category='app', name=None):
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, 'trace', None) is None:
+                return fn(*args, **kwargs)
+            with span(span_name, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
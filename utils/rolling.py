@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.profiling import traced
+
+TRAILING_WINDOWS = [7, 30, 90]
+
+_prefix_cache = OrderedDict()
+_prefix_lock = threading.Lock()
+
+
+def to_day(value):
+    return np.datetime64(pd.Timestamp(value).normalize().date(), 'D')
+
+
+class PrefixSums:
+    # Row i holds each (type, category) series' total over all days before day i, so any window is two rows apart
+
+    def __init__(self, first_day=None, series=(), prefix=None):
+        self.first_day = first_day
+        self.series = list(series)
+        self.prefix = prefix if prefix is not None else np.zeros((1, 0))
+        self.data_version = None
+        self.currency = None
+        self.convert = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    @traced('calc', name='PrefixSums.from_frame')
+    def from_frame(cls, df, data_version=None, currency=None, convert=None):
+        sums = cls._build(df)
+        sums.data_version = data_version
+        # Like MetricsStore: frames arrive in the reporting currency, write deltas go through convert
+        sums.currency = currency
+        sums.convert = convert
+        return sums
+
+    @classmethod
+    def _build(cls, df):
+        valid = df[df['date'].notna()] if not df.empty else df
+        if valid.empty:
+            return cls()
+
+        dates = valid['date'] if pd.api.types.is_datetime64_any_dtype(valid['date']) else pd.to_datetime(valid['date'], format='mixed')
+        days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        first_day = days.min()
+        offsets = (days - first_day).astype(np.int64)
+        n_days = int(offsets.max()) + 1
+
+        grouped = valid.groupby(['type', 'category'], observed=True, sort=True, dropna=False)
+        codes = grouped.ngroup().to_numpy(dtype=np.int64)
+        series = [(trans_type, category) for trans_type, category in grouped.size().index]
+        amounts = pd.to_numeric(valid['amount'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+        # One bincount fills the whole day x series grid; a cumulative sum down the days turns it into prefix sums
+        daily = np.bincount(offsets * len(series) + codes, weights=amounts, minlength=n_days * len(series))
+        prefix = np.zeros((n_days + 1, len(series)))
+        np.cumsum(daily.reshape(n_days, len(series)), axis=0, out=prefix[1:])
+        return cls(first_day, series, prefix)
+
+    def attach(self, data_handler):
+        data_handler.subscribe(self.apply_change)
+        return self
+
+    def detach(self, data_handler):
+        data_handler.unsubscribe(self.apply_change)
+
+    def is_current(self, data_version, currency=None):
+        return self.data_version is not None and self.data_version == data_version and self.currency == currency
+
+    def _column(self, trans_type, category):
+        for position, (known_type, known_category) in enumerate(self.series):
+            if known_type == trans_type and (known_category == category or (pd.isna(known_category) and pd.isna(category))):
+                return position
+        self.series.append((trans_type, category))
+        self.prefix = np.hstack([self.prefix, np.zeros((len(self.prefix), 1))])
+        return len(self.series) - 1
+
+    def _offset(self, day):
+        # Grows the day axis to cover the day: zero rows before the first day, repeated totals after the last
+        if self.first_day is None:
+            self.first_day = day
+            self.prefix = np.zeros((2, len(self.series)))
+        elif day < self.first_day:
+            self.prefix = np.vstack([np.zeros((int((self.first_day - day).astype(np.int64)), len(self.series))), self.prefix])
+            self.first_day = day
+        offset = int((day - self.first_day).astype(np.int64))
+        if offset >= self.days:
+            self.prefix = np.vstack([self.prefix, np.repeat(self.prefix[-1:], offset - self.days + 1, axis=0)])
+        return offset
+
+    def _apply_rows(self, rows, sign):
+        if rows is None or rows.empty:
+            return
+        if self.convert is not None:
+            rows = self.convert(rows)
+        dates = pd.to_datetime(rows['date'], format='mixed', errors='coerce')
+        amounts = pd.to_numeric(rows['amount'], errors='coerce').fillna(0)
+        for date, amount, trans_type, category in zip(dates, amounts, rows['type'], rows['category']):
+            if pd.isna(date):
+                continue
+            # Both calls may grow the array, so they run before it is indexed
+            column = self._column(trans_type, category)
+            offset = self._offset(to_day(date))
+            # A row on day d moves every prefix row after it
+            self.prefix[offset + 1:, column] += sign * float(amount)
+
+    def apply_change(self, change):
+        with self._lock:
+            if change['op'] == 'reset':
+                self.first_day, self.series, self.prefix = None, [], np.zeros((1, 0))
+            else:
+                self._apply_rows(change.get('before'), -1)
+                self._apply_rows(change.get('after'), 1)
+            self.data_version = change.get('data_version')
+
+    @property
+    def days(self):
+        return len(self.prefix) - 1
+
+    def _columns(self, trans_type=None, category=None):
+        return np.array([
+            (trans_type is None or key[0] == trans_type) and (category is None or key[1] == category)
+            for key in self.series
+        ], dtype=bool)
+
+    def _position(self, day):
+        return int(np.clip((to_day(day) - self.first_day).astype(np.int64), 0, self.days))
+
+    def window_sum(self, start, end, trans_type='Expense', category=None):
+        # Both dates are included
+        with self._lock:
+            if not self.days:
+                return 0.0
+            columns = self._columns(trans_type, category)
+            low, high = self._position(start), self._position(pd.Timestamp(end) + pd.Timedelta(days=1))
+            return float((self.prefix[high, columns] - self.prefix[low, columns]).sum())
+
+    def trailing(self, days, as_of=None, trans_type='Expense', category=None):
+        end = pd.Timestamp(as_of or datetime.now()).normalize()
+        return self.window_sum(end - pd.Timedelta(days=days - 1), end, trans_type, category)
+
+    def rolling(self, days, trans_type='Expense', category=None, start=None, end=None):
+        # Every day's trailing total at once: the cumulative series minus itself shifted by the window
+        with self._lock:
+            if not self.days:
+                return pd.Series(dtype=float)
+            cumulative = self.prefix[:, self._columns(trans_type, category)].sum(axis=1)
+            first = self._position(start) if start is not None else 0
+            last = self._position(pd.Timestamp(end) + pd.Timedelta(days=1)) if end is not None else self.days
+            if last <= first:
+                return pd.Series(dtype=float)
+            positions = np.arange(first + 1, last + 1)
+            values = cumulative[positions] - cumulative[np.maximum(positions - days, 0)]
+            index = pd.DatetimeIndex((self.first_day + positions - 1).astype('datetime64[ns]'), name='date')
+            return pd.Series(values, index=index)
+
+
+def get_prefix_sums(df, data_version, max_versions=4):
+    with _prefix_lock:
+        sums = _prefix_cache.get(data_version)
+        if sums is not None:
+            _prefix_cache.move_to_end(data_version)
+            return sums
+
+    sums = PrefixSums.from_frame(df, data_version)
+
+    with _prefix_lock:
+        _prefix_cache[data_version] = sums
+        while len(_prefix_cache) > max_versions:
+            _prefix_cache.popitem(last=False)
+    return sums
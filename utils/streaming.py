@@ -0,0 +1,215 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.backends import ColumnarBackend, period_range
+from utils.parallel_reports import ROLLUP_COLUMNS, ReportGenerator
+from utils.profiling import span
+
+DEFAULT_MEMORY_LIMIT_MB = 512
+# Ledgers this long are summarized from disk instead of being loaded whole
+OUT_OF_CORE_ROWS = 5_000_000
+# Planning figure for one parsed row in flight, strings included
+ROW_BYTES = 256
+MIN_CHUNK_ROWS = 1000
+SPILL_BUCKETS = 16
+
+_limits = {'memory_mb': int(os.environ.get('FINANCE_MEMORY_LIMIT_MB', DEFAULT_MEMORY_LIMIT_MB))}
+_rollup_cache = OrderedDict()
+_rollup_lock = threading.Lock()
+
+
+def set_memory_limit(megabytes):
+    megabytes = int(megabytes)
+    if megabytes < 1:
+        raise ValueError("The memory cap must be at least 1 MB")
+    _limits['memory_mb'] = megabytes
+    return megabytes
+
+
+def get_memory_limit():
+    return _limits['memory_mb']
+
+
+def _nbytes(frame):
+    return int(frame.memory_usage(index=False, deep=True).sum())
+
+
+def chunk_totals(chunk, keys):
+    # Key codes are combined into one integer group id and summed with bincount, far cheaper than a groupby per chunk
+    group = np.zeros(len(chunk), dtype=np.int64)
+    labels = []
+    for key in keys:
+        codes, uniques = pd.factorize(chunk[key], use_na_sentinel=False)
+        group = group * len(uniques) + codes
+        labels.append(np.asarray(uniques, dtype=object))
+    ids, inverse = np.unique(group, return_inverse=True)
+    amounts = pd.to_numeric(chunk['amount'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+    # Chunks disagree on categories, so partials carry plain labels to merge on
+    columns = {}
+    for key, uniques in zip(reversed(keys), reversed(labels)):
+        columns[key] = uniques[ids % len(uniques)]
+        ids = ids // len(uniques)
+    partial = pd.DataFrame({key: columns[key] for key in keys})
+    partial['amount'] = np.bincount(inverse, weights=amounts, minlength=len(partial))
+    partial['count'] = np.bincount(inverse, minlength=len(partial))
+    return partial
+
+
+class PartialAggregate:
+    # Group sums and counts merged across chunks; once merging no longer fits the budget, groups go to disk by key hash
+
+    def __init__(self, keys, memory_limit, buckets=SPILL_BUCKETS, directory=None):
+        self.keys = keys
+        self.memory_limit = memory_limit
+        self.buckets = buckets
+        self.directory = directory
+        self.spills = 0
+        self.peak_bytes = 0
+        self._parts = []
+        self._bytes = 0
+        self._spill_dir = None
+
+    def _combine(self, parts):
+        frame = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        return frame.groupby(self.keys, dropna=False, sort=False, as_index=False)[['amount', 'count']].sum()
+
+    def add(self, partial):
+        self._parts.append(partial)
+        self._bytes += _nbytes(partial)
+        self.peak_bytes = max(self.peak_bytes, self._bytes)
+        if self._bytes <= self.memory_limit:
+            return
+        merged = self._combine(self._parts)
+        self._parts, self._bytes = [merged], _nbytes(merged)
+        if self._bytes > self.memory_limit // 2:
+            # Merging freed too little: there are simply too many groups to hold
+            self._spill(merged)
+            self._parts, self._bytes = [], 0
+
+    def _spill(self, frame):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='finance-spill-', dir=self.directory)
+        # A key always hashes to the same bucket, so each bucket can be finished on its own
+        buckets = pd.util.hash_pandas_object(frame[self.keys], index=False).to_numpy() % self.buckets
+        with span('spill_partials', 'io', rows=len(frame)):
+            for bucket in np.unique(buckets):
+                with open(os.path.join(self._spill_dir, f"{bucket}.pkl"), 'ab') as f:
+                    pickle.dump(frame[buckets == bucket], f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spills += 1
+
+    def _read_bucket(self, name):
+        parts = []
+        with open(os.path.join(self._spill_dir, name), 'rb') as f:
+            while True:
+                try:
+                    parts.append(pickle.load(f))
+                except EOFError:
+                    return parts
+
+    def result(self):
+        try:
+            if self._spill_dir is None:
+                if not self._parts:
+                    return pd.DataFrame(columns=self.keys + ['amount', 'count'])
+                return self._combine(self._parts)
+            if self._parts:
+                self._spill(self._combine(self._parts))
+                self._parts = []
+            return pd.concat([self._combine(self._read_bucket(name)) for name in sorted(os.listdir(self._spill_dir))], ignore_index=True)
+        finally:
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+
+
+class ChunkedLedger:
+    # The on-disk ledger read a bounded chunk at a time; a row's month is the partition it is stored in
+
+    def __init__(self, store, memory_limit_mb=None, convert=None, spill_dir=None):
+        self.store = store
+        self.convert = convert
+        self.spill_dir = spill_dir
+        self.memory_limit = (memory_limit_mb or get_memory_limit()) * 1024 * 1024
+        # Half the cap for the chunk being parsed, a quarter for merged partials, the rest is headroom
+        self.chunk_rows = max(MIN_CHUNK_ROWS, self.memory_limit // 2 // ROW_BYTES)
+        self.stats = {}
+
+    def __len__(self):
+        return self.store.total_rows()
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def chunks(self, start=None, end=None):
+        columns = ['amount', 'type', 'category'] + (['date', 'currency'] if self.convert is not None else [])
+        dtypes = {'type': 'category', 'category': 'category', 'currency': 'category'}
+        for entry in self.store.partitions():
+            period = pd.Period(entry['period'], freq='M').ordinal
+            if (start is not None and period < start) or (end is not None and period >= end):
+                continue
+            for chunk in self.store.read_chunks(entry, self.chunk_rows, usecols=columns, dtype={column: dtypes[column] for column in columns if column in dtypes}):
+                if self.convert is not None:
+                    chunk = self.convert(chunk)
+                chunk['period'] = period
+                yield chunk
+
+    def totals(self, keys, year=None, month=None):
+        start, end = period_range(year, month) if year is not None else (None, None)
+        aggregate = PartialAggregate(keys, self.memory_limit // 4, directory=self.spill_dir)
+        chunks = rows = 0
+        with span('stream_totals', 'calc', keys=','.join(keys)):
+            for chunk in self.chunks(start, end):
+                aggregate.add(chunk_totals(chunk, keys))
+                chunks += 1
+                rows += len(chunk)
+            result = aggregate.result()
+        self.stats = {'chunks': chunks, 'rows': rows, 'spills': aggregate.spills, 'peak_partial_bytes': aggregate.peak_bytes}
+        return result
+
+    def rollup(self):
+        totals = self.totals(['period', 'type', 'category'])
+        periods = totals['period'].to_numpy(dtype=np.int64)
+        # Period ordinals count months from January 1970
+        rollup = totals.assign(year=periods // 12 + 1970, month=periods % 12 + 1)
+        rollup['count'] = rollup['count'].astype(np.int64)
+        return rollup[ROLLUP_COLUMNS].sort_values(['year', 'month']).reset_index(drop=True)
+
+
+def get_rollup(ledger, key, max_entries=4):
+    # A full pass over a large archive or a big frame is slow; repeat reruns on the same data reuse it
+    with _rollup_lock:
+        cached = _rollup_cache.get(key)
+        if cached is not None:
+            _rollup_cache.move_to_end(key)
+            return cached.copy()
+
+    rollup = ledger.rollup() if isinstance(ledger, ChunkedLedger) else ReportGenerator().build_rollup(ledger)
+    with _rollup_lock:
+        _rollup_cache[key] = rollup
+        while len(_rollup_cache) > max_entries:
+            _rollup_cache.popitem(last=False)
+    return rollup.copy()
+
+
+class StreamingBackend(ColumnarBackend):
+    # Answers the calculator's grouped queries from a ChunkedLedger instead of a frame in memory
+    name = 'streaming'
+
+    @classmethod
+    def available(cls):
+        return True
+
+    @classmethod
+    def frame(cls, ledger, max_entries=2):
+        return ledger, {}
+
+    @classmethod
+    def totals(cls, ledger, keys, year=None, month=None):
+        return ledger.totals(keys, year, month)[keys + ['amount']]
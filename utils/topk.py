@@ -0,0 +1,236 @@
+import heapq
+from bisect import bisect_left, insort
+import threading
+from itertools import islice
+import numpy as np
+import pandas as pd
+from utils.backends import period_range
+from utils.profiling import traced
+
+INDEX_COLUMNS = ['date', 'amount', 'category', 'description', 'type']
+# Date and id share one sortable int64: the day number in the high bits, the id in the low ones
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+DAY_OFFSET = 1 << 20
+CHUNK_KEYS = 1024
+
+
+def date_keys(dates, ids):
+    days = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64) + DAY_OFFSET
+    return (days << ID_BITS) | np.asarray(ids, dtype=np.int64)
+
+
+class SortedKeys:
+    # Sorted int64 keys in bounded chunks, so a single insert or delete only shifts one chunk
+
+    def __init__(self, keys=()):
+        self._load(np.sort(np.asarray(keys, dtype=np.int64)))
+
+    def _load(self, keys):
+        self.chunks = [keys[at:at + CHUNK_KEYS].tolist() for at in range(0, len(keys), CHUNK_KEYS)]
+        self.maxes = [chunk[-1] for chunk in self.chunks]
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def values(self):
+        return np.fromiter((key for chunk in self.chunks for key in chunk), dtype=np.int64)
+
+    def add(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(keys) > CHUNK_KEYS:
+            # Bulk loads and restores rebuild the chunks in one sort
+            self._load(np.sort(np.concatenate([self.values(), keys])))
+            return
+        for key in keys.tolist():
+            if not self.chunks:
+                self.chunks.append([key])
+                self.maxes.append(key)
+                continue
+            at = min(bisect_left(self.maxes, key), len(self.chunks) - 1)
+            chunk = self.chunks[at]
+            insort(chunk, key)
+            self.maxes[at] = chunk[-1]
+            if len(chunk) > 2 * CHUNK_KEYS:
+                self.chunks[at:at + 1] = [chunk[:CHUNK_KEYS], chunk[CHUNK_KEYS:]]
+                self.maxes[at:at + 1] = [chunk[CHUNK_KEYS - 1], chunk[-1]]
+
+    def remove(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(keys) > CHUNK_KEYS:
+            values = self.values()
+            self._load(values[~np.isin(values, keys)])
+            return
+        for key in keys.tolist():
+            at = bisect_left(self.maxes, key)
+            if at == len(self.chunks):
+                continue
+            chunk = self.chunks[at]
+            position = bisect_left(chunk, key)
+            if position == len(chunk) or chunk[position] != key:
+                continue
+            del chunk[position]
+            if chunk:
+                self.maxes[at] = chunk[-1]
+            else:
+                del self.chunks[at], self.maxes[at]
+
+    def clear(self):
+        self.chunks, self.maxes = [], []
+
+    def last(self, n):
+        # The n largest keys, largest first
+        return list(islice((key for chunk in reversed(self.chunks) for key in reversed(chunk)), n))
+
+
+class TopIndex:
+    # Sorted keys kept up to date from write deltas, so "latest N" and "largest K" read off the end of a key list
+
+    def __init__(self):
+        # id -> (date as int64 ns, amount, category, description, type)
+        self.rows = {}
+        self.by_date = SortedKeys()
+        # period ordinal -> (type, category) -> [amounts ascending, ids in the same order, total]
+        self.groups = {}
+        self.data_version = None
+        self.currency = None
+        self.convert = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    @traced('calc', name='TopIndex.from_frame')
+    def from_frame(cls, df, data_version=None, currency=None, convert=None):
+        index = cls()
+        index.data_version = data_version
+        # Like MetricsStore: frames arrive in the reporting currency, write deltas go through convert
+        index.currency = currency
+        index.convert = convert
+        index._add(df)
+        return index
+
+    def attach(self, data_handler):
+        data_handler.subscribe(self.apply_change)
+        return self
+
+    def detach(self, data_handler):
+        data_handler.unsubscribe(self.apply_change)
+
+    def is_current(self, data_version, currency=None):
+        return self.data_version is not None and self.data_version == data_version and self.currency == currency
+
+    @staticmethod
+    def _prepare(df):
+        valid = df[df['date'].notna()]
+        # Missing text is None whether the rows came from a reload or a write delta, so both land in the same cell
+        rows = pd.DataFrame({column: valid[column].astype(object).where(valid[column].notna(), None).to_numpy() for column in ('category', 'description', 'type')}, dtype=object)
+        dates = valid['date'] if pd.api.types.is_datetime64_any_dtype(valid['date']) else pd.to_datetime(valid['date'], format='mixed')
+        rows['date'] = dates.to_numpy(dtype='datetime64[ns]')
+        rows['amount'] = pd.to_numeric(valid['amount'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        rows.index = pd.Index(valid['id'].to_numpy(dtype=np.int64), name='id')
+        return rows[INDEX_COLUMNS]
+
+    def _add(self, df):
+        if df is None or df.empty:
+            return
+        rows = self._prepare(df)
+        if rows.empty:
+            return
+        ids = rows.index.to_numpy()
+        self.by_date.add(date_keys(rows['date'], ids))
+        self.rows.update(zip(ids.tolist(), zip(
+            rows['date'].to_numpy().astype(np.int64).tolist(), rows['amount'].tolist(),
+            rows['category'].tolist(), rows['description'].tolist(), rows['type'].tolist()
+        )))
+
+        periods = rows['date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+        grouped = pd.DataFrame({'period': periods, 'type': rows['type'].to_numpy(), 'category': rows['category'].to_numpy()})
+        amounts = rows['amount'].to_numpy()
+        for (period, trans_type, category), positions in grouped.groupby(['period', 'type', 'category'], sort=False, dropna=False).indices.items():
+            order = positions[np.argsort(amounts[positions], kind='stable')]
+            cell = self.groups.setdefault(int(period), {}).get((trans_type, category))
+            if cell is None:
+                self.groups[int(period)][(trans_type, category)] = [amounts[order], ids[order], float(amounts[order].sum())]
+            else:
+                at = np.searchsorted(cell[0], amounts[order])
+                cell[0] = np.insert(cell[0], at, amounts[order])
+                cell[1] = np.insert(cell[1], at, ids[order])
+                cell[2] += float(amounts[order].sum())
+
+    def _remove(self, ids):
+        ids = [value for value in pd.unique(np.asarray(ids, dtype=np.int64)).tolist() if value in self.rows]
+        if not ids:
+            return
+        stored = [self.rows.pop(value) for value in ids]
+        dates = np.array([row[0] for row in stored], dtype=np.int64).astype('datetime64[ns]')
+        self.by_date.remove(date_keys(dates, ids))
+
+        periods = dates.astype('datetime64[M]').astype(np.int64)
+        for period, (_, amount, category, _, trans_type), value in zip(periods, stored, ids):
+            by_period = self.groups[int(period)]
+            cell = by_period[(trans_type, category)]
+            keep = cell[1] != value
+            cell[0], cell[1] = cell[0][keep], cell[1][keep]
+            cell[2] -= amount
+            if not len(cell[1]):
+                del by_period[(trans_type, category)]
+                if not by_period:
+                    del self.groups[int(period)]
+
+    def apply_change(self, change):
+        with self._lock:
+            if change['op'] == 'reset':
+                self._clear()
+            else:
+                before, after = change.get('before'), change.get('after')
+                if before is not None and not before.empty:
+                    self._remove(before['id'])
+                if after is not None and not after.empty:
+                    self._add(self.convert(after) if self.convert is not None else after)
+            self.data_version = change.get('data_version')
+
+    def _clear(self):
+        self.rows.clear()
+        self.by_date.clear()
+        self.groups.clear()
+
+    def _frame(self, ids):
+        ids = [int(value) for value in ids]
+        frame = pd.DataFrame([self.rows[value] for value in ids], columns=INDEX_COLUMNS, dtype=object)
+        frame['date'] = np.array(frame['date'].tolist(), dtype=np.int64).astype('datetime64[ns]')
+        frame['amount'] = frame['amount'].astype(float)
+        frame.insert(0, 'id', np.array(ids, dtype=np.int64))
+        return frame
+
+    def recent(self, n=5):
+        with self._lock:
+            return self._frame([key & ID_MASK for key in self.by_date.last(n)])
+
+    def _cells(self, year=None, month=None, trans_type=None, category=None):
+        if year is None:
+            periods = list(self.groups)
+        else:
+            start, end = period_range(year, month)
+            periods = [period for period in range(start, end) if period in self.groups]
+        return [
+            (key, cell)
+            for period in periods
+            for key, cell in self.groups[period].items()
+            if (trans_type is None or key[0] == trans_type) and (category is None or key[1] == category)
+        ]
+
+    def largest(self, k=5, year=None, month=None, trans_type='Expense', category=None):
+        # Each cell is already sorted, so the K largest come from merging the cells' top ends
+        with self._lock:
+            tops = [zip(cell[0][::-1][:k], cell[1][::-1][:k]) for _, cell in self._cells(year, month, trans_type, category)]
+            ids = [value for _, value in islice(heapq.merge(*tops, reverse=True), k)]
+            return self._frame(ids)
+
+    def top_categories(self, k=5, year=None, month=None, trans_type='Expense'):
+        with self._lock:
+            totals = {}
+            for (_, category), cell in self._cells(year, month, trans_type):
+                total = totals.setdefault(category, [0.0, 0])
+                total[0] += cell[2]
+                total[1] += len(cell[1])
+            top = heapq.nlargest(k, totals.items(), key=lambda item: item[1][0])
+            return pd.DataFrame([{'category': category, 'amount': amount, 'count': count} for category, (amount, count) in top], columns=['category', 'amount', 'count'])